@@ -0,0 +1,46 @@
+from dataclasses import dataclass, fields
+import os
+from typing import Mapping, Optional
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Backend settings, read from environment variables of the same name in upper case.
+
+    The SQLite pragmas are applied to every new connection. The defaults are tuned for concurrent use by the
+    request handlers and the background threads: WAL lets readers run alongside the single writer,
+    ``synchronous=NORMAL`` only syncs at checkpoints (a commit may be lost on power failure, never corrupted),
+    and the busy timeout makes a writer wait for the lock instead of failing with "database is locked". An
+    empty value leaves that pragma at SQLite's default.
+    """
+
+    database_url: str = "sqlite:///./test.db"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: str = "5000"  # Milliseconds
+    sqlite_mmap_size: str = str(256 * 1024 * 1024)  # Bytes
+    sqlite_cache_size: str = "-65536"  # Negative: KiB, so 64 MiB per connection
+    sqlite_temp_store: str = "MEMORY"
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """Build settings from the environment, keeping the default of every unset variable."""
+        environ = os.environ if environ is None else environ
+        values = {field.name: environ.get(field.name.upper()) for field in fields(cls)}
+        return cls(**{name: value for name, value in values.items() if value is not None})
+
+    def sqlite_pragmas(self) -> dict[str, str]:
+        """The configured SQLite pragmas, in the order they are applied."""
+        pragmas = {
+            "journal_mode": self.sqlite_journal_mode,
+            "synchronous": self.sqlite_synchronous,
+            "busy_timeout": self.sqlite_busy_timeout,
+            "mmap_size": self.sqlite_mmap_size,
+            "cache_size": self.sqlite_cache_size,
+            "temp_store": self.sqlite_temp_store,
+        }
+        return {name: value for name, value in pragmas.items() if value}
+
+
+settings = Settings.from_env()
@@ -1,13 +1,69 @@
-from sqlalchemy import create_engine
+import re
+from typing import Any
+
+from sqlalchemy import URL, Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from .config import settings
+from .migrations import run_migrations
 from .models import Base
 
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Pragma values are interpolated into the statement, so only plain words and numbers are accepted
+PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict[str, Any]) -> None:
+    """Run ``PRAGMA name=value`` for every pragma on each new connection of an SQLite engine."""
+    for name, value in pragmas.items():
+        if not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"Invalid value for SQLite pragma {name}: {value!r}")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def require_sqlite(url: URL) -> None:
+    """Reject other databases: migrations and the upserts in the services use SQLite-only SQL."""
+    if url.get_backend_name() != "sqlite":
+        raise ValueError(f"Only SQLite databases are supported, not {url.get_backend_name()!r}")
+
+
+def create_db_engine(url: str, pragmas: dict[str, Any]) -> Engine:
+    """Create an SQLite engine whose connections are shared with the background threads and get the pragmas."""
+    require_sqlite(make_url(url))
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def create_async_db_engine(url: str, pragmas: dict[str, Any]) -> AsyncEngine:
+    """Create an asyncio engine for the same database; plain SQLite URLs use the aiosqlite driver."""
+    url = make_url(url)
+    require_sqlite(url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    engine = create_async_engine(url)
+    apply_sqlite_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL, settings.sqlite_pragmas())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions for coroutines (WebSocket handlers), whose queries must not block the event loop
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL, settings.sqlite_pragmas())
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
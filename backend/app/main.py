@@ -1,16 +1,27 @@
+from collections import defaultdict
 import threading
 import time
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, update
 
-from .database import SessionLocal, init_db
+from .database import SessionLocal, async_engine, init_db
+from .models import User
 from .routers.game import router as game_router
 from .routers.puzzle import router as puzzle_router
-from .routers.team import router as team_router
+from .routers.team import NEXT_CURSOR_HEADER, router as team_router
 from .routers.ws import router as ws_router
+from .services.countdown_service import countdown_service
+from .services.difficulty_service import difficulty_service
 from .services.game_end_service import game_end_service
-from .utils.websocket_broadcast import broadcast_state
+from .services.game_state_machine import game_state_machine
+from .services.game_stats_service import game_stats_service
+from .services.leaderboard_service import leaderboard_service
+from .services.percentile_service import percentile_service
+from .services.puzzle_archive_service import puzzle_archive_service
+from .services.puzzle_deadline_service import puzzle_deadline_service
+from .utils.broadcast_dispatcher import broadcast_dispatcher
 
 
 DECAY_INTERVAL_SECONDS = 5
@@ -25,47 +36,113 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read the pagination cursor of the team lists
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
+@app.on_event("startup")
+async def attach_to_event_loop():
+    # Broadcasts and countdowns from request handlers and background threads run on this loop
+    broadcast_dispatcher.start()
+    countdown_service.start()
+
+
+@app.on_event("shutdown")
+async def detach_from_event_loop():
+    countdown_service.stop()
+    await broadcast_dispatcher.stop()
+    await async_engine.dispose()
+
+
 @app.on_event("startup")
 def on_startup():
     init_db()
 
+    db = SessionLocal()
+    try:
+        difficulty_service.load(db)
+        game_state_machine.load(db)
+        # Count the players of running games and end those that ran out while the server was down
+        game_end_service.check_and_handle_game_end(db)
+        leaderboard_service.load(db)
+        percentile_service.load(db)
+        puzzle_deadline_service.load(db)
+    finally:
+        db.close()
+    puzzle_deadline_service.start()
+
     def decay_loop():
         while True:
             time.sleep(DECAY_INTERVAL_SECONDS)
             db = SessionLocal()
             try:
-                from app.models import GameSession, User
-
-                users = db.query(User).all()
-                # At runtime, user.points is an int (not a Column); linter may show false positives here.
+                # Decay every player who has points with one statement; the returned rows show who ran out
+                decayed = db.execute(
+                    update(User)
+                    .where(User.points > 0)
+                    .values(points=func.max(0, User.points - POINTS_LOST_PER_DECAY))
+                    .returning(User.id, User.team_id, User.points)
+                    .execution_options(synchronize_session=False),
+                ).all()
+                active_sessions = {session.team_id: session.id for session in game_state_machine.active_sessions(db)}
                 sessions_to_update = set()
-                for user in users:
-                    if hasattr(user, "points") and isinstance(user.points, int) and user.points > 0:
-                        user.points = max(0, user.points - POINTS_LOST_PER_DECAY)
-                        # Track which sessions need updates
-                        if user.team_id:
-                            sessions = db.query(GameSession).filter(GameSession.team_id == user.team_id).all()
-                            for session in sessions:
-                                sessions_to_update.add(session.id)
-
-                # Use the game end service to check for game end conditions
-                ended_sessions = game_end_service.check_and_handle_game_end(db)
-                sessions_to_update.update(ended_sessions)
-
+                eliminated = defaultdict(list)
+                for user in decayed:
+                    session_id = active_sessions.get(user.team_id)
+                    if session_id is None:
+                        continue
+                    sessions_to_update.add(session_id)
+                    if user.points == 0:
+                        eliminated[session_id].append(user.id)
+
+                game_stats_service.record_eliminations(
+                    [(session_id, user_id) for session_id, user_ids in eliminated.items() for user_id in user_ids],
+                    db,
+                )
+                # Sessions whose last players ran out of points end in this transaction
+                ended_sessions = [
+                    ended
+                    for ended in (
+                        game_end_service.players_eliminated(session_id, len(user_ids), db)
+                        for session_id, user_ids in eliminated.items()
+                    )
+                    if ended is not None
+                ]
+
+                # Persist any session transitions that were applied in memory only
+                game_state_machine.flush(db)
                 db.commit()
+                game_end_service.on_finished(
+                    ended_sessions,
+                    db,
+                    {session_id: len(user_ids) for session_id, user_ids in eliminated.items()},
+                )
+
+                # Checkpoint the in-memory difficulty statistics
+                try:
+                    difficulty_service.checkpoint(db)
+                except Exception as e:
+                    print(f"Failed to checkpoint difficulty statistics: {e}")
+
+                # Checkpoint the performance distributions
+                try:
+                    percentile_service.checkpoint(db)
+                except Exception as e:
+                    print(f"Failed to checkpoint performance distributions: {e}")
+
+                # Move resolved puzzles out of the live puzzles table
+                try:
+                    puzzle_archive_service.archive_resolved(db)
+                    puzzle_archive_service.archive_finished_sessions(db)
+                except Exception as e:
+                    db.rollback()
+                    print(f"Failed to archive puzzles: {e}")
 
                 # Broadcast updates to all affected sessions
                 for session_id in sessions_to_update:
                     try:
-                        import asyncio
-
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        loop.run_until_complete(broadcast_state(session_id, db))
-                        loop.close()
+                        broadcast_dispatcher.broadcast_state(session_id, db)
                     except Exception as e:
                         print(f"Failed to broadcast decay update for session {session_id}: {e}")
             finally:
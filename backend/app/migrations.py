@@ -0,0 +1,206 @@
+from typing import Callable, Sequence
+
+from sqlalchemy import Connection, Engine, inspect
+
+
+def _rebuild_table(conn: Connection, table_name: str, create_sql: str, index_sql: Sequence[str] = ()) -> None:
+    """
+    Rebuild a table from a frozen definition, keeping all rows.
+
+    SQLite cannot change column constraints in place, so the old table is renamed, the new one created and
+    the columns both have in common copied over. The definition is spelled out by the migration rather than
+    taken from the models, so that later model changes do not alter what an old migration produces.
+
+    Args:
+        conn: Connection inside the migration's transaction
+        table_name: Name of the table to rebuild
+        create_sql: ``CREATE TABLE`` statement of the new definition
+        index_sql: ``CREATE INDEX`` statements of the new table
+    """
+    old_name = f"_{table_name}_old"
+    conn.exec_driver_sql(f'ALTER TABLE "{table_name}" RENAME TO "{old_name}"')
+    # Index names are global in SQLite; drop the old ones so the new table can create them again
+    for index in inspect(conn).get_indexes(old_name):
+        conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+    conn.exec_driver_sql(create_sql)
+    for statement in index_sql:
+        conn.exec_driver_sql(statement)
+    old_columns = {column["name"] for column in inspect(conn).get_columns(old_name)}
+    new_columns = [column["name"] for column in inspect(conn).get_columns(table_name)]
+    columns = ", ".join(f'"{name}"' for name in new_columns if name in old_columns)
+    conn.exec_driver_sql(f'INSERT INTO "{table_name}" ({columns}) SELECT {columns} FROM "{old_name}"')
+    conn.exec_driver_sql(f'DROP TABLE "{old_name}"')
+
+
+def _add_column(conn: Connection, table_name: str, column_name: str, column_type: str) -> None:
+    """Add a nullable column to a table unless it already exists."""
+    if column_name in {existing["name"] for existing in inspect(conn).get_columns(table_name)}:
+        return
+    conn.exec_driver_sql(f'ALTER TABLE "{table_name}" ADD COLUMN "{column_name}" {column_type}')
+
+
+def _puzzle_seed_columns(conn: Connection) -> None:
+    """Add the generator seed and difficulty columns and make the stored data and answer optional."""
+    columns = {column["name"] for column in inspect(conn).get_columns("puzzles")}
+    if "seed" not in columns or "difficulty" not in columns:
+        _rebuild_table(
+            conn,
+            "puzzles",
+            """
+            CREATE TABLE puzzles (
+                id INTEGER NOT NULL,
+                type VARCHAR NOT NULL,
+                seed INTEGER,
+                difficulty JSON,
+                data JSON,
+                correct_answer VARCHAR,
+                status VARCHAR NOT NULL,
+                game_session_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                created_at DATETIME NOT NULL,
+                solved_at DATETIME,
+                PRIMARY KEY (id),
+                FOREIGN KEY(game_session_id) REFERENCES game_sessions (id),
+                FOREIGN KEY(user_id) REFERENCES users (id)
+            )
+            """,
+            ["CREATE INDEX ix_puzzles_id ON puzzles (id)"],
+        )
+
+
+def _hot_query_indexes(conn: Connection) -> None:
+    """Create the composite and partial indexes used by the hot queries."""
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_users_team_id ON users (team_id)",
+        "CREATE INDEX IF NOT EXISTS ix_game_sessions_team_status ON game_sessions (team_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_game_sessions_team_id_desc ON game_sessions (team_id, id DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_puzzles_session_status ON puzzles (game_session_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_puzzles_active_user ON puzzles (user_id) WHERE status = 'active'",
+    ):
+        conn.exec_driver_sql(statement)
+
+
+def _puzzle_deadlines(conn: Connection) -> None:
+    """Add the puzzle deadline column to live and archived puzzles."""
+    _add_column(conn, "puzzles", "expires_at", "DATETIME")
+    _add_column(conn, "puzzle_history", "expires_at", "DATETIME")
+
+
+def _leaderboard_indexes(conn: Connection) -> None:
+    """Create the finished-session indexes read by the leaderboards."""
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_game_sessions_finished_survival "
+        "ON game_sessions (survival_time_seconds DESC, ended_at) WHERE status = 'finished'",
+        "CREATE INDEX IF NOT EXISTS ix_game_sessions_finished_ended_at "
+        "ON game_sessions (ended_at) WHERE status = 'finished'",
+    ):
+        conn.exec_driver_sql(statement)
+
+
+def _puzzle_ids_autoincrement(conn: Connection) -> None:
+    """
+    Stop reusing the IDs of archived puzzles.
+
+    Without AUTOINCREMENT SQLite hands out the highest archived ID again, which then collides in
+    ``puzzle_history``. The sequence starts after the highest ID of both tables.
+    """
+    table_sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'puzzles'").scalar()
+    if "AUTOINCREMENT" in table_sql.upper():
+        return
+    _rebuild_table(
+        conn,
+        "puzzles",
+        """
+        CREATE TABLE puzzles (
+            id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            type VARCHAR NOT NULL,
+            seed INTEGER,
+            difficulty JSON,
+            data JSON,
+            correct_answer VARCHAR,
+            status VARCHAR NOT NULL,
+            game_session_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at DATETIME NOT NULL,
+            solved_at DATETIME,
+            expires_at DATETIME,
+            FOREIGN KEY(game_session_id) REFERENCES game_sessions (id),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )
+        """,
+        [
+            "CREATE INDEX ix_puzzles_id ON puzzles (id)",
+            "CREATE INDEX ix_puzzles_session_status ON puzzles (game_session_id, status)",
+            "CREATE INDEX ix_puzzles_active_user ON puzzles (user_id) WHERE status = 'active'",
+        ],
+    )
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'puzzles'")
+    conn.exec_driver_sql(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'puzzles', max("
+        "(SELECT coalesce(max(id), 0) FROM puzzles), (SELECT coalesce(max(id), 0) FROM puzzle_history))",
+    )
+
+
+def _puzzle_generator_version(conn: Connection) -> None:
+    """Record the generator version of seeded puzzles; all earlier seeds belong to version 1."""
+    for table_name in ("puzzles", "puzzle_history"):
+        _add_column(conn, table_name, "generator_version", "INTEGER")
+        conn.exec_driver_sql(
+            f'UPDATE "{table_name}" SET generator_version = 1 WHERE seed IS NOT NULL AND generator_version IS NULL',
+        )
+
+
+def _session_player_stats(conn: Connection) -> None:
+    """Give every player who got a puzzle in a session a statistics row, which now records who played it."""
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO game_player_stats "
+        "(game_session_id, user_id, puzzles_solved, puzzles_failed, points_given, points_received) "
+        "SELECT game_session_id, user_id, 0, 0, 0, 0 FROM puzzles "
+        "UNION SELECT game_session_id, user_id, 0, 0, 0, 0 FROM puzzle_history",
+    )
+
+
+# Ordered schema migrations; the position in this list is the schema version. Only ever append new entries,
+# applied migrations must stay unchanged.
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _puzzle_seed_columns,
+    _hot_query_indexes,
+    _puzzle_deadlines,
+    _leaderboard_indexes,
+    _puzzle_ids_autoincrement,
+    _puzzle_generator_version,
+    _session_player_stats,
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Get the schema version recorded in the database file."""
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Bring an existing database up to the current schema version.
+
+    The version is stored in SQLite's ``user_version`` header field and bumped after every applied migration.
+    Migrations check the current schema before changing it, so an interrupted upgrade can simply run again.
+
+    Args:
+        engine: Engine of the database to migrate; tables that do not exist yet must have been created
+
+    Returns:
+        int: Number of applied migrations
+    """
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+    applied = 0
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with engine.begin() as conn:
+            # pysqlite only opens a transaction before DML, so DDL would commit statement by statement; an
+            # explicit BEGIN makes every migration, including table rebuilds, all or nothing
+            conn.exec_driver_sql("BEGIN")
+            migration(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+        print(f"Applied migration {number}: {migration.__name__}")
+        applied += 1
+    return applied
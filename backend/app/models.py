@@ -1,12 +1,18 @@
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint, literal, text
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 
+from .services.puzzle_generator import GENERATOR_VERSION, puzzle_generator
+
 
 Base = declarative_base()
 
+# Status literal rendered inline instead of bound, so SQLite can match it against partial index predicates
+# such as ``WHERE status = 'active'``
+ACTIVE = literal("active", literal_execute=True)
+
 
 class Team(Base):
     __tablename__ = "teams"
@@ -18,7 +24,10 @@ class Team(Base):
 
 class User(Base):
     __tablename__ = "users"
-    __table_args__ = (UniqueConstraint("team_id", "color", name="uq_team_color"),)
+    __table_args__ = (
+        UniqueConstraint("team_id", "color", name="uq_team_color"),
+        Index("ix_users_team_id", "team_id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     username: Mapped[str] = mapped_column(String, unique=True, index=True)
     team_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("teams.id"), nullable=True)
@@ -30,6 +39,18 @@ class User(Base):
 
 class GameSession(Base):
     __tablename__ = "game_sessions"
+    __table_args__ = (
+        Index("ix_game_sessions_team_status", "team_id", "status"),
+        Index("ix_game_sessions_team_id_desc", "team_id", text("id DESC")),
+        # Leaderboards: finished games by survival time, and by end time for the daily windows
+        Index(
+            "ix_game_sessions_finished_survival",
+            text("survival_time_seconds DESC"),
+            "ended_at",
+            sqlite_where=text("status = 'finished'"),
+        ),
+        Index("ix_game_sessions_finished_ended_at", "ended_at", sqlite_where=text("status = 'finished'")),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id"))
     status: Mapped[str] = mapped_column(String, default="lobby")  # lobby, countdown, active, finished
@@ -47,16 +68,107 @@ class GameSession(Base):
     puzzles: Mapped[list["Puzzle"]] = relationship("Puzzle", back_populates="game_session")
 
 
-class Puzzle(Base):
-    __tablename__ = "puzzles"
+class PuzzleColumns:
+    """Columns and accessors shared by live puzzles and archived puzzle history."""
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     type: Mapped[str] = mapped_column(String, nullable=False)  # e.g., memory, spatial, etc.
-    data: Mapped[dict] = mapped_column(JSON, nullable=False)  # Puzzle data (e.g., color mapping)
-    correct_answer: Mapped[str] = mapped_column(String, nullable=False)
+    seed: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Generator seed, data is rebuilt from it
+    # Generator version the seed belongs to
+    generator_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=GENERATOR_VERSION)
+    difficulty: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)  # Generator parameters
+    # Explicitly stored data/answer, only set for rows that were not generated from a seed
+    stored_data: Mapped[Optional[dict]] = mapped_column("data", JSON, nullable=True)
+    stored_correct_answer: Mapped[Optional[str]] = mapped_column("correct_answer", String, nullable=True)
     status: Mapped[str] = mapped_column(String, default="active")  # active, solved, failed
     game_session_id: Mapped[int] = mapped_column(Integer, ForeignKey("game_sessions.id"))
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     solved_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Server-enforced deadline
+
+    def _generated(self) -> tuple[dict, str]:
+        if self.seed is None:
+            return self.stored_data or {}, self.stored_correct_answer or ""
+        # Puzzles that were not inserted yet have no version, they are generated by this one
+        version = GENERATOR_VERSION if self.generator_version is None else self.generator_version
+        return puzzle_generator.generate(self.type, self.seed, self.difficulty, version)
+
+    @property
+    def data(self) -> dict:
+        """Puzzle data (e.g., color mapping), rebuilt from the seed on read."""
+        return self._generated()[0]
+
+    @data.setter
+    def data(self, value: dict) -> None:
+        self.seed = None
+        self.stored_data = value
+
+    @property
+    def correct_answer(self) -> str:
+        return self._generated()[1]
+
+    @correct_answer.setter
+    def correct_answer(self, value: str) -> None:
+        self.seed = None
+        self.stored_correct_answer = value
+
+
+class Puzzle(PuzzleColumns, Base):
+    """Live puzzles; resolved rows are moved to ``puzzle_history`` by the archive service."""
+
+    __tablename__ = "puzzles"
+    __table_args__ = (
+        Index("ix_puzzles_session_status", "game_session_id", "status"),
+        # Current puzzle lookup; only active rows are indexed
+        Index("ix_puzzles_active_user", "user_id", sqlite_where=text("status = 'active'")),
+        # IDs are never reused: archived rows keep their ID in puzzle_history, and deadlines are keyed by it
+        {"sqlite_autoincrement": True},
+    )
     game_session: Mapped["GameSession"] = relationship("GameSession", back_populates="puzzles")
     user: Mapped["User"] = relationship("User", back_populates="puzzles")
+
+
+class PuzzleHistory(PuzzleColumns, Base):
+    """Archived (solved, failed or abandoned) puzzles, keyed by their original puzzle ID."""
+
+    __tablename__ = "puzzle_history"
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class GamePlayerStats(Base):
+    """Per-player counters of one game session, maintained incrementally by the answer and decay paths."""
+
+    __tablename__ = "game_player_stats"
+    game_session_id: Mapped[int] = mapped_column(Integer, ForeignKey("game_sessions.id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    puzzles_solved: Mapped[int] = mapped_column(Integer, default=0)
+    puzzles_failed: Mapped[int] = mapped_column(Integer, default=0)
+    points_given: Mapped[int] = mapped_column(Integer, default=0)  # Awarded to the next player by this player's solves
+    points_received: Mapped[int] = mapped_column(Integer, default=0)  # Awarded to this player by teammates' solves
+    eliminated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class PlayerPuzzleStats(Base):
+    """Checkpoint of the in-memory per-player difficulty statistics."""
+
+    __tablename__ = "player_puzzle_stats"
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    puzzle_type: Mapped[str] = mapped_column(String, primary_key=True)
+    solve_time_ewma: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # Seconds
+    accuracy_ewma: Mapped[float] = mapped_column(Float, nullable=False)
+    streak: Mapped[int] = mapped_column(Integer, default=0)  # Positive: solves in a row, negative: failures
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class MetricSketch(Base):
+    """Checkpoint of one in-memory quantile sketch: the non-empty bucket counts of a performance metric."""
+
+    __tablename__ = "metric_sketches"
+    name: Mapped[str] = mapped_column(String, primary_key=True)  # e.g. "survival_time", "solve_time:memory"
+    layout: Mapped[str] = mapped_column(String, nullable=False)  # Bucket layout the counts belong to
+    buckets: Mapped[dict] = mapped_column(JSON, nullable=False)  # Bucket index -> count
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    total: Mapped[float] = mapped_column(Float, default=0.0)  # Sum of all values, for the mean
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
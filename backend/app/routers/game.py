@@ -1,17 +1,32 @@
-from datetime import datetime, timezone
+from typing import Literal, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy import Connection, Engine
 from sqlalchemy.orm import Session
 
 from .. import database, models
-from ..schemas.v1.api.requests import GameSessionCreate, GameSessionStateUpdate
+from ..schemas.v1.api.requests import GameSessionCreate, GameSessionStateUpdate, RestartGameRequest
 from ..schemas.v1.api.responses import GameSessionResponse
+from ..schemas.v1.core.game import GameResult
+from ..services.available_teams_service import available_teams_service
 from ..services.countdown_service import countdown_service
-from ..utils.websocket_broadcast import cache_user_color
+from ..services.game_end_service import game_end_service
+from ..services.game_state_machine import InvalidTransition, LiveSession, game_state_machine
+from ..services.game_stats_service import game_stats_service
+from ..services.leaderboard_service import TOP_K, leaderboard_service
+from ..services.lobby_directory import lobby_directory
+from ..services.matchmaking_service import matchmaking_service
+from ..services.percentile_service import METRIC_LAYOUTS, percentile_service
+from ..services.puzzle_archive_service import puzzle_archive_service
+from ..services.session_restart_service import session_restart_service
+from ..utils.broadcast_dispatcher import broadcast_dispatcher
+from ..utils.websocket_broadcast import broadcast_message, cache_user_color, connections
 
 
 router = APIRouter(prefix="/game", tags=["game"])
 
+COUNTDOWN_SECONDS = 5
+
 
 def get_db():
     db = database.SessionLocal()
@@ -21,18 +36,29 @@ def get_db():
         db.close()
 
 
+def start_session_countdown(session_id: int, team_id: int, db: Session) -> None:
+    """Start the countdown of a newly created session and announce it to connected clients."""
+    if not countdown_service.start_countdown(session_id, duration_seconds=COUNTDOWN_SECONDS):
+        print(f"Countdown already running for session {session_id}")
+
+    # Cache user colors for WebSocket mouse cursor broadcasting
+    team_users = db.query(models.User).filter(models.User.team_id == team_id).all()
+    for user in team_users:
+        if user.color:
+            cache_user_color(session_id, user.id, user.color)
+            print(f"[Game Session] Cached color {user.color} for user {user.username} in session {session_id}")
+
+    # Broadcast state update to all connected clients
+    broadcast_dispatcher.broadcast_state(session_id, db)
+
+
 @router.post("/session", response_model=GameSessionResponse)
 def create_game_session(session: GameSessionCreate, db: Session = Depends(get_db)):
     team = db.query(models.Team).filter(models.Team.id == session.team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     # Only one non-finished session per team
-    existing_session = (
-        db.query(models.GameSession)
-        .filter(models.GameSession.team_id == team.id, models.GameSession.status != "finished")
-        .first()
-    )
-    if existing_session:
+    if game_state_machine.has_open_session(team.id, db):
         raise HTTPException(status_code=400, detail="Game session already exists for this team")
 
     # Create session and immediately transition to countdown
@@ -42,131 +68,161 @@ def create_game_session(session: GameSessionCreate, db: Session = Depends(get_db
     db.add(new_session)
     db.commit()
     db.refresh(new_session)
+    game_state_machine.track(new_session)
+    available_teams_service.invalidate(team.id)
+    matchmaking_service.invalidate(team.id)
+    lobby_directory.refresh_team(team.id, db)
+    start_session_countdown(new_session.id, team.id, db)
 
-    # Start the countdown automatically
-    session_id = new_session.id
-    if not countdown_service.start_countdown(session_id, duration_seconds=5):
-        print(f"Countdown already running for session {session_id}")
+    return new_session
 
-    # Cache user colors for WebSocket mouse cursor broadcasting
-    team_users = db.query(models.User).filter(models.User.team_id == team.id).all()
-    for user in team_users:
-        if user.color:
-            cache_user_color(session_id, user.id, user.color)
-            print(f"[Game Session] Cached color {user.color} for user {user.username} in session {session_id}")
 
-    # Broadcast state update to all connected clients
-    import asyncio
+@router.post("/restart", response_model=GameSessionResponse)
+def restart_game(request: RestartGameRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Play again: open a new session for a team whose game has finished and go straight to countdown"""
+    try:
+        session, previous_id = session_restart_service.restart(request.team_id, db)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Team not found")
+    except InvalidTransition as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    available_teams_service.invalidate(session.team_id)
+    matchmaking_service.invalidate(session.team_id)
+    lobby_directory.refresh_team(session.team_id, db)
+    if not countdown_service.start_countdown(session.id, duration_seconds=COUNTDOWN_SECONDS):
+        print(f"Countdown already running for session {session.id}")
+
+    if previous_id is not None:
+        # Clients still connected to the old session follow the team to the new one
+        if previous_id in connections:
+            broadcast_dispatcher.submit(
+                broadcast_message,
+                previous_id,
+                "session_restarted",
+                {"session_id": previous_id, "new_session_id": session.id},
+            )
+        background_tasks.add_task(_archive_session, previous_id, db.get_bind())
+
+    return session
 
-    from ..utils.websocket_broadcast import broadcast_state
 
+def _archive_session(session_id: int, bind: Union[Engine, Connection]) -> None:
+    """Archive a replaced session's puzzles after the response was sent, on a database session of its own."""
+    db = Session(bind=bind)
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(broadcast_state(session_id, db))
-        loop.close()
+        archived = puzzle_archive_service.archive_session(session_id, db)
+        print(f"Archived {archived} puzzles of replaced session {session_id}")
     except Exception as e:
-        print(f"Failed to broadcast session creation for session {session_id}: {e}")
+        db.rollback()
+        print(f"Failed to archive puzzles of session {session_id}: {e}")
+    finally:
+        db.close()
+
+
+@router.get("/countdowns")
+def get_countdown_stats():
+    """Running and finished game countdowns (for monitoring)"""
+    return countdown_service.get_stats()
 
-    return new_session
+
+@router.get("/leaderboard")
+def get_leaderboard(
+    window: Literal["all", "daily"] = "all",
+    limit: int = Query(10, ge=1, le=TOP_K),
+    db: Session = Depends(get_db),
+):
+    """Teams with the longest survival times, all-time or today (UTC)"""
+    return {"window": window, "entries": leaderboard_service.top(window, db, limit)}
+
+
+@router.get("/leaderboard/team/{team_id}")
+def get_team_rank(team_id: int, window: Literal["all", "daily"] = "all", db: Session = Depends(get_db)):
+    """A team's leaderboard rank and best game"""
+    entry = leaderboard_service.rank(team_id, window, db)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Team has no finished game in this leaderboard")
+    return {"window": window, **entry}
 
 
 @router.get("/session/{team_id}", response_model=GameSessionResponse)
 def get_current_session(team_id: int, db: Session = Depends(get_db)):
-    session = db.query(models.GameSession).filter_by(team_id=team_id).order_by(models.GameSession.id.desc()).first()
+    session = game_state_machine.current_for_team(team_id, db)
     if not session:
         raise HTTPException(status_code=404, detail="No game session for this team")
     return session
 
 
+@router.get("/session/{session_id}/results", response_model=GameResult)
+def get_game_results(session_id: int, db: Session = Depends(get_db)):
+    """Per-player statistics of a game session (final once the session is finished)"""
+    session = game_state_machine.get(session_id, db)
+    if not session:
+        raise HTTPException(status_code=404, detail="Game session not found")
+    return game_stats_service.get_results(session, db)
+
+
+@router.get("/session/{session_id}/compare")
+def compare_game_session(session_id: int, db: Session = Depends(get_db)):
+    """Percentiles of a game's survival time and answer accuracy among all finished games"""
+    session = game_state_machine.get(session_id, db)
+    if not session:
+        raise HTTPException(status_code=404, detail="Game session not found")
+    return {
+        "session_id": session_id,
+        "survival_time_seconds": percentile_service.compare("survival_time", session.survival_time_seconds, db),
+        "accuracy": percentile_service.compare("accuracy", game_stats_service.team_accuracy(session_id, db), db),
+    }
+
+
+@router.get("/percentile/{metric}")
+def get_percentile(metric: str, value: float, db: Session = Depends(get_db)):
+    """Percentile of a value, e.g. a player's solve time (metric ``solve_time:<puzzle type>``)"""
+    if metric not in METRIC_LAYOUTS:
+        raise HTTPException(status_code=404, detail="Unknown metric")
+    return {"metric": metric, **percentile_service.compare(metric, value, db)}
+
+
 @router.post("/session/{session_id}/start", response_model=GameSessionResponse)
 def start_game_session(session_id: int, db: Session = Depends(get_db)):
     """Start the game (transition from countdown to active)"""
-    session = db.query(models.GameSession).filter(models.GameSession.id == session_id).first()
+    session = game_state_machine.get(session_id, db)
     if not session:
         raise HTTPException(status_code=404, detail="Game session not found")
 
     if session.status != "countdown":
         raise HTTPException(status_code=400, detail="Game session must be in countdown state to start")
 
-    session.status = "active"
-    session.started_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(session)
-
-    # Broadcast state update
-    import asyncio
-
-    from ..utils.websocket_broadcast import broadcast_state
-
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(broadcast_state(session_id, db))
-        loop.close()
-    except Exception as e:
-        print(f"Failed to broadcast game start for session {session_id}: {e}")
-
-    return session
+    return _apply_transition(session_id, "active", db)
 
 
 @router.post("/session/{session_id}/state", response_model=GameSessionResponse)
 def update_game_session_state(session_id: int, state_update: GameSessionStateUpdate, db: Session = Depends(get_db)):
     """Update game session state (lobby, countdown, active, finished)"""
-    session = db.query(models.GameSession).filter(models.GameSession.id == session_id).first()
-    if not session:
+    if not game_state_machine.get(session_id, db):
         raise HTTPException(status_code=404, detail="Game session not found")
 
-    # Validate state transition
-    valid_transitions: dict[str, list[str]] = {
-        "lobby": ["countdown"],
-        "countdown": ["active"],
-        "active": ["finished"],
-        "finished": [],  # No transitions from finished
-    }
-
-    current_status = session.status
-    new_status = state_update.status
-
-    allowed_transitions = valid_transitions.get(current_status, [])
-    if new_status not in allowed_transitions:
-        raise HTTPException(status_code=400, detail=f"Invalid state transition from {current_status} to {new_status}")
-
-    # Update session state
-    session.status = new_status
+    return _apply_transition(session_id, state_update.status, db)
 
-    # Set timestamps for specific transitions
-    if new_status == "active" and current_status == "countdown":
-        session.started_at = datetime.now(timezone.utc)
-    elif new_status == "finished" and current_status == "active":
-        session.ended_at = datetime.now(timezone.utc)
-        # Calculate survival time
-        if session.started_at:
-            # Handle both timezone-aware and timezone-naive datetimes
-            started_at = session.started_at
-            ended_at = session.ended_at
-
-            # If started_at is timezone-naive, assume UTC
-            if started_at.tzinfo is None:
-                started_at = started_at.replace(tzinfo=timezone.utc)
-
-            survival_time = (ended_at - started_at).total_seconds()
-            session.survival_time_seconds = int(survival_time)
 
+def _apply_transition(session_id: int, status: str, db: Session) -> LiveSession:
+    """Validate and persist a status change, then refresh the lobby and broadcast the new state."""
+    try:
+        session = game_state_machine.transition(session_id, status, db)
+    except InvalidTransition as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    game_state_machine.flush(db)
+    if status == "active":
+        user_ids = db.query(models.User.id).filter(models.User.team_id == session.team_id).all()
+        game_stats_service.record_players([(session_id, user_id) for (user_id,) in user_ids], db)
     db.commit()
-    db.refresh(session)
-
-    # Broadcast state update
-    import asyncio
 
-    from ..utils.websocket_broadcast import broadcast_state
+    if status == "finished":
+        game_end_service.on_finished([session], db)
+    else:
+        lobby_directory.refresh_team(session.team_id, db)
 
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(broadcast_state(session_id, db))
-        loop.close()
-    except Exception as e:
-        print(f"Failed to broadcast state update for session {session_id}: {e}")
+    # Broadcast state update
+    broadcast_dispatcher.broadcast_state(session_id, db)
 
     return session
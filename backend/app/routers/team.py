@@ -1,9 +1,10 @@
+from bisect import bisect_right
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 
 from .. import database, models
 from ..schemas.v1.api.requests import AssignColorRequest, TeamCreate, UserCreate
@@ -13,14 +14,23 @@ from ..schemas.v1.api.responses import (
     UserResponse,
 )
 from ..schemas.v1.core.player import AvailableTeam
-from ..services.color_assignment_service import ColorAssignmentService
+from ..services.available_teams_service import available_teams_service
+from ..services.color_assignment_service import color_assignment_service
+from ..services.lobby_directory import lobby_directory
+from ..services.matchmaking_service import matchmaking_service
+from ..services.team_roster_service import team_roster_service
 from ..utils.websocket_broadcast import cache_user_color
+from .game import start_session_countdown
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/team", tags=["team"])
 
+# Keyset pagination of list endpoints
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 # Dependency to get DB session
 def get_db():
@@ -31,33 +41,10 @@ def get_db():
         db.close()
 
 
-def get_team_availability_status(team: models.Team, db: Session) -> tuple[str, Optional[int], Optional[str]]:
-    """
-    Determine team availability status.
-    Returns: (status, game_session_id, game_status)
-    """
-    # Check if team has an active game session
-    active_session = (
-        db.query(models.GameSession)
-        .filter(
-            and_(
-                models.GameSession.team_id == team.id,
-                models.GameSession.status.in_(["lobby", "countdown", "active"]),
-            ),
-        )
-        .first()
-    )
-
-    if active_session:
-        return "in_game", active_session.id, active_session.status
-
-    # Check if team is full (4 players) - regardless of game status
-    member_count = len(team.users)
-    if member_count >= 4:
-        return "full", None, None
-
-    # Team is available (has fewer than 4 players and no active game)
-    return "available", None, None
+def set_next_cursor(response: Response, page: list, limit: Optional[int]) -> None:
+    """Point the client at the next page (the last ID of this one) if the page is full."""
+    if limit is not None and len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(page[-1].id)
 
 
 @router.post("/register", response_model=UserResponse)
@@ -85,6 +72,9 @@ def create_team(team: TeamCreate, db: Session = Depends(get_db)):
     db.add(new_team)
     db.commit()
     db.refresh(new_team)
+    available_teams_service.invalidate(new_team.id)
+    matchmaking_service.invalidate(new_team.id)
+    lobby_directory.refresh_team(new_team.id, db)
     return new_team
 
 
@@ -98,31 +88,32 @@ def join_team(username: str, team_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Team not found")
 
     print(f"[Team Join] User {username} (ID: {user.id}) joining team {team.name} (ID: {team_id})")
-    user.team_id = team_id
-
-    # Assign color based on order of joining (if not already assigned)
-    if not user.color:
-        team_members = db.query(models.User).filter(models.User.team_id == team_id).all()
-        colors = ["red", "blue", "yellow", "green"]
-        used_colors = [member.color for member in team_members if member.color]
-
-        # Find first available color
-        available_color = None
-        for color in colors:
-            if color not in used_colors:
-                available_color = color
-                break
-
-        if available_color:
-            user.color = available_color
-            print(f"[Team Join] Assigned color {available_color} to user {username}")
-        else:
+    previous_team_id = user.team_id
+
+    if user.color:
+        user.team_id = team_id
+        db.commit()
+        color_assignment_service.invalidate(previous_team_id)
+        color_assignment_service.invalidate(team_id)
+    else:
+        # Moves the user and assigns the first free color in the team with a single conditional update
+        color = color_assignment_service.allocate_color(user.id, team_id, db, join=True)
+        if color is None:
             # Fallback if all colors are used
-            user.color = "gray"
+            user.team_id = team_id
+            user.color = color_assignment_service.fallback_color
+            db.commit()
             print(f"[Team Join] All colors used, assigned gray to user {username}")
-
-    db.commit()
+        else:
+            print(f"[Team Join] Assigned color {color} to user {username}")
     db.refresh(user)
+    team_roster_service.invalidate(previous_team_id)
+    team_roster_service.invalidate(team_id)
+    available_teams_service.invalidate(previous_team_id)
+    available_teams_service.invalidate(team_id)
+    matchmaking_service.invalidate(previous_team_id)
+    matchmaking_service.invalidate(team_id)
+    lobby_directory.refresh_teams({previous_team_id, team_id} - {None}, db)
 
     # Cache the user color for WebSocket mouse cursor broadcasting
     if user.color:
@@ -140,12 +131,42 @@ def join_team(username: str, team_id: int, db: Session = Depends(get_db)):
     return user
 
 
+@router.post("/matchmake", response_model=UserResponse)
+def matchmake(username: str, db: Session = Depends(get_db)):
+    """
+    Place a player without a team into the fullest team that still has a free slot, and assign a color.
+
+    A new team is created when every team is full or in a game. The game session starts counting down as soon
+    as the team has four players.
+    """
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.team_id is not None:
+        raise HTTPException(status_code=400, detail="User is already in a team")
+    if user.color:
+        # A color only means something within a team
+        user.color = None
+        db.flush()
+
+    team_id, session_id = matchmaking_service.match(user.id, db)
+    db.refresh(user)
+    print(f"[Matchmaking] Placed user {username} in team {team_id} with color {user.color}")
+    team_roster_service.invalidate(team_id)
+    available_teams_service.invalidate(team_id)
+    if session_id is not None:
+        start_session_countdown(session_id, team_id, db)
+    lobby_directory.refresh_team(team_id, db)
+    return user
+
+
 @router.post("/assign-color", response_model=ColorAssignmentResponse)
 def assign_color_to_user(request: AssignColorRequest, db: Session = Depends(get_db)):
     """Assign a unique color to a user within their team."""
     try:
-        color_service = ColorAssignmentService()
-        result = color_service.assign_color_to_user(user_id=request.user_id, team_id=request.team_id, db=db)
+        result = color_assignment_service.assign_color_to_user(user_id=request.user_id, team_id=request.team_id, db=db)
+        available_teams_service.invalidate(request.team_id)
+        lobby_directory.refresh_team(request.team_id, db)
         return ColorAssignmentResponse(
             user_id=request.user_id,
             color=result["color"],
@@ -166,8 +187,7 @@ def assign_color_to_user(request: AssignColorRequest, db: Session = Depends(get_
 def validate_team_colors(team_id: int, db: Session = Depends(get_db)):
     """Validate that all players in a team have unique colors."""
     try:
-        color_service = ColorAssignmentService()
-        result = color_service.validate_team_colors(team_id, db)
+        result = color_assignment_service.validate_team_colors(team_id, db)
         return ColorAssignmentResponse(
             success=result["is_valid"],
             message="Validation completed",
@@ -186,8 +206,9 @@ def validate_team_colors(team_id: int, db: Session = Depends(get_db)):
 def resolve_color_conflicts(team_id: int, db: Session = Depends(get_db)):
     """Resolve any color conflicts in a team by reassigning colors."""
     try:
-        color_service = ColorAssignmentService()
-        result = color_service.resolve_color_conflicts(team_id, db)
+        result = color_assignment_service.resolve_color_conflicts(team_id, db)
+        available_teams_service.invalidate(team_id)
+        lobby_directory.refresh_team(team_id, db)
         return ColorAssignmentResponse(
             success=result["success"],
             message=result["message"],
@@ -206,8 +227,7 @@ def resolve_color_conflicts(team_id: int, db: Session = Depends(get_db)):
 def get_available_colors(team_id: int, db: Session = Depends(get_db)):
     """Get available and used colors for a team."""
     try:
-        color_service = ColorAssignmentService()
-        result = color_service.get_available_colors(team_id, db)
+        result = color_assignment_service.get_available_colors(team_id, db)
         return ColorAssignmentResponse(
             success=True,
             message="Available colors retrieved",
@@ -219,50 +239,60 @@ def get_available_colors(team_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/available", response_model=list[AvailableTeam])
-def get_available_teams(db: Session = Depends(get_db)):
+def get_available_teams(
+    response: Response,
+    after_id: Optional[int] = Query(default=None, description="Return teams with an ID greater than this cursor"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="Page size; all teams if unset"),
+    db: Session = Depends(get_db),
+):
     """
     Get only teams that are available for players to join.
     A team is available if:
     1. It has fewer than 4 players
     2. It has no active game session (lobby, countdown, active)
+
+    Served from a cache that team joins, color changes and session changes invalidate per team. Pages are
+    ordered by team ID; with a ``limit`` the ``X-Next-Cursor`` header carries the ``after_id`` of the next page.
     """
-    teams = db.query(models.Team).all()
-    available_teams = []
-    for team in teams:
-        status, game_session_id, game_status = get_team_availability_status(team, db)
-        # Only include available teams
-        if status == "available":
-            members = [UserResponse.model_validate(user) for user in team.users]
-            # Debug log: print team and member colors
-            print(f"[API /team/available] Team {team.id} - {team.name}")
-            for user in team.users:
-                print(f"  Member: {user.username}, color: {user.color}")
-            team_out = AvailableTeam(
-                id=team.id,
-                name=team.name,
-                members=members,
-                player_count=len(team.users),
-                max_players=4,
-                status=status,
-                game_session_id=game_session_id,
-                game_status=game_status,
-            )
-            available_teams.append(team_out)
-    return available_teams
+    teams = available_teams_service.get_available_teams(db)
+    start = 0 if after_id is None else bisect_right([team.id for team in teams], after_id)
+    page = teams[start:] if limit is None else teams[start : start + limit]
+    set_next_cursor(response, page, limit)
+    return page
 
 
 @router.get("/", response_model=list[TeamResponse])
-def list_teams(db: Session = Depends(get_db)):
+def list_teams(
+    response: Response,
+    after_id: Optional[int] = Query(default=None, description="Return teams with an ID greater than this cursor"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="Page size; all teams if unset"),
+    include_members: bool = Query(default=True, description="Set to false to skip loading team members"),
+    db: Session = Depends(get_db),
+):
     """
     List all teams (for admin/debug purposes).
     For user-facing team listing, use /team/available instead.
-    """
-    teams = db.query(models.Team).all()
-    result = []
-
-    for team in teams:
-        members = [UserResponse.model_validate(user) for user in team.users]
-        team_out = TeamResponse(id=team.id, name=team.name, users=members)
-        result.append(team_out)
 
-    return result
+    Keyset-paginated by team ID: with a ``limit`` the ``X-Next-Cursor`` header carries the ``after_id`` of the
+    next page. Members of a page are loaded with one additional query.
+    """
+    if include_members:
+        query = select(models.Team).options(selectinload(models.Team.users))
+    else:
+        query = select(models.Team.id, models.Team.name)
+    if after_id is not None:
+        query = query.where(models.Team.id > after_id)
+    query = query.order_by(models.Team.id)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query)
+
+    if include_members:
+        page = [
+            TeamResponse(id=team.id, name=team.name, users=[UserResponse.model_validate(user) for user in team.users])
+            for team in rows.scalars()
+        ]
+    else:
+        page = [TeamResponse(id=team_id, name=name, users=[]) for team_id, name in rows]
+    set_next_cursor(response, page, limit)
+    return page
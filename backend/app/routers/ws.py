@@ -1,11 +1,13 @@
+import asyncio
 import json
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import database
 from ..schemas.v1.websocket.messages import IncomingMessage
+from ..services.lobby_directory import lobby_directory
 from ..utils.websocket_broadcast import (
     add_connection,
     broadcast_achievement,
@@ -23,17 +25,14 @@ from ..utils.websocket_broadcast import (
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
 
-# Dependency to get DB session
-def get_db():
-    db = database.SessionLocal()
-    try:
+# Dependency to get an asyncio DB session; WebSocket handlers run on the event loop
+async def get_db():
+    async with database.AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 @router.websocket("/game/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: int, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, session_id: int, db: AsyncSession = Depends(get_db)):
     await websocket.accept()
 
     add_connection(session_id, websocket)
@@ -137,3 +136,37 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int, db: Session
                 break
     finally:
         remove_connection(session_id, websocket)
+
+
+@router.websocket("/lobby")
+async def lobby_websocket_endpoint(websocket: WebSocket, db: AsyncSession = Depends(get_db)):
+    """
+    Lobby directory feed.
+
+    Sends a ``lobby_snapshot`` of all teams on connect and ``lobby_delta`` messages as teams change. Incoming
+    messages are ignored; they only keep the connection alive.
+    """
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    # The directory is loaded with sync queries on first use; run_sync keeps their I/O off the loop
+    queue = await db.run_sync(lambda session: lobby_directory.subscribe(loop, session))
+    await db.close()
+
+    async def forward_messages():
+        while True:
+            message = await queue.get()
+            if message is None:
+                # Fell behind; closing makes the client reconnect and resync from a fresh snapshot
+                await websocket.close()
+                return
+            await websocket.send_text(message)
+
+    sender = asyncio.create_task(forward_messages())
+    try:
+        while not sender.done():
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        lobby_directory.unsubscribe(queue)
@@ -72,7 +72,6 @@ class PuzzleStateResponse(BaseModel):
     type: Literal['memory', 'spatial', 'concentration', 'multitasking'] = Field(description="Puzzle type")
     data: Any = Field(description="Puzzle-specific data")
     status: Literal['active', 'completed', 'failed'] = Field(description="Puzzle status")
-    correct_answer: str = Field(description="Correct answer for the puzzle")
 
     class Config:
         from_attributes = True
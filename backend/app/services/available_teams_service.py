@@ -0,0 +1,160 @@
+import threading
+from typing import Optional
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..schemas.v1.api.responses import UserResponse
+from ..schemas.v1.core.player import AvailableTeam
+
+
+MAX_PLAYERS = 4
+# Session states that take a team out of the lobby
+OPEN_SESSION_STATES = ("lobby", "countdown", "active")
+
+
+class AvailableTeamsService:
+    """
+    Cached list of teams that players can join.
+
+    The list is loaded with one query (teams left-joined with their members, excluding teams with an open
+    session) and kept in memory. Team joins, color changes, session creation and session end invalidate the
+    affected team only; the next read reloads just the invalidated teams with the same query.
+    """
+
+    def __init__(self):
+        self._teams: Optional[dict[int, AvailableTeam]] = None
+        self._dirty: set[int] = set()
+        self._generation = 0
+        # Invalidation counter and the value it had when each team was last invalidated, so a reader never
+        # stores a team that was invalidated again after its snapshot
+        self._version = 0
+        self._invalidated: dict[int, int] = {}
+        self._readers = 0
+        self._lock = threading.Lock()
+
+    def get_available_teams(self, db: Session) -> list[AvailableTeam]:
+        """
+        Get all teams with fewer than four players and no open game session.
+
+        Concurrent readers each reload the teams they took out of the dirty set and merge them into the
+        current cache under the lock, so a slow reader cannot overwrite a newer result.
+
+        Args:
+            db: Database session
+
+        Returns:
+            list[AvailableTeam]: Available teams ordered by ID
+        """
+        with self._lock:
+            teams, dirty, generation, version = self._teams, self._dirty, self._generation, self._version
+            self._dirty = set()
+            self._readers += 1
+            scope = None if teams is None else dirty
+        try:
+            loaded = self._load(db, scope) if scope is None or scope else {}
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+                self._end_read()
+            raise
+
+        with self._lock:
+            try:
+                return self._merge(teams, scope, loaded, generation, version)
+            finally:
+                self._end_read()
+
+    def _merge(
+        self,
+        teams: Optional[dict[int, AvailableTeam]],
+        scope: Optional[set[int]],
+        loaded: dict[int, AvailableTeam],
+        generation: int,
+        version: int,
+    ) -> list[AvailableTeam]:
+        """Merge reloaded teams into the cache, except those invalidated after the snapshot. Caller holds the lock."""
+        # A full invalidation while loading means the result may be stale; serve it but do not keep it
+        if generation != self._generation:
+            merged = {} if scope is None else {t: team for t, team in teams.items() if t not in scope}
+            merged.update(loaded)
+            return sorted(merged.values(), key=lambda team: team.id)
+        merged = dict(self._teams or {})
+        if scope is None:
+            scope = set(merged) | set(loaded)
+        changed = {team_id for team_id in scope if self._invalidated.get(team_id, 0) > version}
+        for team_id in scope - changed:
+            if team_id in loaded:
+                merged[team_id] = loaded[team_id]
+            else:
+                merged.pop(team_id, None)
+        if self._teams is None:
+            # Teams invalidated during a full load are left out above and still need loading
+            self._dirty |= changed
+        self._teams = merged
+        return sorted(merged.values(), key=lambda team: team.id)
+
+    def invalidate(self, team_id: Optional[int]) -> None:
+        """Mark a team's availability as changed."""
+        if team_id is None:
+            return
+        with self._lock:
+            self._dirty.add(team_id)
+            self._version += 1
+            self._invalidated[team_id] = self._version
+
+    def clear(self) -> None:
+        """Drop the whole cache."""
+        with self._lock:
+            self._teams = None
+            self._dirty = set()
+            self._generation += 1
+
+    def _end_read(self) -> None:
+        """Finish a read; invalidation versions are only needed while reads are in flight. Caller holds the lock."""
+        self._readers -= 1
+        if self._readers == 0:
+            self._invalidated.clear()
+
+    def _load(self, db: Session, team_ids: Optional[set[int]] = None) -> dict[int, AvailableTeam]:
+        """Load available teams, optionally only the given ones, with a single query."""
+        open_session = exists().where(
+            models.GameSession.team_id == models.Team.id,
+            models.GameSession.status.in_(OPEN_SESSION_STATES),
+        )
+        query = (
+            select(models.Team.id, models.Team.name, models.User)
+            .outerjoin(models.User, models.User.team_id == models.Team.id)
+            .where(~open_session)
+            .order_by(models.Team.id, models.User.id)
+        )
+        if team_ids is not None:
+            query = query.where(models.Team.id.in_(team_ids))
+
+        members: dict[int, list[UserResponse]] = {}
+        names: dict[int, str] = {}
+        for team_id, team_name, user in db.execute(query):
+            names[team_id] = team_name
+            team_members = members.setdefault(team_id, [])
+            if user is not None:
+                team_members.append(UserResponse.model_validate(user))
+
+        return {
+            team_id: AvailableTeam(
+                id=team_id,
+                name=names[team_id],
+                members=team_members,
+                player_count=len(team_members),
+                max_players=MAX_PLAYERS,
+                status="available",
+                game_session_id=None,
+                game_status=None,
+            )
+            for team_id, team_members in members.items()
+            if len(team_members) < MAX_PLAYERS
+        }
+
+
+# Global instance
+available_teams_service = AvailableTeamsService()
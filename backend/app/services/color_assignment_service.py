@@ -1,6 +1,9 @@
 import logging
+import threading
 from typing import Any, Optional
 
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .. import models
@@ -15,10 +18,22 @@ class ColorAssignmentService:
     def __init__(self, color_scheme: Optional[list[str]] = None):
         self.color_scheme = color_scheme or ["red", "blue", "yellow", "green"]
         self.fallback_color = "gray"
+        # Per-team bitmask of occupied colors, bit i standing for color_scheme[i]
+        self._masks: dict[int, int] = {}
+        self._locks: dict[int, threading.Lock] = {}
+        self._lock = threading.Lock()
 
     def assign_color_to_user(self, user_id: int, team_id: int, db: Session) -> dict[str, Any]:
         """
-        Assign unique color to user within team, with retry logic for race conditions.
+        Assign unique color to user within team.
+
+        Args:
+            user_id: ID of the user
+            team_id: ID of the user's team
+            db: Database session
+
+        Returns:
+            Dict[str, Any]: {"success": bool, "color": str, "message": str}
         """
         try:
             user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -27,50 +42,114 @@ class ColorAssignmentService:
             team = db.query(models.Team).filter(models.Team.id == team_id).first()
             if not team:
                 return {"success": False, "color": "", "message": "Team not found"}
+            if user.team_id != team_id:
+                return {"success": False, "color": "", "message": "User is not a member of this team"}
             if user.color:
                 return {"success": True, "color": user.color, "message": "User already has color assigned"}
-            # Retry logic for race conditions
-            for attempt in range(len(self.color_scheme)):
-                team_members = db.query(models.User).filter(models.User.team_id == team_id).all()
-                used_colors = [member.color for member in team_members if member.color]
-                available_color = self._find_available_color(used_colors)
-                if available_color and available_color != self.fallback_color:
-                    user.color = available_color
-                    try:
-                        db.commit()
-                    except Exception:
-                        db.rollback()
-                        # Likely a unique constraint violation, try next color
-                        continue
-                    # Re-fetch to check for uniqueness
-                    conflict = (
-                        db.query(models.User)
-                        .filter(
-                            models.User.team_id == team_id,
-                            models.User.color == available_color,
-                            models.User.id != user.id,
-                        )
-                        .first()
-                    )
-                    if conflict:
-                        # Conflict detected, try next color
-                        user.color = None
-                        db.commit()
-                        continue
-                    logger.info(
-                        f"Assigned color {available_color} to user {user_id} in team {team_id} (attempt {attempt + 1})",
-                    )
-                    return {"success": True, "color": available_color, "message": "Color assigned successfully"}
-            logger.warning(f"No available colors for user {user_id} in team {team_id} after retries")
-            return {
-                "success": False,
-                "color": self.fallback_color,
-                "message": "No available colors in team after retries",
-            }
+            color = self.allocate_color(user_id, team_id, db)
+            if color is None:
+                logger.warning(f"No available colors for user {user_id} in team {team_id}")
+                return {"success": False, "color": self.fallback_color, "message": "No available colors in team"}
+            logger.info(f"Assigned color {color} to user {user_id} in team {team_id}")
+            return {"success": True, "color": color, "message": "Color assigned successfully"}
         except Exception as e:
+            db.rollback()
             logger.error(f"Error assigning color to user {user_id}: {e}")
             return {"success": False, "color": self.fallback_color, "message": f"Error assigning color: {str(e)}"}
 
+    def allocate_color(self, user_id: int, team_id: int, db: Session, join: bool = False) -> Optional[str]:
+        """
+        Give a user without a color the first free color of a team, in one commit.
+
+        The free color is reserved in the team's occupancy bitmask under the team lock, then written with
+        ``UPDATE users SET color WHERE id = user AND team_id = team AND color IS NULL`` (with ``join``, the
+        user is moved into the team by the same statement instead). The lock is not held during the write;
+        ``uq_team_color`` rejects a color taken behind the bitmask's back (another process, a stale mask), in
+        which case the mask is reloaded and the next free color is tried.
+
+        Args:
+            user_id: ID of the user
+            team_id: ID of the team
+            db: Database session
+            join: Move the user into the team; only for callers that also invalidate the caches of the
+                user's previous team
+
+        Returns:
+            Optional[str]: The user's color, or None if every color of the scheme is taken (nothing is written)
+        """
+        for _ in range(len(self.color_scheme) + 1):
+            with self._team_lock(team_id):
+                mask = self._masks.get(team_id)
+                if mask is None:
+                    mask = self._load_mask(team_id, db)
+                index = _lowest_clear_bit(mask)
+                if index >= len(self.color_scheme):
+                    self._masks[team_id] = mask
+                    return None
+                self._masks[team_id] = mask | (1 << index)
+            color = self.color_scheme[index]
+
+            try:
+                statement = update(models.User).where(models.User.id == user_id, models.User.color.is_(None))
+                if join:
+                    statement = statement.values(team_id=team_id, color=color)
+                else:
+                    statement = statement.where(models.User.team_id == team_id).values(color=color)
+                result = db.execute(statement)
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                self.invalidate(team_id)
+                continue
+            except Exception:
+                db.rollback()
+                self._release(team_id, index)
+                raise
+
+            if result.rowcount == 0:
+                # The user already had a color (or does not exist, or is not a member); hand the reserved one back
+                self._release(team_id, index)
+                return db.execute(select(models.User.color).where(models.User.id == user_id)).scalar_one_or_none()
+            return color
+
+        logger.warning(f"Color allocation for user {user_id} in team {team_id} kept conflicting")
+        return None
+
+    def invalidate(self, team_id: Optional[int]) -> None:
+        """Forget a team's occupancy bitmask after its colors changed outside of ``allocate_color``."""
+        if team_id is None:
+            return
+        with self._team_lock(team_id):
+            self._masks.pop(team_id, None)
+
+    def clear(self) -> None:
+        """Forget all occupancy bitmasks."""
+        with self._lock:
+            self._masks.clear()
+            self._locks.clear()
+
+    def _team_lock(self, team_id: int) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(team_id)
+            if lock is None:
+                lock = self._locks[team_id] = threading.Lock()
+            return lock
+
+    def _release(self, team_id: int, index: int) -> None:
+        with self._team_lock(team_id):
+            mask = self._masks.get(team_id)
+            if mask is not None:
+                self._masks[team_id] = mask & ~(1 << index)
+
+    def _load_mask(self, team_id: int, db: Session) -> int:
+        """Build a team's occupancy bitmask from its members' colors."""
+        positions = {color: index for index, color in enumerate(self.color_scheme)}
+        mask = 0
+        for color in db.execute(select(models.User.color).where(models.User.team_id == team_id)).scalars():
+            if color in positions:
+                mask |= 1 << positions[color]
+        return mask
+
     def validate_team_colors(self, team_id: int, db: Session) -> dict[str, Any]:
         """
         Validate color uniqueness within team.
@@ -162,6 +241,7 @@ class ColorAssignmentService:
                     member.color = self.fallback_color
 
             db.commit()
+            self.invalidate(team_id)
 
             return {
                 "success": True,
@@ -195,6 +275,12 @@ class ColorAssignmentService:
     def set_color_scheme(self, color_scheme: list[str]) -> None:
         """Set a new color scheme."""
         self.color_scheme = color_scheme.copy()
+        self.clear()
+
+
+def _lowest_clear_bit(mask: int) -> int:
+    """Index of the lowest zero bit of a mask."""
+    return (~mask & (mask + 1)).bit_length() - 1
 
 
 # Global instance for dependency injection
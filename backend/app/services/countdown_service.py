@@ -1,169 +1,147 @@
 import asyncio
-from datetime import datetime, timezone
-import random
+from concurrent.futures import Future
 import threading
+from typing import Any, Optional
 
-from sqlalchemy.orm import Session
-
-from .. import database, models
-from ..utils.websocket_broadcast import broadcast_state
+from .. import database
+from ..utils.broadcast_dispatcher import broadcast_dispatcher
+from ..utils.websocket_broadcast import send_state
+from .session_activation_service import session_activation_service
 
 
 class CountdownService:
+    """
+    Runs game countdowns as cancellable tasks on one shared event loop.
+
+    The service is attached to the application's loop at startup. Without one (scripts, tests with a bare
+    app) it lazily starts a single private loop thread, so the thread count stays constant however many
+    countdowns run. The activation at the end of a countdown is blocking database work and runs in the
+    loop's default executor; the state broadcast goes through the broadcast dispatcher.
+    """
+
     def __init__(self):
-        self.active_countdowns: dict[int, asyncio.Task] = {}
-        self.countdown_locks: dict[int, threading.Lock] = {}
+        self.active_countdowns: dict[int, Future] = {}
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._private_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Run countdowns on the running event loop. Must be called from a coroutine on that loop."""
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self) -> None:
+        """Cancel all countdowns and detach from the event loop."""
+        with self._lock:
+            futures = list(self.active_countdowns.values())
+        for future in futures:
+            future.cancel()
+        self._loop = None
 
     def start_countdown(self, session_id: int, duration_seconds: int = 5) -> bool:
         """Start a countdown for a game session"""
-        with self.countdown_locks.setdefault(session_id, threading.Lock()):
+        with self._lock:
             if session_id in self.active_countdowns:
                 return False  # Countdown already running
 
-            # Create new event loop for this thread
             try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-                # Start countdown task
-                task = loop.create_task(self._run_countdown(session_id, duration_seconds))
-                self.active_countdowns[session_id] = task
-
-                # Run the loop in a separate thread
-                thread = threading.Thread(target=self._run_loop, args=(loop,), daemon=True)
-                thread.start()
-
-                return True
+                future = asyncio.run_coroutine_threadsafe(
+                    self._run_countdown(session_id, duration_seconds),
+                    self._get_loop(),
+                )
             except Exception as e:
                 print(f"Failed to start countdown for session {session_id}: {e}")
                 return False
+            self.active_countdowns[session_id] = future
+            self.started += 1
+
+        future.add_done_callback(lambda done: self._finish(session_id, done))
+        return True
 
     def stop_countdown(self, session_id: int) -> bool:
         """Stop a countdown for a game session"""
-        with self.countdown_locks.setdefault(session_id, threading.Lock()):
-            if session_id not in self.active_countdowns:
-                return False
-
-            task = self.active_countdowns[session_id]
-            task.cancel()
-            del self.active_countdowns[session_id]
-            return True
+        with self._lock:
+            future = self.active_countdowns.pop(session_id, None)
+        if future is None:
+            return False
+        future.cancel()
+        return True
 
     def is_countdown_running(self, session_id: int) -> bool:
         """Check if a countdown is running for a session"""
         return session_id in self.active_countdowns
 
-    def _generate_memory_puzzle(self):
-        """Generate a memory puzzle"""
-        colors = ["red", "blue", "yellow", "green"]
-        numbers = list(range(1, len(colors) + 1))
-        random.shuffle(colors)
-        mapping = {str(num): color for num, color in zip(numbers, colors)}
-        question_number = random.choice(numbers)
-        correct_answer = mapping[str(question_number)]
-        data = {"mapping": mapping, "question_number": str(question_number), "choices": colors}
-        return data, correct_answer
-
-    def _generate_concentration_puzzle(self, num_pairs: int = 10):
-        """Generate a concentration puzzle"""
-        colors = ["red", "blue", "yellow", "green", "purple", "orange"]
-        pairs = []
-        correct_index = random.randint(0, num_pairs - 1)
-        for i in range(num_pairs):
-            if i == correct_index:
-                color_word = random.choice(colors)
-                circle_color = color_word
-                is_match = True
-            else:
-                color_word = random.choice(colors)
-                available_colors = [c for c in colors if c != color_word]
-                circle_color = random.choice(available_colors)
-                is_match = False
-            pairs.append({"color_word": color_word, "circle_color": circle_color, "is_match": is_match})
-        data = {
-            "pairs": pairs,
-            "duration": 2,  # seconds per pair
-        }
-        correct_answer = str(correct_index)
-        return data, correct_answer
-
-    def _create_initial_puzzle_for_user(self, user_id: int, session_id: int, db: Session):
-        """Create an initial puzzle for a user"""
-        puzzle_types = ["memory", "spatial", "concentration", "multitasking"]
-        puzzle_type = random.choice(puzzle_types)
-
-        if puzzle_type == "memory":
-            data, correct_answer = self._generate_memory_puzzle()
-        elif puzzle_type == "spatial":
-            data = {}
-            correct_answer = "solved"
-        elif puzzle_type == "concentration":
-            data, correct_answer = self._generate_concentration_puzzle()
-        elif puzzle_type == "multitasking":
-            data = {}
-            correct_answer = "solved"
-
-        new_puzzle = models.Puzzle()
-        new_puzzle.type = puzzle_type
-        new_puzzle.data = data
-        new_puzzle.correct_answer = correct_answer
-        new_puzzle.status = "active"
-        new_puzzle.game_session_id = session_id
-        new_puzzle.user_id = user_id
-        db.add(new_puzzle)
-        return new_puzzle
-
-    async def _run_countdown(self, session_id: int, duration_seconds: int):
+    def get_stats(self) -> dict[str, Any]:
+        """Counts of running and finished countdowns, and the loop they run on."""
+        with self._lock:
+            return {
+                "running": len(self.active_countdowns),
+                "started": self.started,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "loop": "application" if self._loop is not None else "private",
+            }
+
+    async def _run_countdown(self, session_id: int, duration_seconds: int) -> bool:
         """Run the countdown and transition to active state"""
         try:
             # Wait for the countdown duration
             await asyncio.sleep(duration_seconds)
 
-            # Transition to active state
-            db = database.SessionLocal()
-            try:
-                session = db.query(models.GameSession).filter(models.GameSession.id == session_id).first()
-                if session and session.status == "countdown":
-                    session.status = "active"
-                    session.started_at = datetime.now(timezone.utc)
+            # Transition to active state, reset points and hand out the initial puzzles in one bulk activation
+            states = await asyncio.get_running_loop().run_in_executor(None, self._activate, session_id)
 
-                    # Initialize all players with starting points (15)
-                    team_users = db.query(models.User).filter(models.User.team_id == session.team_id).all()
-                    for user in team_users:
-                        user.points = 15  # Reset to starting points
+            if session_id in states:
+                # Broadcast state update
+                broadcast_dispatcher.submit(send_state, session_id, states[session_id])
 
-                    # Create initial puzzles for all players
-                    for user in team_users:
-                        self._create_initial_puzzle_for_user(user.id, session_id, db)
-
-                    db.commit()
-
-                    # Broadcast state update
-                    await broadcast_state(session_id, db)
-
-                    print(
-                        f"Countdown completed for session {session_id}. Game is now active with {len(team_users)} players.",
-                    )
-                else:
-                    print(f"Session {session_id} not found or not in countdown state")
-            finally:
-                db.close()
+                print(
+                    f"Countdown completed for session {session_id}. "
+                    f"Game is now active with {len(states[session_id]['players'])} players.",
+                )
+            else:
+                print(f"Session {session_id} not found or not in countdown state")
+            return True
 
         except asyncio.CancelledError:
             print(f"Countdown cancelled for session {session_id}")
+            raise
         except Exception as e:
             print(f"Error during countdown for session {session_id}: {e}")
-        finally:
-            # Clean up
-            if session_id in self.active_countdowns:
-                del self.active_countdowns[session_id]
+            return False
 
-    def _run_loop(self, loop: asyncio.AbstractEventLoop):
-        """Run the event loop in a separate thread"""
+    def _activate(self, session_id: int) -> dict[int, dict[str, Any]]:
+        db = database.SessionLocal()
         try:
-            loop.run_forever()
+            return session_activation_service.activate([session_id], db)
         finally:
-            loop.close()
+            db.close()
+
+    def _finish(self, session_id: int, future: Future) -> None:
+        """Done callback of a countdown: drop it from the running countdowns and count the outcome."""
+        with self._lock:
+            if self.active_countdowns.get(session_id) is future:
+                del self.active_countdowns[session_id]
+            if future.cancelled():
+                self.cancelled += 1
+            elif future.exception() is None and future.result():
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """The application loop, or the private loop thread (started on first use). Caller holds the lock."""
+        if self._loop is not None and not self._loop.is_closed():
+            return self._loop
+        if self._private_loop is None:
+            self._private_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._private_loop.run_forever, name="countdowns", daemon=True)
+            thread.start()
+        return self._private_loop
 
 
 # Global instance
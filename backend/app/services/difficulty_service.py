@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import random
+import threading
+from typing import Any, Optional
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from .puzzle_generator import PUZZLE_TYPES
+
+
+# Weight of the newest observation in the rolling averages
+EWMA_ALPHA = 0.3
+# Accuracy the engine steers every player towards
+TARGET_ACCURACY = 0.75
+# Expected solve time per puzzle type at medium difficulty, in seconds
+TARGET_SOLVE_SECONDS = {"memory": 5.0, "spatial": 10.0, "concentration": 22.0, "multitasking": 8.0}
+# Streak length (in either direction) that shifts difficulty by one full step
+STREAK_STEP = 3
+
+# Difficulty parameter ranges per puzzle type as (name, easiest, hardest); medium matches the generator defaults
+DIFFICULTY_PARAMETERS: dict[str, tuple[str, int, int]] = {
+    "memory": ("num_colors", 3, 5),
+    "spatial": ("num_obstacles", 5, 11),
+    "concentration": ("num_pairs", 6, 14),
+    "multitasking": ("time_limit", 14, 6),
+}
+
+
+@dataclass
+class PuzzleTypeStats:
+    """Rolling statistics of one player on one puzzle type."""
+
+    solve_time_ewma: Optional[float] = None
+    accuracy_ewma: float = TARGET_ACCURACY
+    streak: int = 0  # Positive: consecutive solves, negative: consecutive failures
+    attempts: int = 0
+
+    def update(self, correct: bool, solve_seconds: Optional[float]) -> None:
+        self.attempts += 1
+        self.accuracy_ewma += EWMA_ALPHA * ((1.0 if correct else 0.0) - self.accuracy_ewma)
+        if correct:
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            if solve_seconds is not None:
+                if self.solve_time_ewma is None:
+                    self.solve_time_ewma = solve_seconds
+                else:
+                    self.solve_time_ewma += EWMA_ALPHA * (solve_seconds - self.solve_time_ewma)
+        else:
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+
+
+class DifficultyService:
+    """
+    Adaptive puzzle selection driven by in-memory per-player statistics.
+
+    Every answer updates an EWMA of solve time and accuracy plus a streak counter per player and puzzle type
+    in O(1). The next puzzle type and its difficulty parameters are chosen from these statistics without
+    touching the database; the statistics are checkpointed to ``player_puzzle_stats`` periodically.
+    """
+
+    def __init__(self):
+        self._stats: dict[tuple[int, str], PuzzleTypeStats] = {}
+        self._dirty: set[tuple[int, str]] = set()
+        self._lock = threading.Lock()
+
+    def record_result(self, user_id: int, puzzle_type: str, correct: bool, solve_seconds: Optional[float]) -> None:
+        """Update a player's statistics with one answer."""
+        key = (user_id, puzzle_type)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = PuzzleTypeStats()
+            stats.update(correct, solve_seconds)
+            self._dirty.add(key)
+
+    def get_stats(self, user_id: int, puzzle_type: str) -> Optional[PuzzleTypeStats]:
+        """Get a player's statistics for a puzzle type, if any were recorded."""
+        return self._stats.get((user_id, puzzle_type))
+
+    def choose_next(self, user_id: int) -> tuple[str, Optional[dict[str, Any]]]:
+        """
+        Choose the next puzzle type and difficulty for a player.
+
+        Types the player has seen less often and types with lower accuracy are favored, so practice spreads
+        over all types and weak spots come up more often.
+
+        Returns:
+            tuple[str, Optional[dict]]: ``(puzzle_type, difficulty)``
+        """
+        weights = []
+        for puzzle_type in PUZZLE_TYPES:
+            stats = self._stats.get((user_id, puzzle_type))
+            if stats is None:
+                weights.append(2.0)
+            else:
+                weights.append(1.0 + (1.0 - stats.accuracy_ewma) + 1.0 / (1 + stats.attempts))
+        puzzle_type = random.choices(PUZZLE_TYPES, weights=weights)[0]
+        return puzzle_type, self.difficulty_for(user_id, puzzle_type)
+
+    def difficulty_for(self, user_id: int, puzzle_type: str) -> Optional[dict[str, Any]]:
+        """
+        Get the difficulty parameters for a player and puzzle type.
+
+        Returns None (generator defaults) until the player has answered a puzzle of that type.
+        """
+        stats = self._stats.get((user_id, puzzle_type))
+        if stats is None or puzzle_type not in DIFFICULTY_PARAMETERS:
+            return None
+        name, easiest, hardest = DIFFICULTY_PARAMETERS[puzzle_type]
+        level = self._level(puzzle_type, stats)
+        return {name: int(round(easiest + (hardest - easiest) * level))}
+
+    def _level(self, puzzle_type: str, stats: PuzzleTypeStats) -> float:
+        """Difficulty level between 0 (easiest) and 1 (hardest); 0.5 is medium."""
+        level = 0.5 + (stats.accuracy_ewma - TARGET_ACCURACY)
+        if stats.solve_time_ewma is not None:
+            target = TARGET_SOLVE_SECONDS[puzzle_type]
+            # Faster than target raises the level, slower lowers it, capped at a quarter step
+            level += max(-0.25, min(0.25, (target - stats.solve_time_ewma) / target * 0.25))
+        level += max(-1, min(1, stats.streak / STREAK_STEP)) * 0.25
+        return max(0.0, min(1.0, level))
+
+    def load(self, db: Session) -> int:
+        """
+        Load checkpointed statistics, e.g. at startup.
+
+        Returns:
+            int: Number of loaded entries
+        """
+        rows = db.query(models.PlayerPuzzleStats).all()
+        with self._lock:
+            for row in rows:
+                self._stats[(row.user_id, row.puzzle_type)] = PuzzleTypeStats(
+                    solve_time_ewma=row.solve_time_ewma,
+                    accuracy_ewma=row.accuracy_ewma,
+                    streak=row.streak,
+                    attempts=row.attempts,
+                )
+        return len(rows)
+
+    def checkpoint(self, db: Session) -> int:
+        """
+        Persist all statistics changed since the last checkpoint with one upsert.
+
+        Returns:
+            int: Number of written entries
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                {
+                    "user_id": user_id,
+                    "puzzle_type": puzzle_type,
+                    "solve_time_ewma": stats.solve_time_ewma,
+                    "accuracy_ewma": stats.accuracy_ewma,
+                    "streak": stats.streak,
+                    "attempts": stats.attempts,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+                for user_id, puzzle_type in dirty
+                for stats in (self._stats[(user_id, puzzle_type)],)
+            ]
+        if not rows:
+            return 0
+        statement = insert(models.PlayerPuzzleStats)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "puzzle_type"],
+            set_={
+                column: statement.excluded[column]
+                for column in ("solve_time_ewma", "accuracy_ewma", "streak", "attempts", "updated_at")
+            },
+        )
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+        return len(rows)
+
+    def clear(self) -> None:
+        """Forget all statistics."""
+        with self._lock:
+            self._stats.clear()
+            self._dirty.clear()
+
+
+# Global instance
+difficulty_service = DifficultyService()
@@ -1,113 +1,233 @@
-from datetime import datetime, timezone
+import threading
+from typing import Any, Iterable, Optional
 
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import models
 from ..utils.websocket_broadcast import broadcast_state
+from .available_teams_service import available_teams_service
+from .game_state_machine import LiveSession, game_state_machine
+from .game_stats_service import game_stats_service
+from .leaderboard_service import leaderboard_service
+from .lobby_directory import lobby_directory
+from .matchmaking_service import matchmaking_service
+from .percentile_service import percentile_service
 
 
 class GameEndService:
-    """Service to handle game end detection and state transitions."""
+    """
+    Service to handle game end detection and state transitions.
+
+    Every active session has a counter of players who still have points. It is set when the session is
+    activated and decremented once eliminations are committed, so a game ends in the same transaction as its
+    last elimination, at O(1) cost per elimination. Sessions without a counter (e.g. activated before a
+    restart) are counted with one query on each elimination until the startup reconciliation counts them.
+
+    ``on_finished`` is the after-commit hook: whoever eliminates players or ends a game, here or through the
+    state machine, calls it once the transaction is committed. It is the only place that applies
+    eliminations to the counters and the only place with end-of-game side effects, so a rollback leaves
+    neither behind.
+    """
 
     def __init__(self):
-        pass
+        self._alive: dict[int, int] = {}
+        self._lock = threading.Lock()
 
-    def check_and_handle_game_end(self, db: Session) -> list[int]:
+    def start_sessions(self, alive_players: dict[int, int], db: Session) -> list[int]:
         """
-        Check for game end conditions and handle transitions to finished state.
+        Set the counters of newly activated sessions; sessions without players end right away.
 
         Args:
-            db: Database session
+            alive_players: Number of players per activated session
+            db: Database session; ended sessions are committed
 
         Returns:
-            List[int]: List of session IDs that were updated
+            List[int]: IDs of the sessions that ended
         """
-        updated_sessions = []
+        with self._lock:
+            self._alive.update(alive_players)
+        ended = [
+            self._end_game_session(game_state_machine.get(session_id, db), db)
+            for session_id, alive in alive_players.items()
+            if alive <= 0
+        ]
+        if ended:
+            db.commit()
+            self.on_finished(ended, db)
+        return [session.id for session in ended]
+
+    def players_eliminated(self, session_id: int, count: int, db: Session) -> Optional[LiveSession]:
+        """
+        Count players of a session who just ran out of points, and end the session when nobody is left.
 
-        try:
-            # Get all active game sessions
-            active_sessions = db.query(models.GameSession).filter(models.GameSession.status == "active").all()
+        The caller has already written the points and commits; the session transition is flushed into the
+        same transaction. The counter is left alone: after committing, the caller passes the eliminations
+        and an ended session to ``on_finished``.
 
-            for session in active_sessions:
-                if self._should_end_game(session, db):
-                    self._end_game_session(session, db)
-                    updated_sessions.append(session.id)
+        Args:
+            session_id: ID of the game session
+            count: Number of players who were eliminated
+            db: Database session
 
-            # Commit all changes
-            if updated_sessions:
-                db.commit()
+        Returns:
+            Optional[LiveSession]: The session if it ended, else None
+        """
+        if count <= 0 or not game_state_machine.is_active(session_id, db):
+            return None
+        alive = self._alive.get(session_id)
+        if alive is not None:
+            alive -= count
+        else:
+            # Not counted yet: the count includes these eliminations once the caller's points are written
+            db.flush()
+            session = game_state_machine.get(session_id, db)
+            alive = self._alive_counts({session.team_id}, db).get(session.team_id, 0)
+        if alive > 0:
+            return None
+        return self._end_game_session(game_state_machine.get(session_id, db), db)
+
+    def on_finished(
+        self,
+        sessions: Iterable[LiveSession],
+        db: Session,
+        eliminated: Optional[dict[int, int]] = None,
+    ) -> None:
+        """
+        Apply committed eliminations and the side effects of games whose end has been committed.
 
-        except Exception as e:
-            print(f"Error in game end detection: {e}")
+        Eliminations are subtracted from the session counters. The teams of finished games become joinable
+        again, the games enter the leaderboards and the performance distributions, and the lobby is
+        refreshed. Only call this after the commit, so a rolled back transaction leaves no trace.
 
-        return updated_sessions
+        Args:
+            sessions: Finished sessions
+            db: Database session
+            eliminated: Number of players who ran out of points per session
+        """
+        sessions = list(sessions)
+        finished = {session.id for session in sessions}
+        emptied = []
+        with self._lock:
+            for session_id, count in (eliminated or {}).items():
+                alive = self._alive.get(session_id)
+                if alive is None or session_id in finished:
+                    continue
+                self._alive[session_id] = max(0, alive - count)
+                if self._alive[session_id] == 0:
+                    emptied.append(session_id)
+        # Concurrent transactions each saw the other's last player still alive; end such games now
+        late = [
+            self._end_game_session(game_state_machine.get(session_id, db), db)
+            for session_id in emptied
+            if game_state_machine.is_active(session_id, db)
+        ]
+        if late:
+            db.commit()
+            sessions += late
+        for session in sessions:
+            self.forget(session.id)
+            available_teams_service.invalidate(session.team_id)
+            matchmaking_service.invalidate(session.team_id)
+            try:
+                leaderboard_service.record(session, db)
+                accuracy = game_stats_service.team_accuracy(session.id, db)
+                percentile_service.record_game(session.survival_time_seconds, accuracy)
+            except Exception as e:
+                print(f"Error recording results of game session {session.id}: {e}")
+        lobby_directory.refresh_teams({session.team_id for session in sessions}, db)
+
+    def alive_players(self, session_id: int) -> Optional[int]:
+        """Number of players of a session who still have points, if the session is counted."""
+        return self._alive.get(session_id)
+
+    def forget(self, session_id: int) -> None:
+        """Drop the counter of a session that ended elsewhere."""
+        with self._lock:
+            self._alive.pop(session_id, None)
+
+    def clear(self) -> None:
+        """Forget all counters."""
+        with self._lock:
+            self._alive.clear()
 
-    def _should_end_game(self, session: models.GameSession, db: Session) -> bool:
+    def check_and_handle_game_end(self, db: Session) -> list[int]:
         """
-        Check if a game session should end (all players eliminated).
+        Recount the players of all active sessions and end sessions without players left.
+
+        Game ends during play are detected by ``players_eliminated``; this reconciliation runs at startup.
+        Active sessions come from the game state machine; their players are counted with one query, and all
+        ended sessions are persisted with one flush.
 
         Args:
-            session: Game session to check
             db: Database session
 
         Returns:
-            bool: True if game should end, False otherwise
+            List[int]: List of session IDs that were updated
         """
-        try:
-            # Get all users in the team
-            team_users = db.query(models.User).filter(models.User.team_id == session.team_id).all()
+        ended = []
 
-            if not team_users:
-                # No users in team, end the game
-                return True
+        try:
+            active_sessions = game_state_machine.active_sessions(db)
+            alive_counts = self._alive_counts({session.team_id for session in active_sessions}, db)
+            with self._lock:
+                for session in active_sessions:
+                    self._alive[session.id] = alive_counts.get(session.team_id, 0)
 
-            # Check if all players are eliminated (points <= 0)
-            all_eliminated = all(user.points <= 0 for user in team_users)
+            for session in active_sessions:
+                if session.team_id not in alive_counts:
+                    ended.append(self._end_game_session(session, db, flush=False))
 
-            return all_eliminated
+            # Commit all changes
+            if ended:
+                game_state_machine.flush(db)
+                db.commit()
+                self.on_finished(ended, db)
 
         except Exception as e:
-            print(f"Error checking game end condition for session {session.id}: {e}")
-            return False
+            print(f"Error in game end detection: {e}")
 
-    def _end_game_session(self, session: models.GameSession, db: Session) -> None:
+        return [session.id for session in ended]
+
+    def _alive_counts(self, team_ids: set[int], db: Session) -> dict[int, int]:
+        """Players who still have points per team, for teams among ``team_ids`` that have any."""
+        if not team_ids:
+            return {}
+        return dict(
+            db.execute(
+                select(models.User.team_id, func.count(models.User.id))
+                .where(models.User.team_id.in_(team_ids), models.User.points > 0)
+                .group_by(models.User.team_id),
+            ).all(),
+        )
+
+    def _end_game_session(self, session: Any, db: Session, flush: bool = True) -> LiveSession:
         """
         End a game session by transitioning to finished state.
 
         Args:
             session: Game session to end
             db: Database session
-        """
-        try:
-            # Transition to finished state
-            session.status = "finished"
-            session.ended_at = datetime.now(timezone.utc)
-
-            # Calculate survival time
-            if session.started_at:
-                # Handle both timezone-aware and timezone-naive datetimes
-                started_at = session.started_at
-                ended_at = session.ended_at
-
-                # If started_at is timezone-naive, assume UTC
-                if started_at.tzinfo is None:
-                    started_at = started_at.replace(tzinfo=timezone.utc)
-
-                survival_time = (ended_at - started_at).total_seconds()
-                session.survival_time_seconds = int(survival_time)
-
-            print(f"Game session {session.id} ended. Survival time: {session.survival_time_seconds} seconds")
+            flush: Write the transition right away; the caller commits and then calls ``on_finished``
 
-        except Exception as e:
-            print(f"Error ending game session {session.id}: {e}")
-
-    async def broadcast_game_end(self, session_id: int, db: Session) -> None:
+        Returns:
+            LiveSession: The finished session
+        """
+        # Transition to finished state; the state machine sets ended_at and the survival time
+        ended = game_state_machine.transition(session.id, "finished", db)
+        if flush:
+            game_state_machine.flush(db)
+        print(f"Game session {session.id} ended. Survival time: {ended.survival_time_seconds} seconds")
+        return ended
+
+    async def broadcast_game_end(self, session_id: int, db: AsyncSession) -> None:
         """
         Broadcast game end state to all connected clients.
 
         Args:
             session_id: Game session ID
-            db: Database session
+            db: Asyncio database session
         """
         try:
             await broadcast_state(session_id, db)
@@ -0,0 +1,265 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..utils.broadcast_dispatcher import broadcast_dispatcher
+from ..utils.datetimes import as_utc
+from ..utils.websocket_broadcast import broadcast_message, connections
+
+
+# Allowed session status transitions
+TRANSITIONS: dict[str, tuple[str, ...]] = {
+    "lobby": ("countdown",),
+    "countdown": ("active",),
+    "active": ("finished",),
+    "finished": (),  # No transitions from finished
+}
+
+
+class InvalidTransition(ValueError):
+    """A session status change that the state machine does not allow."""
+
+
+@dataclass
+class LiveSession:
+    """Status and timestamps of one game session; attribute-compatible with ``GameSessionResponse``."""
+
+    id: int
+    team_id: int
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    survival_time_seconds: Optional[int] = None
+
+    @classmethod
+    def from_row(cls, row: Any) -> "LiveSession":
+        return cls(
+            id=row.id,
+            team_id=row.team_id,
+            status=row.status,
+            created_at=as_utc(row.created_at),
+            started_at=as_utc(row.started_at),
+            ended_at=as_utc(row.ended_at),
+            survival_time_seconds=row.survival_time_seconds,
+        )
+
+
+class GameStateMachine:
+    """
+    Authoritative in-memory status of every live (not finished) game session.
+
+    All status changes go through ``transition``, which validates them against ``TRANSITIONS``, sets the
+    timestamps and the survival time, and announces the change to connected clients. Transitions are applied
+    in memory first and written behind: ``flush`` persists all pending ones with a single executemany UPDATE.
+    Request handlers flush in their own transaction; background transitions are flushed in batches. Status
+    checks ("is this session active?") are dictionary lookups. Sessions are loaded on first use; sessions
+    created elsewhere are picked up with ``track`` or, as a fallback, a single-row lookup.
+    """
+
+    def __init__(self):
+        self._sessions: dict[int, LiveSession] = {}
+        self._by_team: dict[int, int] = {}
+        self._dirty: set[int] = set()
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def load(self, db: Session) -> int:
+        """
+        Load all sessions that are not finished, e.g. at startup.
+
+        Returns:
+            int: Number of loaded sessions
+        """
+        rows = db.execute(select(models.GameSession).where(models.GameSession.status != "finished")).scalars().all()
+        with self._lock:
+            for row in rows:
+                if row.id not in self._dirty:
+                    self._store(LiveSession.from_row(row))
+            self._loaded = True
+        return len(rows)
+
+    def get(self, session_id: int, db: Session) -> Optional[LiveSession]:
+        """
+        Get a session's current state.
+
+        Live sessions are served from memory; finished sessions are read from the database.
+
+        Args:
+            session_id: ID of the game session
+            db: Database session
+
+        Returns:
+            Optional[LiveSession]: The session, or None if it does not exist
+        """
+        self._ensure_loaded(db)
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session
+        row = db.get(models.GameSession, session_id)
+        if row is None:
+            return None
+        return self.track(row)
+
+    def is_active(self, session_id: int, db: Session) -> bool:
+        """Whether a session is running (status ``active``)."""
+        session = self.get(session_id, db)
+        return session is not None and session.status == "active"
+
+    def current_for_team(self, team_id: int, db: Session) -> Optional[LiveSession]:
+        """Get a team's live session, or else its most recent finished one."""
+        self._ensure_loaded(db)
+        session_id = self._by_team.get(team_id)
+        if session_id is not None:
+            return self._sessions[session_id]
+        row = db.execute(
+            select(models.GameSession)
+            .where(models.GameSession.team_id == team_id)
+            .order_by(models.GameSession.id.desc())
+            .limit(1),
+        ).scalar_one_or_none()
+        return self.track(row) if row is not None else None
+
+    def has_open_session(self, team_id: int, db: Session) -> bool:
+        """Whether a team has a session that is not finished."""
+        self._ensure_loaded(db)
+        return team_id in self._by_team
+
+    def active_sessions(self, db: Session) -> list[LiveSession]:
+        """All sessions with status ``active``."""
+        self._ensure_loaded(db)
+        with self._lock:
+            return [session for session in self._sessions.values() if session.status == "active"]
+
+    def track(self, row: Any) -> LiveSession:
+        """
+        Record the persisted state of a session created or changed outside of ``transition``.
+
+        Args:
+            row: Game session model instance or row with the same attributes
+
+        Returns:
+            LiveSession: The tracked state (finished sessions are returned but not kept)
+        """
+        session = LiveSession.from_row(row)
+        with self._lock:
+            pending = self._sessions.get(session.id)
+            if pending is not None and session.id in self._dirty:
+                # A transition that has not been flushed yet is newer than the database row
+                return pending
+            if session.status == "finished":
+                self._forget(session.id)
+            else:
+                self._store(session)
+        return session
+
+    def transition(self, session_id: int, status: str, db: Session, now: Optional[datetime] = None) -> LiveSession:
+        """
+        Change a session's status in memory and queue it for ``flush``.
+
+        Args:
+            session_id: ID of the game session
+            status: New status
+            db: Database session, used to look up sessions that are not in memory
+            now: Time of the transition (defaults to the current time)
+
+        Returns:
+            LiveSession: The updated session
+
+        Raises:
+            LookupError: If the session does not exist
+            InvalidTransition: If the status change is not allowed
+        """
+        session = self.get(session_id, db)
+        if session is None:
+            raise LookupError(f"Game session {session_id} not found")
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            previous_status = session.status
+            if status not in TRANSITIONS.get(previous_status, ()):
+                raise InvalidTransition(f"Invalid state transition from {previous_status} to {status}")
+            session.status = status
+            if status == "active":
+                session.started_at = now
+            elif status == "finished":
+                session.ended_at = now
+                if session.started_at is not None:
+                    session.survival_time_seconds = int((now - session.started_at).total_seconds())
+            self._store(session)
+            self._dirty.add(session_id)
+
+        if session_id in connections:
+            broadcast_dispatcher.submit(
+                broadcast_message,
+                session_id,
+                "session_transition",
+                {"session_id": session_id, "from": previous_status, "to": status, "timestamp": now.isoformat()},
+            )
+        return session
+
+    def flush(self, db: Session) -> int:
+        """
+        Write all pending transitions with one executemany UPDATE. The caller commits.
+
+        Returns:
+            int: Number of written sessions
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                {
+                    "id": session.id,
+                    "status": session.status,
+                    "started_at": session.started_at,
+                    "ended_at": session.ended_at,
+                    "survival_time_seconds": session.survival_time_seconds,
+                }
+                for session in (self._sessions.get(session_id) for session_id in dirty)
+                if session is not None
+            ]
+        if not rows:
+            return 0
+        try:
+            db.execute(update(models.GameSession), rows)
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        with self._lock:
+            # Finished sessions are kept only until they are persisted
+            for row in rows:
+                if row["status"] == "finished" and row["id"] not in self._dirty:
+                    self._forget(row["id"])
+        return len(rows)
+
+    def clear(self) -> None:
+        """Forget all sessions; they are reloaded on next use."""
+        with self._lock:
+            self._sessions = {}
+            self._by_team = {}
+            self._dirty = set()
+            self._loaded = False
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def _store(self, session: LiveSession) -> None:
+        """Keep a session and its team index. Caller holds the lock."""
+        self._sessions[session.id] = session
+        self._by_team[session.team_id] = session.id
+
+    def _forget(self, session_id: int) -> None:
+        """Drop a session from memory. Caller holds the lock."""
+        session = self._sessions.pop(session_id, None)
+        if session is not None and self._by_team.get(session.team_id) == session_id:
+            del self._by_team[session.team_id]
+
+
+# Global instance
+game_state_machine = GameStateMachine()
@@ -0,0 +1,233 @@
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..schemas.v1.api.responses import GameSessionResponse
+from ..schemas.v1.core.game import GameResult
+from ..utils.datetimes import as_utc
+
+
+COUNTERS = ("puzzles_solved", "puzzles_failed", "points_given", "points_received")
+
+
+class GameStatsService:
+    """
+    Per-player game statistics, kept up to date as the game is played.
+
+    The answer path adds to the counters of the answering player and of the player who received points with
+    one upsert; the decay paths record elimination times. Every player gets a row when the session starts, so
+    results are read from these rows in O(players), without looking at puzzle history or the current team.
+    """
+
+    def record_players(self, players: Iterable[tuple[int, int]], db: Session) -> int:
+        """
+        Add zeroed rows for the players of started sessions, so results list everyone who played even after
+        they left the team. Existing rows are kept. The caller commits.
+
+        Args:
+            players: (session ID, user ID) pairs
+            db: Database session
+
+        Returns:
+            int: Number of given players
+        """
+        rows = [{"game_session_id": session_id, "user_id": user_id} for session_id, user_id in players]
+        if not rows:
+            return 0
+        db.execute(insert(models.GamePlayerStats).values(rows).on_conflict_do_nothing())
+        return len(rows)
+
+    def record_answer(
+        self,
+        session_id: int,
+        user_id: int,
+        correct: bool,
+        awarded_to_user_id: Optional[int],
+        points: int,
+        db: Session,
+    ) -> None:
+        """
+        Count an answer with a single upsert. The caller commits.
+
+        Args:
+            session_id: ID of the game session
+            user_id: ID of the answering player
+            correct: Whether the answer was correct
+            awarded_to_user_id: Player who received points for the solve, if any
+            points: Points that player received
+            db: Database session
+        """
+        rows = [
+            {
+                "game_session_id": session_id,
+                "user_id": user_id,
+                "puzzles_solved": int(correct),
+                "puzzles_failed": int(not correct),
+                "points_given": points if awarded_to_user_id is not None else 0,
+                "points_received": 0,
+            },
+        ]
+        if awarded_to_user_id is not None:
+            rows.append(
+                {
+                    "game_session_id": session_id,
+                    "user_id": awarded_to_user_id,
+                    "puzzles_solved": 0,
+                    "puzzles_failed": 0,
+                    "points_given": 0,
+                    "points_received": points,
+                },
+            )
+        statement = insert(models.GamePlayerStats).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["game_session_id", "user_id"],
+            set_={
+                counter: getattr(models.GamePlayerStats, counter) + statement.excluded[counter] for counter in COUNTERS
+            },
+        )
+        db.execute(statement)
+
+    def record_failures(self, failures: Iterable[tuple[int, int]], db: Session) -> int:
+        """
+        Count puzzles that a player failed without answering, e.g. on timeout, with a single upsert. The caller
+        commits.
+
+        Args:
+            failures: (session ID, user ID) pairs, one per failed puzzle
+            db: Database session
+
+        Returns:
+            int: Number of recorded failures
+        """
+        rows = [
+            {
+                "game_session_id": session_id,
+                "user_id": user_id,
+                "puzzles_solved": 0,
+                "puzzles_failed": 1,
+                "points_given": 0,
+                "points_received": 0,
+            }
+            for session_id, user_id in failures
+        ]
+        if not rows:
+            return 0
+        statement = insert(models.GamePlayerStats).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["game_session_id", "user_id"],
+            set_={"puzzles_failed": models.GamePlayerStats.puzzles_failed + statement.excluded.puzzles_failed},
+        )
+        db.execute(statement)
+        return len(rows)
+
+    def record_eliminations(
+        self,
+        eliminations: Iterable[tuple[int, int]],
+        db: Session,
+        now: Optional[datetime] = None,
+    ) -> int:
+        """
+        Record when players ran out of points, keeping the first time if already set. The caller commits.
+
+        Args:
+            eliminations: (session ID, user ID) pairs
+            db: Database session
+            now: Time of the elimination (defaults to the current time)
+
+        Returns:
+            int: Number of recorded eliminations
+        """
+        now = now or datetime.now(timezone.utc)
+        rows = [
+            {"game_session_id": session_id, "user_id": user_id, "eliminated_at": now}
+            for session_id, user_id in eliminations
+        ]
+        if not rows:
+            return 0
+        statement = insert(models.GamePlayerStats).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["game_session_id", "user_id"],
+            set_={
+                "eliminated_at": func.coalesce(models.GamePlayerStats.eliminated_at, statement.excluded.eliminated_at),
+            },
+        )
+        db.execute(statement)
+        return len(rows)
+
+    def team_accuracy(self, session_id: int, db: Session) -> Optional[float]:
+        """
+        Share of correct answers given in a game session.
+
+        Returns:
+            Optional[float]: Accuracy between 0 and 1, or None if nobody answered
+        """
+        solved, failed = db.execute(
+            select(
+                func.coalesce(func.sum(models.GamePlayerStats.puzzles_solved), 0),
+                func.coalesce(func.sum(models.GamePlayerStats.puzzles_failed), 0),
+            ).where(models.GamePlayerStats.game_session_id == session_id),
+        ).one()
+        if solved + failed == 0:
+            return None
+        return solved / (solved + failed)
+
+    def get_results(self, session: Any, db: Session, now: Optional[datetime] = None) -> GameResult:
+        """
+        Build the results of a game session from its players' counters.
+
+        Args:
+            session: Game session (model instance or ``LiveSession``)
+            db: Database session
+            now: Reference time for sessions that are still running (defaults to the current time)
+
+        Returns:
+            GameResult: Session, survival times and per-player statistics
+        """
+        now = now or datetime.now(timezone.utc)
+        started_at = as_utc(session.started_at)
+        end = as_utc(session.ended_at) or now
+        team_survival = session.survival_time_seconds
+        if team_survival is None:
+            team_survival = int((end - started_at).total_seconds()) if started_at else 0
+
+        # Players are the session's statistics rows, written on activation, not the team's current members
+        rows = db.execute(
+            select(models.User, models.GamePlayerStats)
+            .join(models.GamePlayerStats, models.GamePlayerStats.user_id == models.User.id)
+            .where(models.GamePlayerStats.game_session_id == session.id)
+            .order_by(models.User.id),
+        ).all()
+
+        players = []
+        for user, stats in rows:
+            counters = {counter: getattr(stats, counter) for counter in COUNTERS}
+            eliminated_at = as_utc(stats.eliminated_at)
+            survived_until = eliminated_at or end
+            players.append(
+                {
+                    "id": user.id,
+                    "username": user.username,
+                    "color": user.color,
+                    "points": user.points,
+                    **counters,
+                    "eliminated_at": eliminated_at.isoformat() if eliminated_at else None,
+                    "survival_time_seconds": int((survived_until - started_at).total_seconds()) if started_at else 0,
+                },
+            )
+
+        return GameResult(
+            session=GameSessionResponse.model_validate(session).model_dump(mode="json"),
+            survival_time_seconds=team_survival,
+            final_players=players,
+            puzzles_solved_per_player={str(player["id"]): player["puzzles_solved"] for player in players},
+            points_given_per_player={str(player["id"]): player["points_given"] for player in players},
+            points_received_per_player={str(player["id"]): player["points_received"] for player in players},
+        )
+
+
+# Global instance
+game_stats_service = GameStatsService()
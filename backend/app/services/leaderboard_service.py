@@ -0,0 +1,251 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..utils.datetimes import as_utc
+
+
+# Leaderboard windows: all-time and the current UTC day
+WINDOWS = ("all", "daily")
+
+# Days of daily leaderboards kept in memory, including today
+DAILY_WINDOWS_KEPT = 7
+
+# Length of the cached top list of each leaderboard (the maximum page size)
+TOP_K = 100
+
+
+@dataclass
+class LeaderboardEntry:
+    """A team's best finished game within a leaderboard window."""
+
+    team_id: int
+    team_name: str
+    session_id: int
+    survival_time_seconds: int
+    ended_at: datetime
+
+    @property
+    def key(self) -> tuple[int, float, int]:
+        """Sort key: longest survival first, then whoever got there first."""
+        return (-self.survival_time_seconds, self.ended_at.timestamp(), self.team_id)
+
+    def to_dict(self, rank: int) -> dict[str, Any]:
+        return {
+            "rank": rank,
+            "team_id": self.team_id,
+            "team_name": self.team_name,
+            "session_id": self.session_id,
+            "survival_time_seconds": self.survival_time_seconds,
+            "ended_at": self.ended_at.isoformat(),
+        }
+
+
+class _Board:
+    """One leaderboard: every team's best entry, ordered by a sorted list of sort keys."""
+
+    def __init__(self):
+        self.best: dict[int, LeaderboardEntry] = {}
+        self.order: list[tuple[int, float, int]] = []
+        self._top: Optional[list[dict[str, Any]]] = None
+
+    def offer(self, entry: LeaderboardEntry) -> bool:
+        """Keep the entry if it is the team's best so far."""
+        current = self.best.get(entry.team_id)
+        if current is not None:
+            if current.key <= entry.key:
+                return False
+            del self.order[bisect_left(self.order, current.key)]
+        position = bisect_left(self.order, entry.key)
+        self.order.insert(position, entry.key)
+        self.best[entry.team_id] = entry
+        if position < TOP_K:
+            # A team's previous best is always behind its new one, so only entries entering the top change it
+            self._top = None
+        return True
+
+    def rank(self, team_id: int) -> Optional[dict[str, Any]]:
+        entry = self.best.get(team_id)
+        if entry is None:
+            return None
+        return entry.to_dict(bisect_left(self.order, entry.key) + 1)
+
+    def top(self, limit: int) -> list[dict[str, Any]]:
+        if self._top is None:
+            self._top = [
+                self.best[team_id].to_dict(rank) for rank, (_, _, team_id) in enumerate(self.order[:TOP_K], start=1)
+            ]
+        return self._top[:limit]
+
+
+class LeaderboardService:
+    """
+    Survival-time leaderboards of finished games, by team.
+
+    Each leaderboard keeps every team's best game and a sorted list of their sort keys, so a new result is
+    placed with a binary search and a team's rank is its position in that list. The top entries are cached
+    until a result enters them. Boards are loaded once from the finished-session indexes and then updated as
+    games end; neither rank nor top lookups touch the database.
+    """
+
+    def __init__(self):
+        self._all = _Board()
+        self._daily: dict[date, _Board] = {}
+        self._team_names: dict[int, str] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self, db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Load the all-time and recent daily leaderboards, e.g. at startup.
+
+        Args:
+            db: Database session
+            now: Reference time for the daily windows (defaults to the current time)
+
+        Returns:
+            int: Number of loaded finished games
+        """
+        today = (now or datetime.now(timezone.utc)).date()
+        since = datetime.combine(today - timedelta(days=DAILY_WINDOWS_KEPT - 1), time(), tzinfo=timezone.utc)
+        all_time = db.execute(finished_sessions_query()).all()
+        recent = db.execute(finished_sessions_query(since)).all()
+        with self._lock:
+            self._all = _Board()
+            self._daily = {}
+            for row in all_time:
+                entry = _entry(row)
+                self._team_names[entry.team_id] = entry.team_name
+                self._all.offer(entry)
+            for row in recent:
+                entry = _entry(row)
+                self._daily.setdefault(entry.ended_at.date(), _Board()).offer(entry)
+            self._loaded = True
+        return len(all_time)
+
+    def record(self, session: Any, db: Session, now: Optional[datetime] = None) -> bool:
+        """
+        Enter a finished game into the leaderboards.
+
+        Args:
+            session: Finished game session (model instance or ``LiveSession``)
+            db: Database session, used to load the leaderboards and look up the team name on first use
+            now: Reference time for pruning old daily windows (defaults to the current time)
+
+        Returns:
+            bool: True if the game is a new best of its team in any window
+        """
+        if session.status != "finished" or session.survival_time_seconds is None or session.ended_at is None:
+            return False
+        self._ensure_loaded(db)
+        team_name = self._team_names.get(session.team_id)
+        if team_name is None:
+            team = db.get(models.Team, session.team_id)
+            team_name = team.name if team else ""
+        entry = LeaderboardEntry(
+            team_id=session.team_id,
+            team_name=team_name,
+            session_id=session.id,
+            survival_time_seconds=session.survival_time_seconds,
+            ended_at=as_utc(session.ended_at),
+        )
+        oldest_day = (now or datetime.now(timezone.utc)).date() - timedelta(days=DAILY_WINDOWS_KEPT - 1)
+        with self._lock:
+            self._team_names[entry.team_id] = team_name
+            improved = self._all.offer(entry)
+            if entry.ended_at.date() >= oldest_day:
+                improved = self._daily.setdefault(entry.ended_at.date(), _Board()).offer(entry) or improved
+            for day in [day for day in self._daily if day < oldest_day]:
+                del self._daily[day]
+        return improved
+
+    def top(self, window: str, db: Session, limit: int = 10, now: Optional[datetime] = None) -> list[dict[str, Any]]:
+        """
+        Get the best teams of a leaderboard.
+
+        Args:
+            window: ``all`` or ``daily`` (the current UTC day)
+            db: Database session, used to load the leaderboards on first use
+            limit: Number of entries (at most ``TOP_K``)
+            now: Reference time for the daily window (defaults to the current time)
+
+        Returns:
+            list[dict]: Ranked entries, best first
+        """
+        board = self._board(window, db, now)
+        with self._lock:
+            return board.top(min(limit, TOP_K)) if board else []
+
+    def rank(self, team_id: int, window: str, db: Session, now: Optional[datetime] = None) -> Optional[dict[str, Any]]:
+        """
+        Get a team's rank and best game in a leaderboard.
+
+        Returns:
+            Optional[dict]: The team's ranked entry, or None if it has no finished game in the window
+        """
+        board = self._board(window, db, now)
+        with self._lock:
+            return board.rank(team_id) if board else None
+
+    def clear(self) -> None:
+        """Forget all leaderboards; they are reloaded on next use."""
+        with self._lock:
+            self._all = _Board()
+            self._daily = {}
+            self._team_names = {}
+            self._loaded = False
+
+    def _board(self, window: str, db: Session, now: Optional[datetime]) -> Optional[_Board]:
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown leaderboard window: {window}")
+        self._ensure_loaded(db)
+        if window == "all":
+            return self._all
+        return self._daily.get((now or datetime.now(timezone.utc)).date())
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+
+def finished_sessions_query(since: Optional[datetime] = None) -> Select:
+    """
+    Finished games with a survival time and their team names.
+
+    Without ``since`` all of them are read in leaderboard order from the survival index; with it, only the
+    games that ended since then are read through the end time index.
+    """
+    statement = (
+        select(
+            models.GameSession.id,
+            models.GameSession.team_id,
+            models.GameSession.survival_time_seconds,
+            models.GameSession.ended_at,
+            models.Team.name,
+        )
+        .join(models.Team, models.Team.id == models.GameSession.team_id)
+        .where(models.GameSession.status == "finished", models.GameSession.survival_time_seconds.is_not(None))
+    )
+    if since is not None:
+        return statement.where(models.GameSession.ended_at >= since)
+    return statement.order_by(models.GameSession.survival_time_seconds.desc(), models.GameSession.ended_at)
+
+
+def _entry(row: Any) -> LeaderboardEntry:
+    return LeaderboardEntry(
+        team_id=row.team_id,
+        team_name=row.name,
+        session_id=row.id,
+        survival_time_seconds=row.survival_time_seconds,
+        ended_at=as_utc(row.ended_at),
+    )
+
+
+# Global instance
+leaderboard_service = LeaderboardService()
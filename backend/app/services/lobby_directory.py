@@ -0,0 +1,170 @@
+import asyncio
+from datetime import datetime, timezone
+import json
+import threading
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..schemas.v1.api.responses import UserResponse
+from .available_teams_service import MAX_PLAYERS, OPEN_SESSION_STATES
+
+
+# Messages buffered per subscriber before a slow client is disconnected (it resyncs with a new snapshot)
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class LobbyDirectory:
+    """
+    In-memory directory of all teams for the lobby WebSocket feed.
+
+    Every entry holds a team's members with their colors, its availability and the status of its latest game
+    session. Subscribers receive a snapshot and then only ``add``/``update``/``remove`` deltas. Mutating
+    endpoints refresh the affected teams, which costs one small query per change instead of a full listing
+    per lobby poll. The directory is loaded on the first subscription and kept current from then on.
+    """
+
+    def __init__(self):
+        self._entries: Optional[dict[int, dict[str, Any]]] = None
+        self._version = 0
+        self._subscribers: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.RLock()
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, db: Session) -> asyncio.Queue:
+        """
+        Register a subscriber and queue the current snapshot for it.
+
+        Args:
+            loop: Event loop the subscriber's WebSocket runs on
+            db: Database session, used to load the directory on first use
+
+        Returns:
+            asyncio.Queue: Queue of serialized messages; ``None`` means the subscriber fell behind and must
+            reconnect
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load(db)
+            snapshot = {"version": self._version, "teams": sorted(self._entries.values(), key=lambda e: e["id"])}
+            queue.put_nowait(_message("lobby_snapshot", snapshot))
+            self._subscribers[queue] = loop
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Remove a subscriber."""
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self) -> int:
+        """Number of connected lobby subscribers."""
+        return len(self._subscribers)
+
+    def refresh_team(self, team_id: Optional[int], db: Session) -> None:
+        """Reload one team after a change and publish the resulting delta."""
+        if team_id is not None:
+            self.refresh_teams([team_id], db)
+
+    def refresh_teams(self, team_ids: Iterable[int], db: Session) -> None:
+        """
+        Reload the given teams after a change and publish a delta for every entry that changed.
+
+        Does nothing until the directory has been loaded by a subscriber.
+        """
+        team_ids = set(team_ids)
+        if self._entries is None or not team_ids:
+            return
+        fresh = self._load(db, team_ids)
+        with self._lock:
+            if self._entries is None:
+                return
+            for team_id in sorted(team_ids):
+                old, new = self._entries.get(team_id), fresh.get(team_id)
+                if new == old:
+                    continue
+                if new is None:
+                    del self._entries[team_id]
+                    self._publish({"op": "remove", "team_id": team_id})
+                else:
+                    self._entries[team_id] = new
+                    self._publish({"op": "add" if old is None else "update", "team": new})
+
+    def clear(self) -> None:
+        """Drop the directory; it is reloaded by the next subscriber."""
+        with self._lock:
+            self._entries = None
+
+    def _publish(self, delta: dict[str, Any]) -> None:
+        """Send a delta to all subscribers. Caller holds the lock."""
+        self._version += 1
+        message = _message("lobby_delta", {"version": self._version, **delta})
+        for queue, loop in list(self._subscribers.items()):
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop is closed
+                del self._subscribers[queue]
+
+    def _deliver(self, queue: asyncio.Queue, message: str) -> None:
+        """Runs on the subscriber's event loop."""
+        if queue not in self._subscribers:
+            return
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.unsubscribe(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def _load(self, db: Session, team_ids: Optional[set[int]] = None) -> dict[int, dict[str, Any]]:
+        """Load directory entries, optionally only for the given teams, with a single query."""
+        latest_session = (
+            select(models.GameSession.id)
+            .where(models.GameSession.team_id == models.Team.id)
+            .order_by(models.GameSession.id.desc())
+            .limit(1)
+            .correlate(models.Team)
+            .scalar_subquery()
+        )
+        query = (
+            select(models.Team.id, models.Team.name, models.GameSession.id, models.GameSession.status, models.User)
+            .outerjoin(models.GameSession, models.GameSession.id == latest_session)
+            .outerjoin(models.User, models.User.team_id == models.Team.id)
+            .order_by(models.Team.id, models.User.id)
+        )
+        if team_ids is not None:
+            query = query.where(models.Team.id.in_(team_ids))
+
+        entries: dict[int, dict[str, Any]] = {}
+        for team_id, team_name, session_id, session_status, user in db.execute(query):
+            entry = entries.get(team_id)
+            if entry is None:
+                in_game = session_status in OPEN_SESSION_STATES
+                entry = entries[team_id] = {
+                    "id": team_id,
+                    "name": team_name,
+                    "members": [],
+                    "player_count": 0,
+                    "max_players": MAX_PLAYERS,
+                    "status": "in_game" if in_game else "available",
+                    "game_session_id": session_id if in_game else None,
+                    "game_status": session_status,
+                }
+            if user is not None:
+                entry["members"].append(UserResponse.model_validate(user).model_dump())
+                entry["player_count"] += 1
+        for entry in entries.values():
+            if entry["status"] == "available" and entry["player_count"] >= MAX_PLAYERS:
+                entry["status"] = "full"
+        return entries
+
+
+def _message(message_type: str, data: dict[str, Any]) -> str:
+    return json.dumps({"type": message_type, "data": data, "timestamp": datetime.now(timezone.utc).isoformat()})
+
+
+# Global instance
+lobby_directory = LobbyDirectory()
@@ -0,0 +1,191 @@
+from datetime import datetime, timezone
+import threading
+from typing import Optional
+import uuid
+
+from sqlalchemy import exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from .available_teams_service import MAX_PLAYERS, OPEN_SESSION_STATES
+from .color_assignment_service import color_assignment_service
+from .game_state_machine import game_state_machine
+
+
+class MatchmakingService:
+    """
+    Places players into the fullest team that still has a free slot.
+
+    Joinable teams (fewer than four players, no open session) are kept in buckets by player count. Each bucket
+    is an insertion-ordered dict used as an ordered set, so picking a team is a scan over ``MAX_PLAYERS``
+    buckets and moving it to the next bucket is O(1). The slot is reserved in memory under the lock; the
+    database write (team and color in one conditional UPDATE) happens outside of it. Teams changed by other
+    endpoints are invalidated and reloaded with one query on the next match.
+    """
+
+    def __init__(self):
+        self._buckets: list[dict[int, None]] = [{} for _ in range(MAX_PLAYERS)]
+        self._counts: dict[int, int] = {}
+        self._dirty: set[int] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def match(self, user_id: int, db: Session) -> tuple[int, Optional[int]]:
+        """
+        Put a user without a team into the fullest non-full team and give them a color.
+
+        Creates a new team when no team has a free slot, and opens a game session (countdown) for the team
+        once its last slot is filled.
+
+        Args:
+            user_id: ID of the user
+            db: Database session
+
+        Returns:
+            tuple[int, Optional[int]]: Team ID, and the ID of the game session if this match opened one
+        """
+        while True:
+            with self._lock:
+                self._sync(db)
+                team_id = self._reserve()
+                if team_id is None:
+                    team_id = self._create_team(db)
+                    self._counts[team_id] = 1
+                    self._buckets[1][team_id] = None
+
+            try:
+                color = color_assignment_service.allocate_color(user_id, team_id, db, join=True)
+            except Exception:
+                self.invalidate(team_id)
+                raise
+            if color is None:
+                # Every color is taken: the team filled up through another endpoint
+                self.invalidate(team_id)
+                continue
+
+            with self._lock:
+                count = self._counts.get(team_id)
+            # Only matches that see every slot reserved try to open the session; the last one to commit succeeds
+            session_id = None
+            if count is None or count >= MAX_PLAYERS:
+                session_id = self._open_session(team_id, db)
+                if session_id is not None:
+                    with self._lock:
+                        self._discard(team_id)
+            return team_id, session_id
+
+    def invalidate(self, team_id: Optional[int]) -> None:
+        """Mark a team's player count or session state as changed."""
+        if team_id is None:
+            return
+        with self._lock:
+            self._discard(team_id)
+            self._dirty.add(team_id)
+
+    def clear(self) -> None:
+        """Drop all buckets; they are reloaded by the next match."""
+        with self._lock:
+            self._buckets = [{} for _ in range(MAX_PLAYERS)]
+            self._counts = {}
+            self._dirty = set()
+            self._loaded = False
+
+    def _reserve(self) -> Optional[int]:
+        """Take a slot in the fullest joinable team. Caller holds the lock."""
+        for count in range(MAX_PLAYERS - 1, -1, -1):
+            bucket = self._buckets[count]
+            if bucket:
+                team_id = next(iter(bucket))
+                del bucket[team_id]
+                self._counts[team_id] = count + 1
+                if count + 1 < MAX_PLAYERS:
+                    self._buckets[count + 1][team_id] = None
+                return team_id
+        return None
+
+    def _discard(self, team_id: int) -> None:
+        """Remove a team from the buckets. Caller holds the lock."""
+        count = self._counts.pop(team_id, None)
+        if count is not None and count < MAX_PLAYERS:
+            self._buckets[count].pop(team_id, None)
+
+    def _sync(self, db: Session) -> None:
+        """Load the buckets, or reload the invalidated teams. Caller holds the lock."""
+        if self._loaded and not self._dirty:
+            return
+        team_ids = self._dirty if self._loaded else None
+        for team_id, count in self._load(db, team_ids):
+            self._discard(team_id)
+            self._counts[team_id] = count
+            self._buckets[count][team_id] = None
+        self._dirty = set()
+        self._loaded = True
+
+    def _load(self, db: Session, team_ids: Optional[set[int]] = None) -> list[tuple[int, int]]:
+        """Player counts of joinable teams, optionally only the given ones, with a single query."""
+        open_session = exists().where(
+            models.GameSession.team_id == models.Team.id,
+            models.GameSession.status.in_(OPEN_SESSION_STATES),
+        )
+        player_count = func.count(models.User.id)
+        query = (
+            select(models.Team.id, player_count)
+            .outerjoin(models.User, models.User.team_id == models.Team.id)
+            .where(~open_session)
+            .group_by(models.Team.id)
+            .having(player_count < MAX_PLAYERS)
+            .order_by(models.Team.id)
+        )
+        if team_ids is not None:
+            query = query.where(models.Team.id.in_(team_ids))
+        return [(team_id, count) for team_id, count in db.execute(query)]
+
+    def _create_team(self, db: Session) -> int:
+        team = models.Team(name=f"Team {uuid.uuid4().hex[:8]}")
+        db.add(team)
+        db.commit()
+        return team.id
+
+    def _open_session(self, team_id: int, db: Session) -> Optional[int]:
+        """
+        Open a countdown session for a team whose last slot was just filled.
+
+        The insert is conditional on the team having all its players and no open session, so it is safe when
+        several matches race for the last slots.
+        """
+        team_is_full = (
+            select(func.count(models.User.id)).where(models.User.team_id == team_id).scalar_subquery() >= MAX_PLAYERS
+        )
+        open_session = exists().where(
+            models.GameSession.team_id == team_id,
+            models.GameSession.status.in_(OPEN_SESSION_STATES),
+        )
+        statement = (
+            insert(models.GameSession)
+            .from_select(
+                ["team_id", "status", "created_at"],
+                select(literal(team_id), literal("countdown"), literal(datetime.now(timezone.utc))).where(
+                    team_is_full,
+                    ~open_session,
+                ),
+            )
+            .returning(
+                models.GameSession.id,
+                models.GameSession.team_id,
+                models.GameSession.status,
+                models.GameSession.created_at,
+                models.GameSession.started_at,
+                models.GameSession.ended_at,
+                models.GameSession.survival_time_seconds,
+            )
+        )
+        session = db.execute(statement).first()
+        db.commit()
+        if session is None:
+            return None
+        game_state_machine.track(session)
+        return session.id
+
+
+# Global instance
+matchmaking_service = MatchmakingService()
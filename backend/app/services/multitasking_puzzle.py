@@ -0,0 +1,100 @@
+from functools import lru_cache
+import json
+from typing import Optional
+
+import numpy as np
+
+
+NUM_ROWS = 4
+NUM_COLS = 9
+TIME_LIMIT_SECONDS = 10
+# Allowance for network latency between the client's last click and the server receiving the answer
+TIME_LIMIT_GRACE_SECONDS = 2
+
+
+def generate_multitasking_grids(
+    rng: np.random.Generator,
+    n: int,
+    rows: int = NUM_ROWS,
+    cols: int = NUM_COLS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generate ``n`` find-the-sixes grids in one vectorized call.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: ``(grids, six_cols)`` where ``grids`` is a ``(n, rows, cols)`` uint8
+        array of 9s with one 6 per row and ``six_cols`` is the ``(n, rows)`` column of the 6 in each row
+    """
+    six_cols = rng.integers(0, cols, size=(n, rows))
+    grids = np.full((n, rows, cols), 9, dtype=np.uint8)
+    grids[np.arange(n)[:, None], np.arange(rows)[None, :], six_cols] = 6
+    return grids, six_cols
+
+
+def grid_to_data(grid: np.ndarray, six_cols: np.ndarray, time_limit: int = TIME_LIMIT_SECONDS) -> tuple[dict, str]:
+    """
+    Convert one generated grid into puzzle data and its compact answer.
+
+    The correct answer is the column of the 6 in every row, e.g. ``"3,0,8,5"``.
+    """
+    data = {
+        "rows": [[str(digit) for digit in row] for row in grid.tolist()],
+        "six_positions": [{"row": row, "col": col} for row, col in enumerate(six_cols.tolist())],
+        "time_limit": time_limit,
+    }
+    correct_answer = ",".join(str(col) for col in six_cols.tolist())
+    return data, correct_answer
+
+
+def generate_multitasking_puzzle(
+    rng: np.random.Generator,
+    rows: int = NUM_ROWS,
+    cols: int = NUM_COLS,
+    time_limit: int = TIME_LIMIT_SECONDS,
+) -> tuple[dict, str]:
+    """Generate a multitasking puzzle (find all sixes)."""
+    grids, six_cols = generate_multitasking_grids(rng, 1, rows, cols)
+    return grid_to_data(grids[0], six_cols[0], time_limit)
+
+
+def verify_clicks(data: dict, correct_answer: str, answer: str, elapsed_seconds: Optional[float] = None) -> bool:
+    """
+    Check a submitted set of clicks against a multitasking puzzle.
+
+    Args:
+        data: Multitasking puzzle data
+        correct_answer: Compact answer (column of the 6 per row)
+        answer: JSON list of clicked ``[row, col]`` pairs or ``{"row": ..., "col": ...}`` objects, or the
+            compact per-row column form
+        elapsed_seconds: Time since the puzzle was handed out; answers after the time limit are rejected
+
+    Returns:
+        bool: True if exactly the sixes were clicked in time
+    """
+    if elapsed_seconds is not None and elapsed_seconds > data["time_limit"] + TIME_LIMIT_GRACE_SECONDS:
+        return False
+    clicks = parse_clicks(answer)
+    return clicks is not None and clicks == six_position_set(correct_answer)
+
+
+@lru_cache(maxsize=4096)
+def six_position_set(compact: str) -> frozenset[tuple[int, int]]:
+    """Expand a compact answer into the set of ``(row, col)`` positions of the sixes."""
+    return frozenset(enumerate(int(col) for col in compact.split(",")))
+
+
+def parse_clicks(answer: str) -> Optional[frozenset[tuple[int, int]]]:
+    """Parse submitted clicks into a set of ``(row, col)`` positions, or None if they are malformed."""
+    if not answer.startswith("["):
+        try:
+            return six_position_set(answer)
+        except ValueError:
+            return None
+    try:
+        clicks = json.loads(answer)
+        positions = [(c["row"], c["col"]) if isinstance(c, dict) else (c[0], c[1]) for c in clicks]
+    except (ValueError, TypeError, KeyError, IndexError):
+        return None
+    if not all(isinstance(row, int) and isinstance(col, int) for row, col in positions):
+        return None
+    return frozenset(positions)
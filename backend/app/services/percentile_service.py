@@ -0,0 +1,248 @@
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import accumulate
+import math
+import threading
+from typing import Any, Optional
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from .puzzle_generator import PUZZLE_TYPES
+
+
+# Relative error of the logarithmic buckets (a value is reported within 2% of itself)
+RELATIVE_ERROR = 0.02
+
+
+def log_bounds(lowest: float, highest: float, relative_error: float = RELATIVE_ERROR) -> list[float]:
+    """Upper bucket bounds growing by a constant factor from ``lowest`` up to at least ``highest``."""
+    growth = 1 + 2 * relative_error
+    steps = math.ceil(math.log(highest / lowest, growth))
+    return [lowest * growth**step for step in range(steps + 1)]
+
+
+def linear_bounds(lowest: float, highest: float, step: float) -> list[float]:
+    """Upper bucket bounds at a constant distance from ``lowest`` up to ``highest``."""
+    steps = round((highest - lowest) / step)
+    return [lowest + step * index for index in range(steps + 1)]
+
+
+class QuantileSketch:
+    """
+    Fixed-layout histogram of a metric, accurate to the bucket width.
+
+    Values are counted in the bucket of the first bound at or above them (values beyond the last bound share
+    an overflow bucket). Sketches with the same layout merge by adding their counts. Percentile and quantile
+    lookups binary-search a cumulative count list that is rebuilt after changes, so they cost O(log buckets)
+    however many values were recorded.
+    """
+
+    def __init__(self, layout: str, bounds: list[float]):
+        self.layout = layout
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._cumulative: Optional[list[int]] = None
+
+    def add(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self._cumulative = None
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.layout != self.layout:
+            raise ValueError(f"Cannot merge sketch layouts {other.layout} and {self.layout}")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self._cumulative = None
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, value: float) -> Optional[float]:
+        """Share of recorded values below ``value`` in percent (values in the same bucket count half)."""
+        if not self.count:
+            return None
+        index = bisect_left(self.bounds, value)
+        cumulative = self._get_cumulative()
+        below = cumulative[index] - self.counts[index]
+        return 100.0 * (below + self.counts[index] / 2) / self.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (0 <= q <= 1)."""
+        if not self.count:
+            return None
+        index = bisect_left(self._get_cumulative(), max(1, math.ceil(q * self.count)))
+        return self.bounds[min(index, len(self.bounds) - 1)]
+
+    def to_buckets(self) -> dict[str, int]:
+        """Non-empty buckets, for compact storage."""
+        return {str(index): count for index, count in enumerate(self.counts) if count}
+
+    def load_buckets(self, buckets: dict[str, int], count: int, total: float) -> None:
+        for index, bucket_count in buckets.items():
+            self.counts[int(index)] += bucket_count
+        self.count += count
+        self.total += total
+        self._cumulative = None
+
+    def _get_cumulative(self) -> list[int]:
+        if self._cumulative is None:
+            self._cumulative = list(accumulate(self.counts))
+        return self._cumulative
+
+
+# Bucket layout of every metric as (kind, lowest, highest, parameter); the layout string is persisted with
+# the counts so that a changed layout is detected instead of misread
+METRIC_LAYOUTS: dict[str, tuple[str, float, float, float]] = {
+    "survival_time": ("log", 1.0, 24 * 3600.0, RELATIVE_ERROR),  # Seconds per finished game
+    "accuracy": ("linear", 0.0, 1.0, 0.01),  # Share of correct answers per finished game
+    **{f"solve_time:{puzzle_type}": ("log", 0.1, 600.0, RELATIVE_ERROR) for puzzle_type in PUZZLE_TYPES},
+}
+
+
+def new_sketch(metric: str) -> QuantileSketch:
+    kind, lowest, highest, parameter = METRIC_LAYOUTS[metric]
+    bounds = log_bounds(lowest, highest, parameter) if kind == "log" else linear_bounds(lowest, highest, parameter)
+    return QuantileSketch(f"{kind}:{lowest}:{highest}:{parameter}", bounds)
+
+
+class PercentileService:
+    """
+    Streaming distributions of team and player performance, for "compared to everyone else" figures.
+
+    One quantile sketch per metric: survival time and answer accuracy are added when a game ends, solve time
+    per puzzle type on every correct answer. Sketches live in memory and are checkpointed to
+    ``metric_sketches`` periodically; a percentile lookup never reads past sessions.
+    """
+
+    def __init__(self):
+        self._sketches: dict[str, QuantileSketch] = {name: new_sketch(name) for name in METRIC_LAYOUTS}
+        self._dirty: set[str] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def record(self, metric: str, value: float) -> None:
+        """Add one observation to a metric's distribution; unknown metrics are ignored."""
+        with self._lock:
+            sketch = self._sketches.get(metric)
+            if sketch is None:
+                return
+            sketch.add(value)
+            self._dirty.add(metric)
+
+    def record_game(self, survival_time_seconds: Optional[int], accuracy: Optional[float]) -> None:
+        """Add a finished game's survival time and its team's answer accuracy."""
+        if survival_time_seconds is not None:
+            self.record("survival_time", survival_time_seconds)
+        if accuracy is not None:
+            self.record("accuracy", accuracy)
+
+    def compare(self, metric: str, value: Optional[float], db: Session) -> dict[str, Any]:
+        """
+        Place a value within a metric's distribution.
+
+        Args:
+            metric: Name of the metric (see ``METRIC_LAYOUTS``)
+            value: Value to place, e.g. a team's survival time
+            db: Database session, used to load the checkpointed sketches on first use
+
+        Returns:
+            dict: The value, its percentile and the number of values, mean and median (None when empty)
+        """
+        self._ensure_loaded(db)
+        with self._lock:
+            sketch = self._sketches[metric]
+            return {
+                "value": value,
+                "percentile": sketch.percentile(value) if value is not None else None,
+                "count": sketch.count,
+                "average": sketch.mean(),
+                "median": sketch.quantile(0.5),
+            }
+
+    def get_sketch(self, metric: str) -> QuantileSketch:
+        return self._sketches[metric]
+
+    def load(self, db: Session) -> int:
+        """
+        Merge the checkpointed sketches into the in-memory ones, e.g. at startup.
+
+        Returns:
+            int: Number of loaded sketches
+        """
+        rows = db.query(models.MetricSketch).all()
+        loaded = 0
+        with self._lock:
+            if self._loaded:
+                return 0
+            for row in rows:
+                sketch = self._sketches.get(row.name)
+                if sketch is None or sketch.layout != row.layout:
+                    print(f"Skipping checkpointed sketch {row.name} with outdated layout {row.layout}")
+                    continue
+                sketch.load_buckets(row.buckets, row.count, row.total)
+                loaded += 1
+            self._loaded = True
+        return loaded
+
+    def checkpoint(self, db: Session) -> int:
+        """
+        Persist all sketches changed since the last checkpoint with one upsert.
+
+        Returns:
+            int: Number of written sketches
+        """
+        self._ensure_loaded(db)
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                {
+                    "name": name,
+                    "layout": sketch.layout,
+                    "buckets": sketch.to_buckets(),
+                    "count": sketch.count,
+                    "total": sketch.total,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+                for name in dirty
+                for sketch in (self._sketches[name],)
+            ]
+        if not rows:
+            return 0
+        statement = insert(models.MetricSketch)
+        statement = statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                column: statement.excluded[column] for column in ("layout", "buckets", "count", "total", "updated_at")
+            },
+        )
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+        return len(rows)
+
+    def clear(self) -> None:
+        """Forget all distributions."""
+        with self._lock:
+            self._sketches = {name: new_sketch(name) for name in METRIC_LAYOUTS}
+            self._dirty.clear()
+            self._loaded = False
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+
+# Global instance
+percentile_service = PercentileService()
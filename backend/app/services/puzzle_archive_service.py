@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+# Rows moved per statement pair; keeps each archival transaction short
+ARCHIVE_BATCH_SIZE = 1000
+
+
+class PuzzleArchiveService:
+    """
+    Moves resolved puzzles from the live ``puzzles`` table into ``puzzle_history``.
+
+    Every answer leaves a solved or failed row behind. Archiving them keeps the live table at roughly one
+    row per active player, so the ``status == "active"`` lookups on the hot paths do not slow down over a
+    season.
+    """
+
+    def __init__(self, batch_size: int = ARCHIVE_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def archive_resolved(self, db: Session, max_batches: int = 10) -> int:
+        """
+        Archive solved and failed puzzles in batches.
+
+        Args:
+            db: Database session
+            max_batches: Upper bound of batches per call, so one call never holds the database for long
+
+        Returns:
+            int: Number of archived puzzles
+        """
+        archived = 0
+        for _ in range(max_batches):
+            puzzle_ids = list(
+                db.execute(
+                    select(models.Puzzle.id).where(models.Puzzle.status != "active").limit(self.batch_size),
+                ).scalars(),
+            )
+            if not puzzle_ids:
+                break
+            archived += self._move(puzzle_ids, db)
+            db.commit()
+            if len(puzzle_ids) < self.batch_size:
+                break
+        return archived
+
+    def archive_session(self, session_id: int, db: Session) -> int:
+        """
+        Archive every puzzle of a finished session, including puzzles left active when the game ended.
+
+        Args:
+            session_id: ID of the finished game session
+            db: Database session
+
+        Returns:
+            int: Number of archived puzzles
+        """
+        puzzle_ids = list(
+            db.execute(select(models.Puzzle.id).where(models.Puzzle.game_session_id == session_id)).scalars(),
+        )
+        if not puzzle_ids:
+            return 0
+        archived = 0
+        for start in range(0, len(puzzle_ids), self.batch_size):
+            archived += self._move(puzzle_ids[start : start + self.batch_size], db)
+        db.commit()
+        return archived
+
+    def archive_finished_sessions(self, db: Session) -> int:
+        """
+        Archive the remaining puzzles of all finished sessions.
+
+        Returns:
+            int: Number of archived puzzles
+        """
+        session_ids = list(
+            db.execute(
+                select(models.Puzzle.game_session_id)
+                .join(models.GameSession, models.GameSession.id == models.Puzzle.game_session_id)
+                .where(models.GameSession.status == "finished")
+                .distinct(),
+            ).scalars(),
+        )
+        return sum(self.archive_session(session_id, db) for session_id in session_ids)
+
+    def _move(self, puzzle_ids: list[int], db: Session) -> int:
+        """Copy the given puzzles into the history table and delete them from the live table."""
+        puzzles = models.Puzzle.__table__
+        history = models.PuzzleHistory.__table__
+        columns = [column.name for column in puzzles.c]
+        db.execute(
+            insert(history).from_select(
+                [*columns, "archived_at"],
+                select(*puzzles.c, literal(datetime.now(timezone.utc), history.c.archived_at.type)).where(
+                    puzzles.c.id.in_(puzzle_ids),
+                ),
+            ),
+        )
+        result = db.execute(delete(puzzles).where(puzzles.c.id.in_(puzzle_ids)))
+        return result.rowcount
+
+
+# Global instance
+puzzle_archive_service = PuzzleArchiveService()
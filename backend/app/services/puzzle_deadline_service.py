@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta, timezone
+import heapq
+import threading
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .. import database, models
+from ..utils.broadcast_dispatcher import broadcast_dispatcher
+from ..utils.datetimes import as_utc
+from ..utils.websocket_broadcast import broadcast_puzzle_interaction, connections
+from .difficulty_service import difficulty_service
+from .game_state_machine import game_state_machine
+from .game_stats_service import game_stats_service
+from .puzzle_generator import puzzle_generator
+
+
+# Upper bound on puzzles expired in one database transaction
+EXPIRE_BATCH_SIZE = 500
+
+
+class PuzzleDeadlineService:
+    """
+    Server-enforced puzzle time limits.
+
+    Deadlines live in a min-heap keyed by expiry time, so scheduling and expiring a puzzle are O(log n) and
+    the worker only ever looks at the earliest deadline instead of scanning the puzzles table. Cancelled
+    deadlines are removed lazily: the heap entry stays until it surfaces or the heap is compacted.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int]] = []
+        self._deadlines: dict[int, float] = {}  # puzzle_id -> expiry timestamp of the live entry
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def issue_puzzle(self, user_id: int, session_id: int, db: Session) -> models.Puzzle:
+        """
+        Add the next puzzle for a player and set its deadline.
+
+        The puzzle type and difficulty come from the player's statistics. The puzzle is flushed to get its ID;
+        committing is left to the caller, which schedules the deadline once the commit succeeded so a rollback
+        leaves no deadline behind.
+
+        Returns:
+            models.Puzzle: The new active puzzle
+        """
+        puzzle = models.Puzzle()
+        puzzle.type, puzzle.difficulty = difficulty_service.choose_next(user_id)
+        puzzle.seed = puzzle_generator.new_seed()
+        puzzle.status = "active"
+        puzzle.game_session_id = session_id
+        puzzle.user_id = user_id
+        self.set_deadline(puzzle)
+        db.add(puzzle)
+        db.flush()
+        return puzzle
+
+    def set_deadline(self, puzzle: models.Puzzle, now: Optional[datetime] = None) -> None:
+        """Set a puzzle's expiry time from its type's time limit."""
+        now = now or datetime.now(timezone.utc)
+        puzzle.expires_at = now + timedelta(seconds=puzzle_generator.time_limit(puzzle.type, puzzle.data))
+
+    def schedule(self, puzzle_id: int, expires_at: datetime) -> None:
+        """Schedule (or reschedule) the expiry of a puzzle."""
+        deadline = as_utc(expires_at).timestamp()
+        with self._condition:
+            self._deadlines[puzzle_id] = deadline
+            heapq.heappush(self._heap, (deadline, puzzle_id))
+            if self._heap[0] == (deadline, puzzle_id):
+                # New earliest deadline, wake the worker so it sleeps for the shorter time
+                self._condition.notify()
+
+    def cancel(self, puzzle_id: int) -> None:
+        """Cancel the deadline of a puzzle that was answered."""
+        with self._condition:
+            if self._deadlines.pop(puzzle_id, None) is not None and len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._compact()
+
+    def pop_expired(self, now: Optional[float] = None) -> list[int]:
+        """
+        Remove and return the puzzles whose deadline has passed.
+
+        Returns:
+            list[int]: IDs of expired puzzles, earliest deadline first
+        """
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        expired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, puzzle_id = heapq.heappop(self._heap)
+                # Skip entries that were cancelled or superseded by a later schedule
+                if self._deadlines.get(puzzle_id) == deadline:
+                    del self._deadlines[puzzle_id]
+                    expired.append(puzzle_id)
+        return expired
+
+    def pending(self) -> int:
+        """Number of scheduled deadlines."""
+        return len(self._deadlines)
+
+    def expire(self, puzzle_ids: list[int], db: Session) -> list[tuple[models.Puzzle, Optional[models.Puzzle]]]:
+        """
+        Fail expired puzzles and issue replacements.
+
+        Only puzzles that are still active are failed, so a deadline racing an answer is a no-op. A timeout
+        counts as a failed puzzle in the game statistics. Players who are eliminated or whose game is no longer
+        active get no replacement; the deadlines of replacements are scheduled after the commit.
+
+        Returns:
+            list[tuple[models.Puzzle, Optional[models.Puzzle]]]: ``(expired, replacement)`` per failed puzzle
+        """
+        now = datetime.now(timezone.utc)
+        expired_ids = list(
+            db.execute(
+                update(models.Puzzle)
+                .where(models.Puzzle.id.in_(puzzle_ids), models.Puzzle.status == "active")
+                .values(status="failed", solved_at=now)
+                .returning(models.Puzzle.id)
+                .execution_options(synchronize_session=False),
+            ).scalars(),
+        )
+        if not expired_ids:
+            db.commit()
+            return []
+
+        rows = db.execute(
+            select(models.Puzzle, models.User.points)
+            .join(models.User, models.User.id == models.Puzzle.user_id)
+            .where(models.Puzzle.id.in_(expired_ids)),
+        ).all()
+        results = []
+        for puzzle, points in rows:
+            difficulty_service.record_result(puzzle.user_id, puzzle.type, False, None)
+            replacement = None
+            if points > 0 and game_state_machine.is_active(puzzle.game_session_id, db):
+                replacement = self.issue_puzzle(puzzle.user_id, puzzle.game_session_id, db)
+            results.append((puzzle, replacement))
+        game_stats_service.record_failures(((puzzle.game_session_id, puzzle.user_id) for puzzle, _ in rows), db)
+        deadlines = [(replacement.id, replacement.expires_at) for _, replacement in results if replacement is not None]
+        db.commit()
+        for puzzle_id, expires_at in deadlines:
+            self.schedule(puzzle_id, expires_at)
+        return results
+
+    def start(self) -> None:
+        """Start the worker thread that expires puzzles as their deadlines pass."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def load(self, db: Session) -> int:
+        """
+        Schedule the deadlines of all active puzzles, e.g. at startup.
+
+        Returns:
+            int: Number of scheduled puzzles
+        """
+        rows = db.execute(
+            select(models.Puzzle.id, models.Puzzle.expires_at).where(
+                models.Puzzle.status == "active",
+                models.Puzzle.expires_at.is_not(None),
+            ),
+        ).all()
+        for puzzle_id, expires_at in rows:
+            self.schedule(puzzle_id, expires_at)
+        return len(rows)
+
+    def clear(self) -> None:
+        """Forget all scheduled deadlines."""
+        with self._condition:
+            self._heap.clear()
+            self._deadlines.clear()
+
+    def _compact(self) -> None:
+        """Rebuild the heap from the live deadlines, dropping cancelled entries. Caller holds the lock."""
+        self._heap = [(deadline, puzzle_id) for puzzle_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                timeout = None
+                if self._heap:
+                    timeout = max(0.0, self._heap[0][0] - datetime.now(timezone.utc).timestamp())
+                self._condition.wait(timeout)
+                if self._stopped:
+                    return
+            expired = self.pop_expired()
+            for start in range(0, len(expired), EXPIRE_BATCH_SIZE):
+                try:
+                    self._expire_and_notify(expired[start : start + EXPIRE_BATCH_SIZE])
+                except Exception as e:
+                    print(f"Failed to expire puzzles: {e}")
+
+    def _expire_and_notify(self, puzzle_ids: list[int]) -> None:
+        db = database.SessionLocal()
+        try:
+            results = self.expire(puzzle_ids, db)
+            if not results:
+                return
+            print(f"[Puzzle Timeout] Expired {len(results)} puzzle(s)")
+
+            for puzzle, replacement in results:
+                if puzzle.game_session_id in connections:
+                    broadcast_dispatcher.submit(
+                        broadcast_puzzle_interaction,
+                        puzzle.game_session_id,
+                        puzzle.user_id,
+                        puzzle.id,
+                        "timeout",
+                        {"next_puzzle_id": replacement.id if replacement else None},
+                    )
+            for session_id in {puzzle.game_session_id for puzzle, _ in results}:
+                broadcast_dispatcher.broadcast_state(session_id, db)
+        finally:
+            db.close()
+
+
+# Global instance
+puzzle_deadline_service = PuzzleDeadlineService()
@@ -0,0 +1,283 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import random
+from typing import Any, Optional
+
+import numpy as np
+
+from .multitasking_puzzle import (
+    NUM_COLS,
+    NUM_ROWS,
+    TIME_LIMIT_GRACE_SECONDS,
+    TIME_LIMIT_SECONDS,
+    generate_multitasking_grids,
+    generate_multitasking_puzzle,
+    grid_to_data,
+    verify_clicks,
+)
+from .spatial_puzzle import LEGACY_SOLVED_ANSWER, generate_spatial_puzzle, validate_path
+
+
+PUZZLE_TYPES = ["memory", "spatial", "concentration", "multitasking"]
+
+MEMORY_COLORS = ["red", "blue", "yellow", "green"]
+# Harder memory puzzles draw additional colors from the end of the palette
+MEMORY_PALETTE = MEMORY_COLORS + ["purple", "orange"]
+CONCENTRATION_COLORS = ["red", "blue", "yellow", "green", "purple", "orange"]
+
+# Seconds to answer for puzzle types whose data carries no time limit of its own
+PUZZLE_TIME_LIMITS = {"memory": 20, "spatial": 45, "concentration": 30, "multitasking": TIME_LIMIT_SECONDS}
+# Seconds to click after the last concentration pair was shown
+CONCENTRATION_ANSWER_SECONDS = 5
+
+# Largest seed handed out; keeps seeds inside a signed 32-bit column on any backend
+MAX_SEED = 2**31 - 1
+
+# Stored with every seeded puzzle. Bump it whenever a generator produces different data for the same seed
+# (including changes to the random streams of ``random`` or numpy), so older rows are not silently rebuilt
+# into different puzzles.
+GENERATOR_VERSION = 1
+
+
+class GeneratorVersionMismatch(ValueError):
+    """Raised when a puzzle was generated by another generator version and cannot be rebuilt from its seed."""
+
+
+class PuzzleGenerator:
+    """
+    Deterministic puzzle generation.
+
+    Every puzzle is a pure function of ``(type, seed, difficulty)``, so a ``Puzzle`` row only needs to store
+    the seed and its difficulty parameters. The full data is rebuilt on read and kept in an LRU cache. Seeds
+    only reproduce a puzzle within one ``GENERATOR_VERSION``, which is therefore stored alongside them.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self._generate_cached = lru_cache(maxsize=cache_size)(self._generate_uncached)
+
+    def new_seed(self) -> int:
+        """Draw a fresh seed for a new puzzle."""
+        return random.randint(0, MAX_SEED)
+
+    def generate(
+        self,
+        puzzle_type: str,
+        seed: int,
+        difficulty: Optional[dict[str, Any]] = None,
+        version: int = GENERATOR_VERSION,
+    ) -> tuple[dict, str]:
+        """
+        Build the data and correct answer for a puzzle.
+
+        Args:
+            puzzle_type: One of ``PUZZLE_TYPES``
+            seed: Generator seed stored on the puzzle row
+            difficulty: Optional generator parameters (e.g. ``{"num_pairs": 8}``)
+            version: Generator version stored on the puzzle row
+
+        Returns:
+            tuple[dict, str]: ``(data, correct_answer)``. The returned dict is shared through the cache and
+            must not be mutated.
+
+        Raises:
+            GeneratorVersionMismatch: If the seed belongs to another generator version
+        """
+        if version != GENERATOR_VERSION:
+            raise GeneratorVersionMismatch(
+                f"Puzzle seed {seed} was generated by version {version}, this is version {GENERATOR_VERSION}",
+            )
+        difficulty_key = tuple(sorted((difficulty or {}).items()))
+        return self._generate_cached(puzzle_type, seed, difficulty_key)
+
+    def check_answer(
+        self,
+        puzzle_type: str,
+        data: dict,
+        correct_answer: str,
+        answer: str,
+        elapsed_seconds: Optional[float] = None,
+    ) -> bool:
+        """
+        Check a submitted answer.
+
+        Spatial answers are drag paths validated against the obstacle layout (or the legacy client's
+        ``"solved"``) and multitasking answers are click sets checked against the sixes and the time limit;
+        every other type is compared with the correct answer.
+        """
+        if puzzle_type == "spatial" and data.get("obstacles") is not None:
+            return answer == LEGACY_SOLVED_ANSWER or validate_path(data, answer)
+        if puzzle_type == "multitasking" and data.get("rows") is not None:
+            return verify_clicks(data, correct_answer, answer, elapsed_seconds)
+        return correct_answer == answer
+
+    def time_limit(self, puzzle_type: str, data: dict) -> int:
+        """
+        Seconds a player has for a puzzle before it expires, including the latency grace period.
+
+        Multitasking puzzles carry their own limit and concentration puzzles last as long as their pairs are
+        shown; every other type uses ``PUZZLE_TIME_LIMITS``.
+        """
+        if "time_limit" in data:
+            limit = data["time_limit"]
+        elif puzzle_type == "concentration" and "pairs" in data:
+            limit = len(data["pairs"]) * data.get("duration", 2) + CONCENTRATION_ANSWER_SECONDS
+        else:
+            limit = PUZZLE_TIME_LIMITS.get(puzzle_type, max(PUZZLE_TIME_LIMITS.values()))
+        return limit + TIME_LIMIT_GRACE_SECONDS
+
+    def clear_cache(self) -> None:
+        """Drop all cached puzzle data."""
+        self._generate_cached.cache_clear()
+
+    def _generate_uncached(
+        self,
+        puzzle_type: str,
+        seed: int,
+        difficulty_key: tuple[tuple[str, Any], ...],
+    ) -> tuple[dict, str]:
+        params = dict(difficulty_key)
+        if puzzle_type == "memory":
+            return generate_memory_puzzle(random.Random(seed), **params)
+        if puzzle_type == "concentration":
+            return generate_concentration_puzzle(random.Random(seed), **params)
+        if puzzle_type == "spatial":
+            return generate_spatial_puzzle(np.random.default_rng(seed), **params)
+        if puzzle_type == "multitasking":
+            return generate_multitasking_puzzle(np.random.default_rng(seed), **params)
+        raise ValueError(f"Puzzle type '{puzzle_type}' not supported")
+
+
+def generate_memory_puzzle(rng: random.Random, num_colors: int = len(MEMORY_COLORS)) -> tuple[dict, str]:
+    """Generate a memory puzzle (color-number association)."""
+    colors = MEMORY_PALETTE[:num_colors]
+    numbers = list(range(1, len(colors) + 1))
+    rng.shuffle(colors)
+    mapping = {str(num): color for num, color in zip(numbers, colors)}
+    question_number = rng.choice(numbers)
+    correct_answer = mapping[str(question_number)]
+    data = {
+        "mapping": mapping,
+        "question_number": str(question_number),  # Convert to string for frontend validation
+        "choices": colors,
+    }
+    return data, correct_answer
+
+
+def generate_concentration_puzzle(rng: random.Random, num_pairs: int = 10) -> tuple[dict, str]:
+    """Generate a concentration puzzle (color-word matching)."""
+    colors = CONCENTRATION_COLORS
+    pairs = []
+    correct_index = rng.randint(0, num_pairs - 1)
+    for i in range(num_pairs):
+        if i == correct_index:
+            color_word = rng.choice(colors)
+            circle_color = color_word
+            is_match = True
+        else:
+            color_word = rng.choice(colors)
+            available_colors = [c for c in colors if c != color_word]
+            circle_color = rng.choice(available_colors)
+            is_match = False
+        pairs.append({"color_word": color_word, "circle_color": circle_color, "is_match": is_match})
+    data = {
+        "pairs": pairs,
+        "duration": 2,  # seconds per pair
+    }
+    correct_answer = str(correct_index)
+    return data, correct_answer
+
+
+@dataclass
+class PuzzleBatch:
+    """
+    A batch of generated puzzles of one type.
+
+    ``arrays`` holds the puzzles column-wise as NumPy arrays (colors are indices into the type's palette);
+    ``to_puzzles`` converts them into the same ``(data, correct_answer)`` tuples the single generators return.
+    """
+
+    puzzle_type: str
+    arrays: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.arrays.values())))
+
+    def to_puzzles(self) -> list[tuple[dict, str]]:
+        """Convert the batch into JSON-ready ``(data, correct_answer)`` tuples."""
+        if self.puzzle_type == "memory":
+            return _memory_batch_to_puzzles(self.arrays)
+        if self.puzzle_type == "concentration":
+            return _concentration_batch_to_puzzles(self.arrays)
+        return [
+            grid_to_data(grid, six_cols, int(time_limit))
+            for grid, six_cols, time_limit in zip(
+                self.arrays["grids"],
+                self.arrays["six_cols"],
+                self.arrays["time_limit"],
+            )
+        ]
+
+
+def generate_batch(puzzle_type: str, n: int, rng: np.random.Generator, **params: Any) -> PuzzleBatch:
+    """
+    Generate ``n`` puzzles of one type with vectorized NumPy draws.
+
+    Used for bulk pre-generation and load tests. Supports memory, concentration and multitasking puzzles;
+    ``params`` are the same difficulty parameters the single generators accept.
+    """
+    if puzzle_type == "memory":
+        num_colors = params.get("num_colors", len(MEMORY_COLORS))
+        colors = rng.permuted(np.tile(np.arange(num_colors, dtype=np.int8), (n, 1)), axis=1)
+        question_number = rng.integers(1, num_colors + 1, size=n, dtype=np.int8)
+        arrays = {"colors": colors, "question_number": question_number}
+    elif puzzle_type == "concentration":
+        num_pairs = params.get("num_pairs", 10)
+        num_colors = len(CONCENTRATION_COLORS)
+        color_words = rng.integers(0, num_colors, size=(n, num_pairs), dtype=np.int8)
+        # A non-zero offset guarantees a mismatching circle color for every non-matching pair
+        offsets = rng.integers(1, num_colors, size=(n, num_pairs), dtype=np.int8)
+        circle_colors = (color_words + offsets) % num_colors
+        correct_index = rng.integers(0, num_pairs, size=n)
+        rows = np.arange(n)
+        circle_colors[rows, correct_index] = color_words[rows, correct_index]
+        arrays = {"color_words": color_words, "circle_colors": circle_colors, "correct_index": correct_index}
+    elif puzzle_type == "multitasking":
+        grids, six_cols = generate_multitasking_grids(rng, n, params.get("rows", NUM_ROWS), params.get("cols", NUM_COLS))
+        time_limits = np.full(n, params.get("time_limit", TIME_LIMIT_SECONDS), dtype=np.int16)
+        arrays = {"grids": grids, "six_cols": six_cols, "time_limit": time_limits}
+    else:
+        raise ValueError(f"Batch generation is not supported for puzzle type '{puzzle_type}'")
+    return PuzzleBatch(puzzle_type, arrays)
+
+
+def _memory_batch_to_puzzles(arrays: dict[str, np.ndarray]) -> list[tuple[dict, str]]:
+    puzzles = []
+    for colors, question_number in zip(arrays["colors"].tolist(), arrays["question_number"].tolist()):
+        choices = [MEMORY_PALETTE[c] for c in colors]
+        mapping = {str(num): color for num, color in enumerate(choices, start=1)}
+        data = {"mapping": mapping, "question_number": str(question_number), "choices": choices}
+        puzzles.append((data, choices[question_number - 1]))
+    return puzzles
+
+
+def _concentration_batch_to_puzzles(arrays: dict[str, np.ndarray]) -> list[tuple[dict, str]]:
+    puzzles = []
+    for words, circles, correct_index in zip(
+        arrays["color_words"].tolist(),
+        arrays["circle_colors"].tolist(),
+        arrays["correct_index"].tolist(),
+    ):
+        pairs = [
+            {
+                "color_word": CONCENTRATION_COLORS[word],
+                "circle_color": CONCENTRATION_COLORS[circle],
+                "is_match": word == circle,
+            }
+            for word, circle in zip(words, circles)
+        ]
+        puzzles.append(({"pairs": pairs, "duration": 2}, str(correct_index)))
+    return puzzles
+
+
+# Global instance
+puzzle_generator = PuzzleGenerator()
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..utils.websocket_broadcast import build_state_data
+from .difficulty_service import difficulty_service
+from .game_end_service import game_end_service
+from .game_state_machine import game_state_machine
+from .game_stats_service import game_stats_service
+from .lobby_directory import lobby_directory
+from .puzzle_deadline_service import puzzle_deadline_service
+from .puzzle_generator import puzzle_generator
+
+
+STARTING_POINTS = 15
+
+
+class SessionActivationService:
+    """
+    Bulk transition of game sessions from countdown to active.
+
+    Activating any number of sessions takes four statements: one UPDATE of the sessions, one UPDATE resetting
+    the points of all their players, one multi-row INSERT of their statistics rows and one of the initial
+    puzzles. The statements return everything the ``state_update`` broadcast needs, so nothing is read back
+    afterwards.
+    """
+
+    def activate(self, session_ids: list[int], db: Session) -> dict[int, dict[str, Any]]:
+        """
+        Activate sessions that are still counting down and hand every player their first puzzle.
+
+        Sessions that are no longer in countdown (cancelled, already started) are skipped.
+
+        Args:
+            session_ids: IDs of the sessions to activate
+            db: Database session; the activation is committed
+
+        Returns:
+            dict[int, dict[str, Any]]: State data per activated session, ready for ``send_state``
+        """
+        now = datetime.now(timezone.utc)
+        team_name = select(models.Team.name).where(models.Team.id == models.GameSession.team_id).scalar_subquery()
+        sessions = db.execute(
+            update(models.GameSession)
+            .where(models.GameSession.id.in_(session_ids), models.GameSession.status == "countdown")
+            .values(status="active", started_at=now)
+            .returning(
+                models.GameSession.id,
+                models.GameSession.team_id,
+                models.GameSession.status,
+                models.GameSession.created_at,
+                models.GameSession.started_at,
+                models.GameSession.ended_at,
+                models.GameSession.survival_time_seconds,
+                team_name.label("team_name"),
+            )
+            .execution_options(synchronize_session=False),
+        ).all()
+        if not sessions:
+            db.commit()
+            return {}
+
+        session_by_team = {session.team_id: session for session in sessions}
+        users = db.execute(
+            update(models.User)
+            .where(models.User.team_id.in_(session_by_team))
+            .values(points=STARTING_POINTS)
+            .returning(models.User.id, models.User.username, models.User.points, models.User.color, models.User.team_id)
+            .execution_options(synchronize_session=False),
+        ).all()
+        users.sort(key=lambda user: user.id)
+        game_stats_service.record_players([(session_by_team[user.team_id].id, user.id) for user in users], db)
+
+        # Transient puzzles carry the generated data for the broadcast; the rows are inserted in one statement
+        puzzles = []
+        for user in users:
+            puzzle = models.Puzzle()
+            puzzle.type, puzzle.difficulty = difficulty_service.choose_next(user.id)
+            puzzle.seed = puzzle_generator.new_seed()
+            puzzle.status = "active"
+            puzzle.game_session_id = session_by_team[user.team_id].id
+            puzzle.user_id = user.id
+            puzzle.created_at = now
+            puzzle_deadline_service.set_deadline(puzzle, now)
+            puzzles.append(puzzle)
+        if puzzles:
+            # Rows are matched back by player (one new puzzle each), so the insert needs no ordering guarantee
+            # and is sent as a single multi-row statement
+            inserted = db.execute(
+                insert(models.Puzzle).returning(models.Puzzle.id, models.Puzzle.user_id),
+                [
+                    {
+                        "type": puzzle.type,
+                        "seed": puzzle.seed,
+                        "difficulty": puzzle.difficulty,
+                        "status": puzzle.status,
+                        "game_session_id": puzzle.game_session_id,
+                        "user_id": puzzle.user_id,
+                        "created_at": puzzle.created_at,
+                        "expires_at": puzzle.expires_at,
+                    }
+                    for puzzle in puzzles
+                ],
+            ).all()
+            puzzle_ids = {user_id: puzzle_id for puzzle_id, user_id in inserted}
+            for puzzle in puzzles:
+                puzzle.id = puzzle_ids[puzzle.user_id]
+        db.commit()
+
+        for session in sessions:
+            game_state_machine.track(session)
+        for puzzle in puzzles:
+            puzzle_deadline_service.schedule(puzzle.id, puzzle.expires_at)
+
+        users_by_team = defaultdict(list)
+        for user in users:
+            users_by_team[user.team_id].append(user)
+        # Every player starts with points; sessions of teams without players end right away
+        game_end_service.start_sessions({session.id: len(users_by_team[session.team_id]) for session in sessions}, db)
+        lobby_directory.refresh_teams(session_by_team, db)
+        puzzles_by_session = defaultdict(list)
+        for puzzle in puzzles:
+            puzzles_by_session[puzzle.game_session_id].append(puzzle)
+        return {
+            session.id: build_state_data(
+                session,
+                session.team_id,
+                session.team_name,
+                users_by_team[session.team_id],
+                puzzles_by_session[session.id],
+            )
+            for session in sessions
+        }
+
+
+# Global instance
+session_activation_service = SessionActivationService()
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..utils.websocket_broadcast import cache_user_color, clear_user_colors
+from .available_teams_service import OPEN_SESSION_STATES
+from .game_state_machine import InvalidTransition, LiveSession, game_state_machine
+from .session_activation_service import STARTING_POINTS
+
+
+class SessionRestartService:
+    """
+    "Play again" for a team whose game has finished.
+
+    The new session is opened in countdown with one conditional INSERT (the team exists and has no open
+    session), and the players' points are reset with one UPDATE that returns their colors, which seed the new
+    session's color cache. Team membership does not change, so the team-keyed caches (round-robin roster,
+    color masks) stay warm.
+    """
+
+    def restart(self, team_id: int, db: Session) -> tuple[LiveSession, Optional[int]]:
+        """
+        Open a new countdown session for a team and reset its players' points.
+
+        Args:
+            team_id: ID of the team
+            db: Database session; the restart is committed
+
+        Returns:
+            tuple[LiveSession, Optional[int]]: The new session and the ID of the session it replaces, if any
+
+        Raises:
+            LookupError: If the team does not exist
+            InvalidTransition: If the team's current game is not finished
+        """
+        previous = game_state_machine.current_for_team(team_id, db)
+        if previous is not None and previous.status != "finished":
+            raise InvalidTransition("Game session already in progress")
+        # The insert checks the database, so a game end that is still pending in memory must be written first
+        game_state_machine.flush(db)
+
+        team_exists = exists().where(models.Team.id == team_id)
+        open_session = exists().where(
+            models.GameSession.team_id == team_id,
+            models.GameSession.status.in_(OPEN_SESSION_STATES),
+        )
+        row = db.execute(
+            insert(models.GameSession)
+            .from_select(
+                ["team_id", "status", "created_at"],
+                select(literal(team_id), literal("countdown"), literal(datetime.now(timezone.utc))).where(
+                    team_exists,
+                    ~open_session,
+                ),
+            )
+            .returning(
+                models.GameSession.id,
+                models.GameSession.team_id,
+                models.GameSession.status,
+                models.GameSession.created_at,
+                models.GameSession.started_at,
+                models.GameSession.ended_at,
+                models.GameSession.survival_time_seconds,
+            ),
+        ).first()
+        if row is None:
+            db.rollback()
+            if db.get(models.Team, team_id) is None:
+                raise LookupError(f"Team {team_id} not found")
+            raise InvalidTransition("Game session already in progress")
+
+        users = db.execute(
+            update(models.User)
+            .where(models.User.team_id == team_id)
+            .values(points=STARTING_POINTS)
+            .returning(models.User.id, models.User.color)
+            .execution_options(synchronize_session=False),
+        ).all()
+        db.commit()
+
+        session = game_state_machine.track(row)
+        for user in users:
+            if user.color:
+                cache_user_color(session.id, user.id, user.color)
+        previous_id = previous.id if previous is not None else None
+        if previous_id is not None:
+            clear_user_colors(previous_id)
+        return session, previous_id
+
+
+# Global instance
+session_restart_service = SessionRestartService()
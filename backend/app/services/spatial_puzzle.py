@@ -0,0 +1,149 @@
+import json
+from typing import Any, Optional
+
+import numpy as np
+
+
+# Board geometry in abstract units; the frontend scales it to the rendered puzzle area
+BOARD_WIDTH = 400
+BOARD_HEIGHT = 300
+CIRCLE_RADIUS = 15
+OBSTACLE_RADIUS_RANGE = (12, 28)
+NUM_OBSTACLES = 8
+NUM_WAYPOINTS = 4
+# Extra space kept free around the reference path so the generated layout is comfortably solvable
+PATH_CLEARANCE = 6
+# Upper bound on submitted path length, keeps validation inside the request budget
+MAX_PATH_POINTS = 20000
+# The current client draws its own obstacle instead of the generated layout and reports a win as "solved".
+# Accepted until the client renders the puzzle data and submits its drag path.
+LEGACY_SOLVED_ANSWER = "solved"
+
+
+def generate_spatial_puzzle(
+    rng: np.random.Generator,
+    num_obstacles: int = NUM_OBSTACLES,
+    circle_radius: int = CIRCLE_RADIUS,
+) -> tuple[dict, str]:
+    """
+    Generate a solvable spatial puzzle (drag the circle from the left edge to the right edge).
+
+    A random reference path is drawn first and obstacles are only placed where they keep clear of it, so
+    every layout is solvable by construction. The reference path is returned as the correct answer.
+    """
+    margin = circle_radius + 5
+    xs = np.linspace(margin, BOARD_WIDTH - margin, NUM_WAYPOINTS + 2)
+    ys = rng.uniform(margin, BOARD_HEIGHT - margin, size=NUM_WAYPOINTS + 2)
+    waypoints = np.round(np.column_stack([xs, ys]))
+
+    # Candidate obstacles are drawn in bulk around the direct route from start to end, then filtered against
+    # the reference path in one vectorized distance test
+    candidate_x = rng.uniform(margin * 3, BOARD_WIDTH - margin * 3, size=num_obstacles * 20)
+    direct_y = np.interp(candidate_x, waypoints[[0, -1], 0], waypoints[[0, -1], 1])
+    candidate_y = np.clip(direct_y + rng.normal(0, BOARD_HEIGHT / 4, size=len(candidate_x)), 0, BOARD_HEIGHT)
+    candidates = np.column_stack([candidate_x, candidate_y])
+    radii = rng.integers(OBSTACLE_RADIUS_RANGE[0], OBSTACLE_RADIUS_RANGE[1] + 1, size=len(candidates))
+    clearance = np.sqrt(_segment_distances_sq(waypoints, candidates).min(axis=0)) - radii
+    free = np.flatnonzero(clearance > circle_radius + PATH_CLEARANCE)
+
+    obstacles: list[dict[str, int]] = []
+    placed = np.empty((0, 3))
+    for index in free:
+        if len(obstacles) >= num_obstacles:
+            break
+        center, radius = np.round(candidates[index]), int(radii[index])
+        # Keep obstacles from overlapping each other
+        if len(placed) and np.any(np.hypot(*(placed[:, :2] - center).T) < placed[:, 2] + radius):
+            continue
+        placed = np.vstack([placed, [center[0], center[1], radius]])
+        obstacles.append({"x": int(center[0]), "y": int(center[1]), "radius": radius})
+
+    data = {
+        "start_position": {"x": int(waypoints[0, 0]), "y": int(waypoints[0, 1])},
+        "end_position": {"x": int(waypoints[-1, 0]), "y": int(waypoints[-1, 1])},
+        "obstacles": obstacles,
+        "circle_radius": circle_radius,
+        "width": BOARD_WIDTH,
+        "height": BOARD_HEIGHT,
+    }
+    correct_answer = json.dumps(waypoints.astype(int).tolist())
+    return data, correct_answer
+
+
+def validate_path(data: dict[str, Any], answer: str) -> bool:
+    """
+    Check a submitted drag path against a spatial puzzle.
+
+    The path must start on the start position, end on the end position, stay on the board and never bring
+    the circle into contact with an obstacle. Every path segment is tested against every obstacle at once,
+    so large jumps between samples cannot tunnel through an obstacle.
+
+    Args:
+        data: Spatial puzzle data
+        answer: JSON list of points, either ``[x, y]`` pairs or ``{"x": ..., "y": ...}`` objects
+
+    Returns:
+        bool: True if the path solves the puzzle
+    """
+    path = parse_path(answer)
+    if path is None:
+        return False
+
+    radius = float(data["circle_radius"])
+    start = np.array([data["start_position"]["x"], data["start_position"]["y"]], dtype=float)
+    end = np.array([data["end_position"]["x"], data["end_position"]["y"]], dtype=float)
+    if np.hypot(*(path[0] - start)) > radius or np.hypot(*(path[-1] - end)) > radius:
+        return False
+
+    width, height = data.get("width", BOARD_WIDTH), data.get("height", BOARD_HEIGHT)
+    if np.any(path < radius) or np.any(path[:, 0] > width - radius) or np.any(path[:, 1] > height - radius):
+        return False
+
+    if not data["obstacles"]:
+        return True
+    obstacles = np.array([[o["x"], o["y"], o["radius"]] for o in data["obstacles"]], dtype=float)
+    distances_sq = _segment_distances_sq(path, obstacles[:, :2])
+    return bool(np.all(distances_sq >= (obstacles[:, 2] + radius) ** 2))
+
+
+def parse_path(answer: str) -> Optional[np.ndarray]:
+    """Parse a submitted path into an ``(n, 2)`` float array, or None if it is malformed."""
+    try:
+        points = json.loads(answer)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(points, list) or not 1 <= len(points) <= MAX_PATH_POINTS:
+        return None
+    if isinstance(points[0], dict):
+        points = [[point.get("x"), point.get("y")] for point in points if isinstance(point, dict)]
+    try:
+        path = np.asarray(points, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    if path.ndim != 2 or path.shape[1] != 2 or not np.all(np.isfinite(path)):
+        return None
+    return path
+
+
+def _segment_distances_sq(path: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Squared distance from every point to every segment of a polyline.
+
+    Args:
+        path: ``(n, 2)`` polyline vertices; a single vertex is treated as a zero-length segment
+        points: ``(m, 2)`` points
+
+    Returns:
+        np.ndarray: ``(n - 1, m)`` squared distances (``(1, m)`` for a single vertex)
+    """
+    if len(path) == 1:
+        path = np.vstack([path, path])
+    # Work on x/y components separately to avoid (n, m, 2) temporaries
+    ax, ay = path[:-1, 0:1], path[:-1, 1:2]
+    dx, dy = path[1:, 0:1] - ax, path[1:, 1:2] - ay
+    px, py = points[None, :, 0], points[None, :, 1]
+    lengths_sq = np.maximum(dx * dx + dy * dy, 1e-12)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / lengths_sq, 0.0, 1.0)
+    cx = ax + t * dx - px
+    cy = ay + t * dy - py
+    return cx * cx + cy * cy
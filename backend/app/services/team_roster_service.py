@@ -0,0 +1,69 @@
+import threading
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+class TeamRosterService:
+    """
+    In-memory cache of team rosters in round-robin (user ID) order.
+
+    The round-robin successor of every player is precomputed once per roster, so the answer path can look up
+    who receives points without querying the team. Call ``invalidate`` whenever team membership changes.
+    """
+
+    def __init__(self):
+        self._successors: dict[int, dict[int, int]] = {}
+        self._generation = 0  # Bumped on every invalidation so a concurrent load cannot cache a stale roster
+        self._lock = threading.Lock()
+
+    def get_successor(self, team_id: int, user_id: int, db: Session) -> Optional[int]:
+        """
+        Get the next player after ``user_id`` in the team's round-robin order.
+
+        Args:
+            team_id: ID of the team
+            user_id: ID of the current player
+            db: Database session, only used when the roster is not cached yet
+
+        Returns:
+            Optional[int]: ID of the next player, or None for single player teams and unknown users
+        """
+        successors = self._successors.get(team_id)
+        if successors is None:
+            successors = self._load(team_id, db)
+        return successors.get(user_id)
+
+    def invalidate(self, team_id: Optional[int]) -> None:
+        """Forget the cached roster of a team."""
+        if team_id is None:
+            return
+        with self._lock:
+            self._generation += 1
+            self._successors.pop(team_id, None)
+
+    def clear(self) -> None:
+        """Forget all cached rosters."""
+        with self._lock:
+            self._generation += 1
+            self._successors.clear()
+
+    def _load(self, team_id: int, db: Session) -> dict[int, int]:
+        generation = self._generation
+        user_ids = list(
+            db.execute(select(models.User.id).where(models.User.team_id == team_id).order_by(models.User.id)).scalars(),
+        )
+        successors: dict[int, int] = {}
+        if len(user_ids) > 1:
+            successors = {user_id: user_ids[(i + 1) % len(user_ids)] for i, user_id in enumerate(user_ids)}
+        with self._lock:
+            if generation == self._generation:
+                self._successors[team_id] = successors
+        return successors
+
+
+# Global instance
+team_roster_service = TeamRosterService()
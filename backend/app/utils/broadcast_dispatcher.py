@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from .websocket_broadcast import connections, load_state_data, send_state
+
+
+# Broadcasts waiting for the event loop before new ones are dropped
+MAX_PENDING_BROADCASTS = 10000
+
+
+class BroadcastDispatcher:
+    """
+    Hands broadcasts from sync code (request handlers, background threads) to the server's event loop.
+
+    WebSocket connections belong to the loop that accepted them, so sends must run there. The dispatcher is
+    attached to that loop at startup; ``submit`` can be called from any thread, enqueues the broadcast with
+    ``call_soon_threadsafe`` and returns immediately. A single consumer task on the loop runs the broadcasts
+    in submission order. Without an attached loop (scripts, tests with a bare app) broadcasts are dropped,
+    since nobody can be connected.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_BROADCASTS):
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Attach to the running event loop. Must be called from a coroutine on that loop."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._loop, self._queue = loop, queue
+        self._task = loop.create_task(self._run(queue))
+
+    async def stop(self) -> None:
+        """Detach from the loop, dropping broadcasts that have not run yet."""
+        with self._lock:
+            task, self._loop, self._queue, self._task = self._task, None, None, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def submit(self, broadcast: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        """
+        Schedule ``broadcast(*args)`` on the event loop. Thread-safe and non-blocking.
+
+        Args:
+            broadcast: Coroutine function doing the sends
+            *args: Its arguments
+
+        Returns:
+            bool: False if the broadcast was dropped because no loop is attached
+        """
+        with self._lock:
+            loop, queue = self._loop, self._queue
+        if loop is None or queue is None:
+            self.dropped += 1
+            return False
+        try:
+            loop.call_soon_threadsafe(self._enqueue, queue, broadcast, args)
+        except RuntimeError:
+            # The loop has been closed
+            self.dropped += 1
+            return False
+        return True
+
+    def broadcast_state(self, session_id: int, db: Session) -> None:
+        """
+        Broadcast a session's current state.
+
+        The state is queried in the caller's thread with the caller's database session; only the sends run
+        on the event loop. Sessions without connected clients cost nothing.
+        """
+        if session_id not in connections:
+            return
+        state_data = load_state_data(session_id, db)
+        if state_data is not None:
+            self.submit(send_state, session_id, state_data)
+
+    def _enqueue(self, queue: asyncio.Queue, broadcast: Callable[..., Awaitable[Any]], args: tuple) -> None:
+        """Runs on the event loop."""
+        try:
+            queue.put_nowait((broadcast, args))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            broadcast, args = await queue.get()
+            try:
+                await broadcast(*args)
+            except Exception as e:
+                print(f"Broadcast {getattr(broadcast, '__name__', broadcast)} failed: {e}")
+
+
+# Global instance
+broadcast_dispatcher = BroadcastDispatcher()
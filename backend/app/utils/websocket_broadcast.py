@@ -4,6 +4,8 @@ import logging
 from typing import Any, Optional
 
 from fastapi import WebSocket
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import models
@@ -121,35 +123,30 @@ async def broadcast_message(session_id: int, message_type: str, data: dict[str,
         remove_connection(session_id, websocket)
 
 
-async def broadcast_state(session_id: int, db: Session):
-    """Broadcast current game state to all connected clients"""
-    if session_id not in connections:
-        return
-
-    # Get current game session
-    session = db.query(models.GameSession).filter(models.GameSession.id == session_id).first()
-    if not session:
-        return
-
-    # Get team and users
-    team = db.query(models.Team).filter(models.Team.id == session.team_id).first()
-    if not team:
-        return
-
-    users = db.query(models.User).filter(models.User.team_id == team.id).all()
-
-    # Get current puzzles for each user
-    puzzles = (
-        db.query(models.Puzzle)
-        .filter(models.Puzzle.game_session_id == session_id, models.Puzzle.status == "active")
-        .all()
-    )
-
+def build_state_data(
+    session: Any,
+    team_id: int,
+    team_name: str,
+    users: list[Any],
+    puzzles: list[Any],
+) -> dict[str, Any]:
+    """
+    Build the ``state_update`` payload of a session.
+
+    Args:
+        session: Game session (model instance or row with the same attributes)
+        team_id: ID of the session's team
+        team_name: Name of the session's team
+        users: Team members (model instances or rows with the same attributes)
+        puzzles: Active puzzles of the session
+
+    Returns:
+        dict[str, Any]: State data as sent to the clients
+    """
     # Create user puzzle mapping
     user_puzzles = {puzzle.user_id: puzzle for puzzle in puzzles}
 
-    # Build state data
-    state_data = {
+    return {
         "session": {
             "id": session.id,
             "status": session.status,
@@ -157,7 +154,7 @@ async def broadcast_state(session_id: int, db: Session):
             "ended_at": session.ended_at.isoformat() if session.ended_at else None,
             "survival_time_seconds": session.survival_time_seconds,
         },
-        "team": {"id": team.id, "name": team.name},
+        "team": {"id": team_id, "name": team_name},
         "players": [
             {
                 "id": user.id,
@@ -185,10 +182,16 @@ async def broadcast_state(session_id: int, db: Session):
             }
             for puzzle in puzzles
         ],
-        "mouse_positions": mouse_positions.get(session_id, {}),
-        "player_activity": player_activity.get(session_id, {}),
+        "mouse_positions": mouse_positions.get(session.id, {}),
+        "player_activity": player_activity.get(session.id, {}),
     }
 
+
+async def send_state(session_id: int, state_data: dict[str, Any]):
+    """Send an already built state update to all connected clients"""
+    if session_id not in connections:
+        return
+
     message = {"type": "state_update", "data": state_data, "timestamp": datetime.now(timezone.utc).isoformat()}
 
     message_json = json.dumps(message)
@@ -206,6 +209,65 @@ async def broadcast_state(session_id: int, db: Session):
         remove_connection(session_id, websocket)
 
 
+def _session_query(session_id: int) -> Select:
+    """A session with its team's name"""
+    return (
+        select(models.GameSession, models.Team.name)
+        .join(models.Team, models.Team.id == models.GameSession.team_id)
+        .where(models.GameSession.id == session_id)
+    )
+
+
+def _users_query(team_id: int) -> Select:
+    return select(models.User).where(models.User.team_id == team_id)
+
+
+def _active_puzzles_query(session_id: int) -> Select:
+    return select(models.Puzzle).where(models.Puzzle.game_session_id == session_id, models.Puzzle.status == "active")
+
+
+def load_state_data(session_id: int, db: Session) -> Optional[dict[str, Any]]:
+    """Query a session's current state and build its ``state_update`` payload (None if it does not exist)"""
+    row = db.execute(_session_query(session_id)).first()
+    if not row:
+        return None
+    session, team_name = row
+
+    users = db.scalars(_users_query(session.team_id)).all()
+    puzzles = db.scalars(_active_puzzles_query(session_id)).all()
+    return build_state_data(session, session.team_id, team_name, users, puzzles)
+
+
+async def load_state_data_async(session_id: int, db: AsyncSession) -> Optional[dict[str, Any]]:
+    """
+    Same as ``load_state_data`` on an asyncio session, so the event loop keeps serving other sockets.
+
+    The session of a WebSocket lives as long as its connection; it is closed after every load so that it does
+    not hold a database connection between state updates.
+    """
+    try:
+        row = (await db.execute(_session_query(session_id))).first()
+        if not row:
+            return None
+        session, team_name = row
+
+        users = (await db.scalars(_users_query(session.team_id))).all()
+        puzzles = (await db.scalars(_active_puzzles_query(session_id))).all()
+        return build_state_data(session, session.team_id, team_name, users, puzzles)
+    finally:
+        await db.close()
+
+
+async def broadcast_state(session_id: int, db: AsyncSession):
+    """Broadcast current game state to all connected clients"""
+    if session_id not in connections:
+        return
+
+    state_data = await load_state_data_async(session_id, db)
+    if state_data is not None:
+        await send_state(session_id, state_data)
+
+
 async def broadcast_puzzle_interaction(
     session_id: int,
     user_id: int,
@@ -214,6 +276,9 @@ async def broadcast_puzzle_interaction(
     interaction_data: dict[str, Any],
 ):
     """Broadcast puzzle interaction to all connected clients"""
+    if session_id not in connections:
+        return
+
     message_data = {
         "user_id": user_id,
         "puzzle_id": puzzle_id,
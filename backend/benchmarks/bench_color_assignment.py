@@ -0,0 +1,106 @@
+"""
+Benchmark of simultaneous joins to one team (event start burst).
+
+N threads release at once and each moves a fresh player into the same team and gives them a color. Compares
+the previous retry loop (re-read all members, commit, re-check for conflicts, retry on a constraint error)
+with the bitmask allocator (one conditional UPDATE per player).
+Run from the backend directory: python benchmarks/bench_color_assignment.py [n_players ...]
+"""
+
+import sys
+import threading
+import time
+
+from common import create_benchmark_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from app import models
+from app.services.color_assignment_service import ColorAssignmentService
+
+
+def legacy_allocate(service: ColorAssignmentService, user_id: int, team_id: int, db) -> None:
+    """The previous assignment loop, writing the team move of ``join_team`` together with the color."""
+    user = db.get(models.User, user_id)
+    for _ in range(len(service.color_scheme)):
+        team_members = db.query(models.User).filter(models.User.team_id == team_id).all()
+        color = service._find_available_color([member.color for member in team_members if member.color])
+        if color == service.fallback_color:
+            return
+        user.team_id = team_id
+        user.color = color
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        conflict = (
+            db.query(models.User)
+            .filter(models.User.team_id == team_id, models.User.color == color, models.User.id != user.id)
+            .first()
+        )
+        if not conflict:
+            return
+        user.color = None
+        db.commit()
+
+
+def run(n_players: int, allocate) -> tuple[float, int, int]:
+    """Returns (wall time in ms, statements executed, players that got a scheme color)."""
+    _, tmp, SessionLocal = create_benchmark_app()
+    try:
+        db = SessionLocal()
+        team = models.Team(name="burst")
+        db.add(team)
+        db.flush()
+        team_id = team.id
+        users = [models.User(username=f"burst_{index}") for index in range(n_players)]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+        db.close()
+
+        service = ColorAssignmentService()
+        statements = []
+        event.listen(SessionLocal.kw["bind"], "before_cursor_execute", lambda *args: statements.append(args[2]))
+        barrier = threading.Barrier(n_players)
+
+        def join(user_id: int) -> None:
+            session = SessionLocal()
+            try:
+                barrier.wait()
+                allocate(service, user_id, team_id, session)
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=join, args=(user_id,)) for user_id in user_ids]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = (time.perf_counter() - start) * 1000
+
+        db = SessionLocal()
+        colored = db.query(models.User).filter(models.User.team_id == team_id, models.User.color.isnot(None)).count()
+        db.close()
+        return elapsed, len(statements), colored
+    finally:
+        tmp.close()
+
+
+def main(sizes: list[int]) -> None:
+    for n_players in sizes:
+        legacy_ms, legacy_statements, legacy_colored = run(n_players, legacy_allocate)
+        bitmask_ms, bitmask_statements, bitmask_colored = run(
+            n_players,
+            lambda service, user_id, team_id, db: service.allocate_color(user_id, team_id, db),
+        )
+        print(
+            f"{n_players:>4} simultaneous joins  "
+            f"retry-loop={legacy_ms:8.1f}ms {legacy_statements:>5} stmts ({legacy_colored} colored)  "
+            f"bitmask={bitmask_ms:8.1f}ms {bitmask_statements:>5} stmts ({bitmask_colored} colored)",
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [4, 16, 64])
@@ -0,0 +1,86 @@
+"""
+Benchmark of leaderboard reads (screens polling the top teams and a team's rank).
+
+Fills the database with N finished games and compares SQL per request (top-10 ordered by survival time, and
+a rank count for one team's best game) with the in-memory leaderboards.
+Run from the backend directory: python benchmarks/bench_leaderboard.py [n_sessions ...]
+"""
+
+from datetime import datetime, timedelta, timezone
+import random
+import sys
+
+from common import create_benchmark_app, report, timed
+from sqlalchemy import func, select
+from app import models
+from app.services.leaderboard_service import LeaderboardService
+
+
+TEAMS = 1000
+
+
+def sql_top(db) -> list:
+    return db.execute(
+        select(models.GameSession.team_id, func.max(models.GameSession.survival_time_seconds).label("best"))
+        .where(models.GameSession.status == "finished")
+        .group_by(models.GameSession.team_id)
+        .order_by(func.max(models.GameSession.survival_time_seconds).desc())
+        .limit(10),
+    ).all()
+
+
+def sql_rank(db, team_id: int) -> int:
+    best = (
+        select(func.max(models.GameSession.survival_time_seconds).label("best"))
+        .where(models.GameSession.status == "finished")
+        .group_by(models.GameSession.team_id)
+        .subquery()
+    )
+    team_best = db.execute(
+        select(func.max(models.GameSession.survival_time_seconds)).where(
+            models.GameSession.team_id == team_id,
+            models.GameSession.status == "finished",
+        ),
+    ).scalar_one()
+    return db.execute(select(func.count()).select_from(best).where(best.c.best > team_best)).scalar_one() + 1
+
+
+def main(sizes: list[int]) -> None:
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    for n_sessions in sizes:
+        _, tmp, SessionLocal = create_benchmark_app()
+        try:
+            db = SessionLocal()
+            teams = [models.Team(name=f"Team {index}") for index in range(TEAMS)]
+            db.add_all(teams)
+            db.flush()
+            db.add_all(
+                models.GameSession(
+                    team_id=rng.choice(teams).id,
+                    status="finished",
+                    ended_at=now - timedelta(minutes=rng.randrange(60 * 24 * 30)),
+                    survival_time_seconds=rng.randrange(1, 3600),
+                )
+                for _ in range(n_sessions)
+            )
+            db.commit()
+            team_id = teams[TEAMS // 2].id
+
+            service = LeaderboardService()
+            load = timed(lambda: service.load(db), 1)
+            print(f"{n_sessions} finished games, {TEAMS} teams")
+            report("load (startup)", load)
+            report("sql top-10", timed(lambda: sql_top(db), 50))
+            report("memory top-10", timed(lambda: service.top("all", db), 1000))
+            report("sql rank", timed(lambda: sql_rank(db, team_id), 50))
+            report("memory rank", timed(lambda: service.rank(team_id, "all", db), 1000))
+            # SQL ranks ties equally; the leaderboard puts the earlier game first
+            assert sql_rank(db, team_id) <= service.rank(team_id, "all", db)["rank"]
+            db.close()
+        finally:
+            tmp.close()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
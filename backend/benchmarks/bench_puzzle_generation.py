@@ -0,0 +1,38 @@
+"""
+Benchmark of batch puzzle generation against the per-puzzle generators.
+
+Run from the backend directory: python benchmarks/bench_puzzle_generation.py [n]
+"""
+
+import random
+import sys
+
+import numpy as np
+
+from common import timed
+from app.services.multitasking_puzzle import generate_multitasking_puzzle
+from app.services.puzzle_generator import generate_batch, generate_concentration_puzzle, generate_memory_puzzle
+
+
+PER_PUZZLE = {
+    "memory": lambda rng, np_rng: generate_memory_puzzle(rng),
+    "concentration": lambda rng, np_rng: generate_concentration_puzzle(rng),
+    "multitasking": lambda rng, np_rng: generate_multitasking_puzzle(np_rng),
+}
+
+
+def main(n: int = 10000) -> None:
+    for puzzle_type, generate_one in PER_PUZZLE.items():
+        rng, np_rng = random.Random(0), np.random.default_rng(0)
+        (single,) = timed(lambda: [generate_one(rng, np_rng) for _ in range(n)], 1)
+        (arrays,) = timed(lambda: generate_batch(puzzle_type, n, np.random.default_rng(0)), 1)
+        (dicts,) = timed(lambda: generate_batch(puzzle_type, n, np.random.default_rng(0)).to_puzzles(), 1)
+        print(
+            f"{puzzle_type:<14} n={n}  per-puzzle={single:8.1f}ms  "
+            f"batch arrays={arrays:7.1f}ms ({single / arrays:6.1f}x)  "
+            f"batch dicts={dicts:7.1f}ms ({single / dicts:4.1f}x)",
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
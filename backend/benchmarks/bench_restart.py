@@ -0,0 +1,73 @@
+"""
+Benchmark of back-to-back games of one team ("play again").
+
+Finishes the team's game and starts the next one, N times, calling the endpoint functions directly so the
+test client's thread hand-off is not measured. Compares the previous way (create_game_session, which
+re-reads the team and caches every player's color one by one) with restart_game, which also resets the
+points and archives the old session's puzzles (run here right after the request, as the background task).
+Run from the backend directory: python benchmarks/bench_restart.py [n_games]
+"""
+
+import asyncio
+import contextlib
+import io
+import sys
+import time
+
+from common import create_benchmark_app, report
+from fastapi import BackgroundTasks
+from sqlalchemy import event
+from app.routers import game
+from app.schemas.v1.api.requests import GameSessionCreate, GameSessionStateUpdate, RestartGameRequest
+from app.services.countdown_service import countdown_service
+
+
+def create_session(team_id: int, db):
+    return game.create_game_session(GameSessionCreate(team_id=team_id), db)
+
+
+def restart(team_id: int, db):
+    background_tasks = BackgroundTasks()
+    session = game.restart_game(RestartGameRequest(team_id=team_id), background_tasks, db)
+    asyncio.run(background_tasks())
+    return session
+
+
+def run(n_games: int, start_next) -> tuple[list[float], float]:
+    """Returns (durations in ms, statements per game)."""
+    client, tmp, SessionLocal = create_benchmark_app()
+    try:
+        team_id = client.post("/team/create", json={"name": "replay"}).json()["id"]
+        for index in range(4):
+            client.post("/team/register", json={"username": f"replay_{index}"})
+            client.post(f"/team/join?username=replay_{index}&team_id={team_id}")
+        session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+
+        statements = []
+        event.listen(SessionLocal.kw["bind"], "before_cursor_execute", lambda *args: statements.append(args[2]))
+        durations = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(n_games):
+                countdown_service.stop_countdown(session_id)
+                db = SessionLocal()
+                game.update_game_session_state(session_id, GameSessionStateUpdate(status="active"), db)
+                game.update_game_session_state(session_id, GameSessionStateUpdate(status="finished"), db)
+                statements.clear()
+                start = time.perf_counter()
+                session_id = start_next(team_id, db).id
+                durations.append((time.perf_counter() - start) * 1000)
+                db.close()
+        countdown_service.stop_countdown(session_id)
+        return durations, len(statements)
+    finally:
+        tmp.close()
+
+
+def main(n_games: int) -> None:
+    for name, start_next in (("create session", create_session), ("restart", restart)):
+        durations, statements = run(n_games, start_next)
+        report(f"{name} ({statements} stmts)", durations)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
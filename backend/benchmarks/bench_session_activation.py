@@ -0,0 +1,89 @@
+"""
+Benchmark of activating N game sessions at once (tournament start).
+
+Compares the bulk activation against the previous per-player ORM path (one flushed ``add`` per initial
+puzzle, then re-reading the session state for the broadcast).
+Run from the backend directory: python benchmarks/bench_session_activation.py [n_sessions ...]
+"""
+
+from datetime import datetime, timezone
+import sys
+import time
+
+from common import create_benchmark_app
+from app import models
+from app.services.puzzle_deadline_service import puzzle_deadline_service
+from app.services.session_activation_service import session_activation_service
+from app.utils.websocket_broadcast import build_state_data
+
+
+PLAYERS_PER_TEAM = 4
+
+
+def create_countdown_sessions(SessionLocal, n_sessions: int) -> list[int]:
+    db = SessionLocal()
+    try:
+        session_ids = []
+        for team_index in range(n_sessions):
+            team = models.Team(name=f"bench_team_{team_index}")
+            db.add(team)
+            db.flush()
+            for player_index in range(PLAYERS_PER_TEAM):
+                db.add(models.User(username=f"bench_{team_index}_{player_index}", team_id=team.id))
+            session = models.GameSession(team_id=team.id, status="countdown")
+            db.add(session)
+            db.flush()
+            session_ids.append(session.id)
+        db.commit()
+        return session_ids
+    finally:
+        db.close()
+
+
+def activate_per_player(session_ids: list[int], db) -> None:
+    """The previous countdown path: ORM loads, one ``issue_puzzle`` per player and a re-query for the state."""
+    for session_id in session_ids:
+        session = db.get(models.GameSession, session_id)
+        session.status = "active"
+        session.started_at = datetime.now(timezone.utc)
+        team_users = db.query(models.User).filter(models.User.team_id == session.team_id).all()
+        for user in team_users:
+            user.points = 15
+        for user in team_users:
+            puzzle_deadline_service.issue_puzzle(user.id, session_id, db)
+        db.commit()
+
+        team = db.get(models.Team, session.team_id)
+        users = db.query(models.User).filter(models.User.team_id == team.id).all()
+        puzzles = db.query(models.Puzzle).filter(models.Puzzle.game_session_id == session_id).all()
+        build_state_data(session, team.id, team.name, users, puzzles)
+
+
+def run(n_sessions: int, activate) -> float:
+    _, tmp, SessionLocal = create_benchmark_app()
+    try:
+        session_ids = create_countdown_sessions(SessionLocal, n_sessions)
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            activate(session_ids, db)
+            return (time.perf_counter() - start) * 1000
+        finally:
+            db.close()
+    finally:
+        puzzle_deadline_service.clear()
+        tmp.close()
+
+
+def main(sizes: list[int]) -> None:
+    for n_sessions in sizes:
+        per_player = run(n_sessions, activate_per_player)
+        bulk = run(n_sessions, session_activation_service.activate)
+        print(
+            f"activate {n_sessions:>4} sessions ({n_sessions * PLAYERS_PER_TEAM:>5} players)  "
+            f"per-player={per_player:8.1f}ms  bulk={bulk:8.1f}ms ({per_player / bulk:4.1f}x)",
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 10, 50, 200])
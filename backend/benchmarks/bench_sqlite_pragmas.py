@@ -0,0 +1,157 @@
+"""
+Throughput of a mixed workload under SQLite's default settings and the configured pragma profile.
+
+Answer threads submit correct answers (calling the endpoint function directly), reader threads fetch current
+puzzles and the team points, and one thread decays every player with the decay loop's bulk UPDATE, all on
+their own sessions of one file database. Reports operations per second per kind and how many failed with
+"database is locked".
+Run from the backend directory: python benchmarks/bench_sqlite_pragmas.py [seconds] [answer_threads]
+"""
+
+import contextlib
+import io
+import sys
+import threading
+import time
+
+from common import create_benchmark_app
+from sqlalchemy import func, update
+from sqlalchemy.exc import OperationalError
+from app import models
+from app.config import settings
+from app.routers import puzzle
+from app.schemas.v1.api.requests import PuzzleAnswer
+
+
+READER_THREADS = 2
+DECAY_INTERVAL_SECONDS = 0.01
+
+
+def setup(client, SessionLocal, n_teams: int) -> list[list[int]]:
+    """One team of two players per answer thread, each with an active puzzle; returns the user IDs."""
+    teams = []
+    for index in range(n_teams):
+        team_id = client.post("/team/create", json={"name": f"mixed_{index}"}).json()["id"]
+        user_ids = []
+        for player in range(2):
+            username = f"mixed_{index}_{player}"
+            user_ids.append(client.post("/team/register", json={"username": username}).json()["id"])
+            client.post(f"/team/join?username={username}&team_id={team_id}")
+        session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+        for user_id in user_ids:
+            client.post("/puzzle/create", json={"type": "memory", "game_session_id": session_id, "user_id": user_id})
+        teams.append(user_ids)
+    db = SessionLocal()
+    # Enough points that the decay thread never eliminates anyone
+    db.execute(update(models.User).values(points=10**6))
+    db.commit()
+    db.close()
+    return teams
+
+
+def run(pragmas: dict, seconds: float, n_answer_threads: int) -> dict[str, list[int]]:
+    """Returns [operations, locked errors] per kind of work."""
+    client, tmp, SessionLocal = create_benchmark_app(pragmas)
+    results = {"answer": [0, 0], "read": [0, 0], "decay": [0, 0]}
+    lock = threading.Lock()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            teams = setup(client, SessionLocal, n_answer_threads)
+        stop = threading.Event()
+
+        def count(kind: str, operation) -> None:
+            db = SessionLocal()
+            try:
+                operation(db)
+                outcome = 0
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                db.rollback()
+                outcome = 1
+            finally:
+                db.close()
+            with lock:
+                results[kind][outcome] += 1
+
+        def answer_worker(user_ids: list[int]) -> None:
+            current = {}
+            for user_id in user_ids:
+                db = SessionLocal()
+                active = puzzle.get_current_puzzle(user_id, db)
+                current[user_id] = (active.id, active.correct_answer)
+                db.close()
+            turn = 0
+            while not stop.is_set():
+                user_id = user_ids[turn % len(user_ids)]
+                turn += 1
+
+                def answer(db, user_id=user_id):
+                    puzzle_id, correct_answer = current[user_id]
+                    response = puzzle.submit_answer(
+                        PuzzleAnswer(puzzle_id=puzzle_id, answer=correct_answer, user_id=user_id),
+                        db,
+                    )
+                    # Responses never include the answer; the issued puzzle is still in the session
+                    next_puzzle = db.get(models.Puzzle, response.next_puzzle.id)
+                    current[user_id] = (next_puzzle.id, next_puzzle.correct_answer)
+
+                count("answer", answer)
+
+        def read_worker() -> None:
+            turn = 0
+            while not stop.is_set():
+                user_ids = teams[turn % len(teams)]
+                turn += 1
+
+                def read(db, user_ids=user_ids):
+                    team_id = db.get(models.User, user_ids[0]).team_id
+                    puzzle.get_current_puzzle(user_ids[turn % 2], db)
+                    puzzle.get_team_points(team_id, db)
+
+                count("read", read)
+
+        def decay_worker() -> None:
+            while not stop.is_set():
+
+                def decay(db):
+                    db.execute(
+                        update(models.User)
+                        .where(models.User.points > 0)
+                        .values(points=func.max(0, models.User.points - 1))
+                        .returning(models.User.id),
+                    ).all()
+                    db.commit()
+
+                count("decay", decay)
+                time.sleep(DECAY_INTERVAL_SECONDS)
+
+        threads = [threading.Thread(target=answer_worker, args=(user_ids,)) for user_ids in teams]
+        threads += [threading.Thread(target=read_worker) for _ in range(READER_THREADS)]
+        threads.append(threading.Thread(target=decay_worker))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        return results
+    finally:
+        tmp.close()
+
+
+def main(seconds: float, n_answer_threads: int) -> None:
+    for name, pragmas in (("sqlite defaults", {}), ("configured pragmas", settings.sqlite_pragmas())):
+        results = run(pragmas, seconds, n_answer_threads)
+        summary = "  ".join(
+            f"{kind}={done / seconds:7.1f}/s (locked {locked})" for kind, (done, locked) in results.items()
+        )
+        print(f"{name:<20} {summary}")
+
+
+if __name__ == "__main__":
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 3.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
@@ -0,0 +1,70 @@
+"""
+Latency benchmark for POST /puzzle/answer.
+
+Run from the backend directory: python benchmarks/bench_submit_answer.py [iterations]
+"""
+
+import sys
+import time
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from common import create_benchmark_app, report
+from app.models import Puzzle
+
+
+def main(iterations: int = 500) -> None:
+    client, tmp, SessionLocal = create_benchmark_app()
+    unique = uuid4().hex[:8]
+    team_id = client.post("/team/create", json={"name": f"bench_{unique}"}).json()["id"]
+    user_ids = []
+    for i in range(4):
+        username = f"bench{i}_{unique}"
+        user_ids.append(client.post("/team/register", json={"username": username}).json()["id"])
+        client.post(f"/team/join?username={username}&team_id={team_id}")
+    session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+
+    current = {
+        user_id: client.post(
+            "/puzzle/create",
+            json={"type": "memory", "game_session_id": session_id, "user_id": user_id},
+        ).json()
+        for user_id in user_ids
+    }
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(SessionLocal.kw["bind"], "before_cursor_execute", count)
+
+    def stored_answer(puzzle_id: int) -> str:
+        """Responses never include the answer; look it up without counting or timing the query."""
+        event.remove(SessionLocal.kw["bind"], "before_cursor_execute", count)
+        db = SessionLocal()
+        try:
+            return db.get(Puzzle, puzzle_id).correct_answer
+        finally:
+            db.close()
+            event.listen(SessionLocal.kw["bind"], "before_cursor_execute", count)
+
+    durations = []
+    for i in range(iterations):
+        user_id = user_ids[i % len(user_ids)]
+        puzzle = current[user_id]
+        answer = stored_answer(puzzle["id"])
+        start = time.perf_counter()
+        resp = client.post(
+            "/puzzle/answer",
+            json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id},
+        ).json()
+        durations.append((time.perf_counter() - start) * 1000)
+        current[user_id] = resp["next_puzzle"]
+    report("POST /puzzle/answer", durations)
+    print(f"statements per answer: {len(statements) / iterations:.2f}")
+    tmp.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
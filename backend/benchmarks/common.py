@@ -0,0 +1,86 @@
+"""Shared helpers for the backend benchmarks."""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import create_db_engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.routers import game, puzzle, team  # noqa: E402
+from app.services.available_teams_service import available_teams_service  # noqa: E402
+from app.services.color_assignment_service import color_assignment_service  # noqa: E402
+from app.services.game_end_service import game_end_service  # noqa: E402
+from app.services.game_state_machine import game_state_machine  # noqa: E402
+from app.services.leaderboard_service import leaderboard_service  # noqa: E402
+from app.services.lobby_directory import lobby_directory  # noqa: E402
+from app.services.matchmaking_service import matchmaking_service  # noqa: E402
+from app.services.percentile_service import percentile_service  # noqa: E402
+from app.services.team_roster_service import team_roster_service  # noqa: E402
+
+
+def create_benchmark_app(pragmas: Optional[dict[str, Any]] = None):
+    """
+    Create an app bound to a fresh temporary SQLite file. Returns (client, tmp, SessionLocal).
+
+    ``pragmas`` are applied to every connection; by default SQLite's own settings are used.
+    """
+    tmp = tempfile.NamedTemporaryFile(suffix=".db")
+    engine = create_db_engine(f"sqlite:///{tmp.name}", pragmas or {})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # In-memory caches are keyed by database IDs, which restart with every benchmark database
+    for cache in (
+        team_roster_service,
+        available_teams_service,
+        color_assignment_service,
+        lobby_directory,
+        matchmaking_service,
+        game_state_machine,
+        game_end_service,
+        leaderboard_service,
+        percentile_service,
+    ):
+        cache.clear()
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    for module in (team, game, puzzle):
+        app.include_router(module.router)
+        app.dependency_overrides[module.get_db] = override_get_db
+    return TestClient(app), tmp, SessionLocal
+
+
+def timed(fn: Callable[[], object], iterations: int) -> list[float]:
+    """Run ``fn`` ``iterations`` times and return the durations in milliseconds."""
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(name: str, durations_ms: list[float]) -> None:
+    """Print mean/p50/p95 for a list of durations."""
+    ordered = sorted(durations_ms)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{name:<40} n={len(ordered):<6} mean={statistics.mean(ordered):8.3f}ms "
+        f"p50={statistics.median(ordered):8.3f}ms p95={p95:8.3f}ms",
+    )
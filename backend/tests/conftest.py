@@ -13,6 +13,17 @@ from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.models import Base
 from app.routers.team import get_db
+from app.services.available_teams_service import available_teams_service
+from app.services.color_assignment_service import color_assignment_service
+from app.services.difficulty_service import difficulty_service
+from app.services.game_end_service import game_end_service
+from app.services.game_state_machine import game_state_machine
+from app.services.leaderboard_service import leaderboard_service
+from app.services.lobby_directory import lobby_directory
+from app.services.matchmaking_service import matchmaking_service
+from app.services.percentile_service import percentile_service
+from app.services.puzzle_deadline_service import puzzle_deadline_service
+from app.services.team_roster_service import team_roster_service
 
 
 # Use a temporary file-based SQLite database for each test function
@@ -32,6 +43,19 @@ def _setup_database():
             finally:
                 db.close()
 
+        # In-memory caches are keyed by database IDs, which restart with every test database
+        team_roster_service.clear()
+        available_teams_service.clear()
+        color_assignment_service.clear()
+        lobby_directory.clear()
+        matchmaking_service.clear()
+        difficulty_service.clear()
+        game_state_machine.clear()
+        puzzle_deadline_service.clear()
+        leaderboard_service.clear()
+        percentile_service.clear()
+        game_end_service.clear()
+
         app.dependency_overrides = {}
         app.dependency_overrides[get_db] = override_get_db
         yield
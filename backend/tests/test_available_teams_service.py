@@ -0,0 +1,79 @@
+from app.schemas.v1.core.player import AvailableTeam
+from app.services.available_teams_service import MAX_PLAYERS, AvailableTeamsService
+
+
+def make_team(team_id, name):
+    return AvailableTeam(
+        id=team_id,
+        name=name,
+        members=[],
+        player_count=0,
+        max_players=MAX_PLAYERS,
+        status="available",
+        game_session_id=None,
+        game_status=None,
+    )
+
+
+class InterleavedService(AvailableTeamsService):
+    """Serves teams from a dict and runs a hook after reading it, while the query would still be running."""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+        self.during_load = None
+
+    def _load(self, db, team_ids=None):
+        result = {team_id: team for team_id, team in self.rows.items() if team_ids is None or team_id in team_ids}
+        hook, self.during_load = self.during_load, None
+        if hook is not None:
+            hook()
+        return result
+
+
+def names(teams):
+    return [team.name for team in teams]
+
+
+class TestConcurrentReaders:
+    """Test suite for readers that reload the cache at the same time."""
+
+    def setup_method(self):
+        self.service = InterleavedService({1: make_team(1, "one"), 2: make_team(2, "two")})
+        self.service.get_available_teams(None)
+
+    def change(self, team_id, name):
+        self.service.rows[team_id] = make_team(team_id, name)
+        self.service.invalidate(team_id)
+
+    def test_slow_reader_does_not_overwrite_newer_result(self):
+        self.change(1, "one v2")
+
+        def newer_reader():
+            self.change(1, "one v3")
+            assert names(self.service.get_available_teams(None)) == ["one v3", "two"]
+
+        self.service.during_load = newer_reader
+        self.service.get_available_teams(None)
+        assert names(self.service.get_available_teams(None)) == ["one v3", "two"]
+
+    def test_changes_taken_by_both_readers_are_kept(self):
+        self.change(1, "one v2")
+
+        def other_reader():
+            self.change(2, "two v2")
+            self.service.get_available_teams(None)
+
+        self.service.during_load = other_reader
+        assert names(self.service.get_available_teams(None)) == ["one v2", "two v2"]
+        assert names(self.service.get_available_teams(None)) == ["one v2", "two v2"]
+
+    def test_team_invalidated_during_full_load_is_reloaded(self):
+        self.service.clear()
+
+        def invalidate_during_load():
+            self.change(2, "two v2")
+
+        self.service.during_load = invalidate_during_load
+        self.service.get_available_teams(None)
+        assert names(self.service.get_available_teams(None)) == ["one", "two v2"]
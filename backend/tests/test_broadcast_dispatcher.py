@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from app.utils.broadcast_dispatcher import BroadcastDispatcher
+
+
+class TestBroadcastDispatcher:
+    """Test suite for the sync-to-event-loop broadcast handoff."""
+
+    def test_submit_without_loop_is_dropped(self):
+        dispatcher = BroadcastDispatcher()
+
+        async def broadcast():
+            raise AssertionError("must not run")
+
+        assert dispatcher.submit(broadcast) is False
+        assert dispatcher.dropped == 1
+
+    def test_broadcasts_from_threads_run_on_the_loop_in_order(self):
+        dispatcher = BroadcastDispatcher()
+        received = []
+
+        async def main():
+            dispatcher.start()
+            loop_thread = threading.get_ident()
+            done = asyncio.Event()
+
+            async def broadcast(sender, index):
+                received.append((sender, index, threading.get_ident() == loop_thread))
+                if len(received) == 4 * 50:
+                    done.set()
+
+            def send(sender):
+                for index in range(50):
+                    assert dispatcher.submit(broadcast, sender, index)
+
+            threads = [threading.Thread(target=send, args=(sender,)) for sender in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            await asyncio.wait_for(done.wait(), timeout=5)
+            await dispatcher.stop()
+
+        asyncio.run(main())
+        assert all(on_loop for _, _, on_loop in received)
+        for sender in range(4):
+            assert [index for s, index, _ in received if s == sender] == list(range(50))
+
+    def test_full_queue_drops_and_failures_do_not_stop_the_consumer(self):
+        dispatcher = BroadcastDispatcher(max_pending=2)
+        received = []
+
+        async def broadcast(index):
+            if index == 0:
+                raise RuntimeError("send failed")
+            received.append(index)
+
+        async def main():
+            dispatcher.start()
+            for index in range(3):
+                dispatcher.submit(broadcast, index)
+            # Let the enqueue callbacks run, then the consumer
+            await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+            await dispatcher.stop()
+
+        asyncio.run(main())
+        assert dispatcher.dropped == 1
+        assert received == [1]
@@ -1,3 +1,5 @@
+import threading
+import time
 from uuid import uuid4
 
 from fastapi import FastAPI
@@ -108,6 +110,31 @@ class TestCountdownService:
         self.service.stop_countdown(session_id)
         assert not self.service.is_countdown_running(session_id)
 
+    def test_many_countdowns_share_one_thread(self):
+        """Test that countdowns do not start a thread each."""
+        self.service.start_countdown(0, duration_seconds=30)
+        threads_before = threading.active_count()
+        for session_id in range(1, 1001):
+            assert self.service.start_countdown(session_id, duration_seconds=30)
+        assert threading.active_count() == threads_before
+        assert self.service.get_stats()["running"] == 1001
+
+        for session_id in range(1001):
+            self.service.stop_countdown(session_id)
+        assert self.service.get_stats()["running"] == 0
+
+    def test_finished_countdown_is_removed_and_counted(self):
+        """Test that a countdown whose session is missing finishes and frees its slot."""
+        assert self.service.start_countdown(999999, duration_seconds=0)
+        for _ in range(100):
+            if not self.service.is_countdown_running(999999):
+                break
+            time.sleep(0.01)
+        stats = self.service.get_stats()
+        assert stats["running"] == 0
+        assert stats["completed"] + stats["failed"] == 1
+        assert stats["loop"] == "private"
+
 
 class TestCountdownIntegration:
     """Integration tests for countdown functionality with the game API.
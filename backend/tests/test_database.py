@@ -0,0 +1,60 @@
+import tempfile
+
+import pytest
+
+from app.config import Settings
+from app.database import create_db_engine
+
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store")
+
+
+def test_settings_from_env_override_defaults():
+    environ = {"DATABASE_URL": "sqlite:///./other.db", "SQLITE_SYNCHRONOUS": "FULL", "UNRELATED": "1"}
+    settings = Settings.from_env(environ)
+
+    assert settings.database_url == "sqlite:///./other.db"
+    assert settings.sqlite_synchronous == "FULL"
+    assert settings.sqlite_journal_mode == Settings.sqlite_journal_mode
+
+
+def test_empty_setting_leaves_pragma_at_sqlite_default():
+    pragmas = Settings.from_env({"SQLITE_MMAP_SIZE": ""}).sqlite_pragmas()
+
+    assert "mmap_size" not in pragmas
+    assert pragmas["journal_mode"] == "WAL"
+
+
+def test_pragmas_are_applied_to_every_connection():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        engine = create_db_engine(f"sqlite:///{tmp.name}", Settings().sqlite_pragmas())
+        try:
+            connections = [engine.connect() for _ in range(2)]
+            values = [
+                {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in PRAGMAS}
+                for connection in connections
+            ]
+            for connection in connections:
+                connection.close()
+        finally:
+            engine.dispose()
+
+    for pragmas in values:
+        assert pragmas == {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "busy_timeout": 5000,
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -65536,
+            "temp_store": 2,  # MEMORY
+        }
+
+
+def test_invalid_pragma_value_is_rejected():
+    with pytest.raises(ValueError):
+        create_db_engine("sqlite://", {"journal_mode": "WAL; DROP TABLE users"})
+
+
+def test_non_sqlite_url_is_rejected():
+    with pytest.raises(ValueError, match="Only SQLite"):
+        create_db_engine("postgresql://localhost/game", {})
@@ -0,0 +1,79 @@
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, PlayerPuzzleStats
+from app.services.difficulty_service import DIFFICULTY_PARAMETERS, DifficultyService
+from app.services.puzzle_generator import PUZZLE_TYPES, puzzle_generator
+
+
+class TestDifficultyService:
+    """Test suite for the adaptive difficulty engine."""
+
+    def setup_method(self):
+        self.service = DifficultyService()
+
+    def test_new_player_gets_default_difficulty(self):
+        puzzle_type, difficulty = self.service.choose_next(1)
+        assert puzzle_type in PUZZLE_TYPES
+        assert difficulty is None
+
+    def test_streak_and_accuracy_are_tracked(self):
+        for _ in range(3):
+            self.service.record_result(1, "memory", True, 4.0)
+        stats = self.service.get_stats(1, "memory")
+        assert stats.streak == 3
+        assert stats.attempts == 3
+        assert stats.solve_time_ewma == pytest.approx(4.0)
+
+        self.service.record_result(1, "memory", False, 9.0)
+        stats = self.service.get_stats(1, "memory")
+        assert stats.streak == -1
+        assert stats.accuracy_ewma < 1.0
+
+    @pytest.mark.parametrize("puzzle_type", list(DIFFICULTY_PARAMETERS))
+    def test_strong_player_gets_harder_puzzles(self, puzzle_type):
+        name, easiest, hardest = DIFFICULTY_PARAMETERS[puzzle_type]
+        for _ in range(10):
+            self.service.record_result(1, puzzle_type, True, 1.0)
+            self.service.record_result(2, puzzle_type, False, None)
+        assert self.service.difficulty_for(1, puzzle_type) == {name: hardest}
+        assert self.service.difficulty_for(2, puzzle_type) == {name: easiest}
+
+    @pytest.mark.parametrize("puzzle_type", PUZZLE_TYPES)
+    @pytest.mark.parametrize("level", [0.0, 0.5, 1.0])
+    def test_difficulty_parameters_are_valid_generator_input(self, puzzle_type, level):
+        name, easiest, hardest = DIFFICULTY_PARAMETERS[puzzle_type]
+        difficulty = {name: int(round(easiest + (hardest - easiest) * level))}
+        data, correct_answer = puzzle_generator.generate(puzzle_type, 1, difficulty)
+        assert data
+        assert correct_answer
+
+    def test_checkpoint_and_load_round_trip(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            engine = create_engine(f"sqlite:///{tmp.name}", connect_args={"check_same_thread": False})
+            Base.metadata.create_all(bind=engine)
+            TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+            self.service.record_result(1, "memory", True, 3.0)
+            self.service.record_result(1, "spatial", False, None)
+            db = TestingSessionLocal()
+            try:
+                assert self.service.checkpoint(db) == 2
+                assert self.service.checkpoint(db) == 0  # Nothing changed since the last checkpoint
+                self.service.record_result(1, "memory", True, 5.0)
+                assert self.service.checkpoint(db) == 1
+                assert db.query(PlayerPuzzleStats).count() == 2
+            finally:
+                db.close()
+
+            restored = DifficultyService()
+            db = TestingSessionLocal()
+            try:
+                assert restored.load(db) == 2
+            finally:
+                db.close()
+            assert restored.get_stats(1, "memory") == self.service.get_stats(1, "memory")
+            assert restored.difficulty_for(1, "spatial") == self.service.difficulty_for(1, "spatial")
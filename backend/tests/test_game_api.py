@@ -167,3 +167,55 @@ def test_state_transition_paths(transitions, should_succeed):
             break
     assert success == should_succeed
     tmp.close()
+
+
+def test_finished_games_enter_the_leaderboard():
+    client, tmp = create_test_app_and_client()
+    team_ids = []
+    for _ in range(2):
+        _, team_id = create_team_and_user(client)
+        team_ids.append(team_id)
+        session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+        client.post(f"/game/session/{session_id}/state", json={"status": "active"})
+        client.post(f"/game/session/{session_id}/state", json={"status": "finished"})
+
+    for window in ("all", "daily"):
+        resp = client.get(f"/game/leaderboard?window={window}")
+        assert resp.status_code == 200
+        entries = resp.json()["entries"]
+        assert [entry["rank"] for entry in entries] == [1, 2]
+        assert {entry["team_id"] for entry in entries} == set(team_ids)
+
+        resp = client.get(f"/game/leaderboard/team/{team_ids[0]}?window={window}")
+        assert resp.status_code == 200
+        assert resp.json()["rank"] in (1, 2)
+
+    assert client.get("/game/leaderboard/team/999999").status_code == 404
+    assert client.get("/game/leaderboard?window=weekly").status_code == 422
+    tmp.close()
+
+
+def test_finished_game_is_compared_to_all_games():
+    client, tmp = create_test_app_and_client()
+    session_ids = []
+    for _ in range(3):
+        _, team_id = create_team_and_user(client)
+        session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+        client.post(f"/game/session/{session_id}/state", json={"status": "active"})
+        client.post(f"/game/session/{session_id}/state", json={"status": "finished"})
+        session_ids.append(session_id)
+
+    resp = client.get(f"/game/session/{session_ids[0]}/compare")
+    assert resp.status_code == 200
+    survival = resp.json()["survival_time_seconds"]
+    assert survival["count"] == 3
+    assert 0 <= survival["percentile"] <= 100
+    # Nobody answered a puzzle
+    assert resp.json()["accuracy"]["percentile"] is None
+
+    resp = client.get("/game/percentile/solve_time:memory?value=3.5")
+    assert resp.status_code == 200
+    assert resp.json()["count"] == 0
+    assert client.get("/game/percentile/unknown?value=1").status_code == 404
+    assert client.get("/game/session/999999/compare").status_code == 404
+    tmp.close()
@@ -3,11 +3,13 @@ from datetime import datetime, timedelta, timezone
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.models import Base, GameSession, Team, User
 from app.services.game_end_service import GameEndService
+from app.services.game_state_machine import game_state_machine
+from app.services.leaderboard_service import leaderboard_service
 
 
 # Helper to create a fresh app and DB for each test
@@ -73,8 +75,8 @@ class TestGameEndService:
         """Set up a fresh game end service for each test."""
         self.service = GameEndService()
 
-    def test_should_end_game_all_players_eliminated(self):
-        """Test that game should end when all players have 0 points."""
+    def test_game_ends_when_all_players_eliminated(self):
+        """Test that the game ends when all players have 0 points."""
         client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
@@ -95,16 +97,17 @@ class TestGameEndService:
                 user.points = 0
             db.commit()
 
-            # Check if game should end
-            should_end = self.service._should_end_game(session, db)
-            assert should_end == True
+            # Reconciliation ends the game
+            assert self.service.check_and_handle_game_end(db) == [session.id]
+            db.refresh(session)
+            assert session.status == "finished"
 
             db.close()
         finally:
             tmp.close()
 
-    def test_should_not_end_game_players_still_alive(self):
-        """Test that game should not end when some players still have points."""
+    def test_game_continues_while_players_still_alive(self):
+        """Test that the game does not end while some players still have points."""
         client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
@@ -128,16 +131,21 @@ class TestGameEndService:
                     user.points = 5  # Still alive
             db.commit()
 
-            # Check if game should end
-            should_end = self.service._should_end_game(session, db)
-            assert should_end == False
+            # Reconciliation leaves the game running, and the last elimination ends it
+            assert self.service.check_and_handle_game_end(db) == []
+            assert self.service.alive_players(session.id) == 1
+            db.query(User).filter(User.id == user_ids[-1]).update({"points": 0})
+            assert self.service.players_eliminated(session.id, 1, db) is not None
+            db.commit()
+            db.refresh(session)
+            assert session.status == "finished"
 
             db.close()
         finally:
             tmp.close()
 
-    def test_should_end_game_no_users(self):
-        """Test that game should end when there are no users in the team."""
+    def test_game_ends_when_team_has_no_users(self):
+        """Test that the game ends when there are no users in the team."""
         client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
@@ -158,9 +166,10 @@ class TestGameEndService:
                 user.team_id = None
             db.commit()
 
-            # Check if game should end
-            should_end = self.service._should_end_game(session, db)
-            assert should_end == True
+            # Reconciliation ends the game
+            assert self.service.check_and_handle_game_end(db) == [session.id]
+            db.refresh(session)
+            assert session.status == "finished"
 
             db.close()
         finally:
@@ -255,6 +264,154 @@ class TestGameEndService:
         finally:
             tmp.close()
 
+    def test_last_elimination_ends_session_without_queries(self):
+        """Test that the counter ends a session in the caller's transaction once nobody has points."""
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+        try:
+            team_id, user_ids = create_team_and_users(TestingSessionLocal, "Counted", 2)
+            db = TestingSessionLocal()
+            session = GameSession(team_id=team_id, status="active", started_at=datetime.now(timezone.utc))
+            db.add(session)
+            db.commit()
+            self.service.start_sessions({session.id: 2}, db)
+            assert self.service.players_eliminated(session.id, 0, db) is None
+
+            game_state_machine.get(session.id, db)
+            statements = []
+            engine = TestingSessionLocal.kw["bind"]
+
+            def count(*args):
+                statements.append(args[2])
+
+            event.listen(engine, "before_cursor_execute", count)
+            try:
+                assert self.service.players_eliminated(session.id, 1, db) is None
+                assert statements == []
+            finally:
+                event.remove(engine, "before_cursor_execute", count)
+            # The counter only changes once the elimination is committed
+            assert self.service.alive_players(session.id) == 2
+            db.commit()
+            self.service.on_finished([], db, {session.id: 1})
+            assert self.service.alive_players(session.id) == 1
+
+            ended = self.service.players_eliminated(session.id, 1, db)
+            assert ended is not None
+            db.commit()
+            self.service.on_finished([ended], db, {session.id: 1})
+            assert self.service.alive_players(session.id) is None
+            db.refresh(session)
+            assert session.status == "finished"
+            db.close()
+        finally:
+            tmp.close()
+
+    def test_game_end_side_effects_wait_for_commit(self, monkeypatch):
+        """Test that a game only enters the leaderboards in on_finished, after the caller committed."""
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+        try:
+            team_id, user_ids = create_team_and_users(TestingSessionLocal, "Committed", 1)
+            db = TestingSessionLocal()
+            session = GameSession(team_id=team_id, status="active", started_at=datetime.now(timezone.utc))
+            db.add(session)
+            db.commit()
+            recorded = []
+            monkeypatch.setattr(leaderboard_service, "record", lambda ended, db: recorded.append(ended.id))
+            self.service.start_sessions({session.id: 1}, db)
+
+            ended = self.service.players_eliminated(session.id, 1, db)
+            assert ended is not None and ended.status == "finished"
+            assert recorded == []
+            db.commit()
+            self.service.on_finished([ended], db)
+            assert recorded == [session.id]
+            db.close()
+        finally:
+            tmp.close()
+
+    def test_rolled_back_elimination_leaves_counter_untouched(self):
+        """Test that an elimination whose transaction rolls back is not counted."""
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+        try:
+            team_id, user_ids = create_team_and_users(TestingSessionLocal, "RolledBack", 2)
+            db = TestingSessionLocal()
+            session = GameSession(team_id=team_id, status="active", started_at=datetime.now(timezone.utc))
+            db.add(session)
+            db.commit()
+            self.service.start_sessions({session.id: 2}, db)
+
+            assert self.service.players_eliminated(session.id, 1, db) is None
+            db.rollback()
+            assert self.service.alive_players(session.id) == 2
+            db.close()
+        finally:
+            tmp.close()
+
+    def test_concurrent_last_eliminations_end_the_game(self):
+        """Test that two transactions that each eliminated one of the last two players still end the game."""
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+        try:
+            team_id, user_ids = create_team_and_users(TestingSessionLocal, "Concurrent", 2)
+            db = TestingSessionLocal()
+            session = GameSession(team_id=team_id, status="active", started_at=datetime.now(timezone.utc))
+            db.add(session)
+            db.commit()
+            self.service.start_sessions({session.id: 2}, db)
+
+            # Both see the other player still counted, so neither ends the game in its transaction
+            assert self.service.players_eliminated(session.id, 1, db) is None
+            assert self.service.players_eliminated(session.id, 1, db) is None
+            db.commit()
+            self.service.on_finished([], db, {session.id: 1})
+            self.service.on_finished([], db, {session.id: 1})
+            db.refresh(session)
+            assert session.status == "finished"
+            assert self.service.alive_players(session.id) is None
+            db.close()
+        finally:
+            tmp.close()
+
+    def test_uncounted_session_is_counted_from_database(self):
+        """Test that the first elimination of a session without a counter counts its players once."""
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+        try:
+            team_id, user_ids = create_team_and_users(TestingSessionLocal, "Uncounted", 3)
+            db = TestingSessionLocal()
+            session = GameSession(team_id=team_id, status="active", started_at=datetime.now(timezone.utc))
+            db.add(session)
+            db.query(User).filter(User.id == user_ids[0]).update({"points": 0})
+            db.commit()
+
+            # The database already shows the elimination, so it is not subtracted again
+            assert self.service.players_eliminated(session.id, 1, db) is None
+            assert self.service.alive_players(session.id) is None
+            db.close()
+        finally:
+            tmp.close()
+
+    def test_session_without_players_ends_on_start(self):
+        """Test that activating a session of an empty team ends it right away."""
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+        try:
+            team_id, _ = create_team_and_users(TestingSessionLocal, "Empty", 0)
+            db = TestingSessionLocal()
+            session = GameSession(team_id=team_id, status="active", started_at=datetime.now(timezone.utc))
+            db.add(session)
+            db.commit()
+
+            assert self.service.start_sessions({session.id: 0}, db) == [session.id]
+            db.refresh(session)
+            assert session.status == "finished"
+            db.close()
+        finally:
+            tmp.close()
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
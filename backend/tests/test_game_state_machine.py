@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Base
+from app.services.game_state_machine import GameStateMachine, InvalidTransition
+
+
+class TestGameStateMachine:
+    """Test suite for the in-memory game session state machine."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        self.engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)()
+        self.machine = GameStateMachine()
+
+        self.session_ids = []
+        for index in range(3):
+            team = models.Team(name=f"Team {index}")
+            self.db.add(team)
+            self.db.flush()
+            session = models.GameSession(team_id=team.id, status="countdown")
+            self.db.add(session)
+            self.db.flush()
+            self.session_ids.append(session.id)
+        self.db.commit()
+
+    def teardown_method(self):
+        self.db.close()
+        self.tmp.close()
+
+    def count_statements(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        return statements
+
+    def test_status_checks_after_load_do_not_query(self):
+        self.machine.load(self.db)
+        statements = self.count_statements()
+        assert not self.machine.is_active(self.session_ids[0], self.db)
+        assert self.machine.has_open_session(self.machine.get(self.session_ids[0], self.db).team_id, self.db)
+        assert statements == []
+
+    def test_invalid_transition_is_rejected(self):
+        with pytest.raises(InvalidTransition, match="from countdown to finished"):
+            self.machine.transition(self.session_ids[0], "finished", self.db)
+        assert self.machine.get(self.session_ids[0], self.db).status == "countdown"
+
+    def test_transitions_are_written_behind_in_one_statement(self):
+        start = datetime.now(timezone.utc)
+        for session_id in self.session_ids:
+            self.machine.transition(session_id, "active", self.db, now=start)
+        self.machine.transition(self.session_ids[0], "finished", self.db, now=start + timedelta(seconds=42))
+
+        statements = self.count_statements()
+        assert self.machine.flush(self.db) == 3
+        self.db.commit()
+        assert len([statement for statement in statements if statement.startswith("UPDATE")]) == 1
+
+        finished = self.db.get(models.GameSession, self.session_ids[0])
+        assert finished.status == "finished"
+        assert finished.survival_time_seconds == 42
+        assert self.db.get(models.GameSession, self.session_ids[1]).status == "active"
+
+        # Finished sessions leave memory once persisted, freeing the team for a new session
+        assert not self.machine.has_open_session(finished.team_id, self.db)
+        assert self.machine.active_sessions(self.db) == [
+            self.machine.get(session_id, self.db) for session_id in self.session_ids[1:]
+        ]
+
+    def test_session_created_after_load_is_found(self):
+        self.machine.load(self.db)
+        team = models.Team(name="Late")
+        self.db.add(team)
+        self.db.flush()
+        session = models.GameSession(team_id=team.id, status="active")
+        self.db.add(session)
+        self.db.commit()
+        assert self.machine.is_active(session.id, self.db)
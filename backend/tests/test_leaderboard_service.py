@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+import tempfile
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Base
+from app.services.leaderboard_service import TOP_K, LeaderboardService
+
+
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+class TestLeaderboardService:
+    """Test suite for the survival-time leaderboards."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        self.engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)()
+        self.service = LeaderboardService()
+
+        self.team_ids = []
+        for index in range(3):
+            team = models.Team(name=f"Team {index}")
+            self.db.add(team)
+            self.db.flush()
+            self.team_ids.append(team.id)
+        # Team 0: 30s yesterday and 50s today; team 1: 40s today; team 2: still playing
+        self.add_session(self.team_ids[0], 30, NOW - timedelta(days=1))
+        self.add_session(self.team_ids[0], 50, NOW - timedelta(hours=1))
+        self.add_session(self.team_ids[1], 40, NOW - timedelta(hours=2))
+        self.db.add(models.GameSession(team_id=self.team_ids[2], status="active"))
+        self.db.commit()
+
+    def teardown_method(self):
+        self.db.close()
+        self.tmp.close()
+
+    def add_session(self, team_id, survival, ended_at):
+        session = models.GameSession(
+            team_id=team_id,
+            status="finished",
+            started_at=ended_at - timedelta(seconds=survival),
+            ended_at=ended_at,
+            survival_time_seconds=survival,
+        )
+        self.db.add(session)
+        self.db.flush()
+        return session
+
+    def finished(self, team_id, survival, ended_at=NOW, session_id=1000):
+        return SimpleNamespace(
+            id=session_id,
+            team_id=team_id,
+            status="finished",
+            ended_at=ended_at,
+            survival_time_seconds=survival,
+        )
+
+    def test_load_keeps_best_game_per_team(self):
+        assert self.service.load(self.db, now=NOW) == 3
+        top = self.service.top("all", self.db, now=NOW)
+        assert [(entry["team_id"], entry["survival_time_seconds"]) for entry in top] == [
+            (self.team_ids[0], 50),
+            (self.team_ids[1], 40),
+        ]
+        assert top[0]["team_name"] == "Team 0"
+        assert self.service.rank(self.team_ids[1], "all", self.db, now=NOW)["rank"] == 2
+        assert self.service.rank(self.team_ids[2], "all", self.db, now=NOW) is None
+
+    def test_daily_window_only_has_todays_games(self):
+        self.service.load(self.db, now=NOW)
+        assert len(self.service.top("daily", self.db, now=NOW)) == 2
+        yesterday = self.service.top("daily", self.db, now=NOW - timedelta(days=1))
+        assert [(entry["team_id"], entry["survival_time_seconds"]) for entry in yesterday] == [(self.team_ids[0], 30)]
+        assert self.service.top("daily", self.db, now=NOW + timedelta(days=1)) == []
+
+    def test_record_updates_ranks_without_queries(self):
+        self.service.load(self.db, now=NOW)
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        assert self.service.record(self.finished(self.team_ids[1], 60), self.db, now=NOW)
+        assert not self.service.record(self.finished(self.team_ids[1], 10), self.db, now=NOW)
+        assert self.service.rank(self.team_ids[1], "all", self.db, now=NOW)["rank"] == 1
+        assert self.service.rank(self.team_ids[0], "daily", self.db, now=NOW)["rank"] == 2
+        assert [entry["rank"] for entry in self.service.top("all", self.db, now=NOW)] == [1, 2]
+        assert statements == []
+
+    def test_ties_rank_earlier_game_first(self):
+        self.service.load(self.db, now=NOW)
+        self.service.record(self.finished(self.team_ids[2], 50, ended_at=NOW), self.db, now=NOW)
+        top = self.service.top("all", self.db, now=NOW)
+        assert [entry["team_id"] for entry in top[:2]] == [self.team_ids[0], self.team_ids[2]]
+
+    def test_top_is_capped(self):
+        self.service.load(self.db, now=NOW)
+        for team_id in range(10_000, 10_000 + TOP_K + 50):
+            self.service._team_names[team_id] = f"Team {team_id}"
+            self.service.record(self.finished(team_id, team_id % 97), self.db, now=NOW)
+        top = self.service.top("all", self.db, limit=TOP_K + 50, now=NOW)
+        assert len(top) == TOP_K
+        survivals = [entry["survival_time_seconds"] for entry in top]
+        assert survivals == sorted(survivals, reverse=True)
+        last = self.service.rank(10_000 + TOP_K + 49, "all", self.db, now=NOW)
+        assert last["rank"] > 1
+
+    def test_unfinished_sessions_are_ignored(self):
+        session = self.finished(self.team_ids[2], None)
+        assert not self.service.record(session, self.db, now=NOW)
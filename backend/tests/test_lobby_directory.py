@@ -0,0 +1,73 @@
+import asyncio
+import json
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Base
+from app.services import lobby_directory as lobby_module
+from app.services.lobby_directory import LobbyDirectory
+
+
+class TestLobbyDirectory:
+    """Test suite for the in-memory lobby directory."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        self.engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)()
+        self.directory = LobbyDirectory()
+        self.loop = asyncio.new_event_loop()
+
+        self.team = models.Team(name="Lobby")
+        self.db.add(self.team)
+        self.db.flush()
+        for index in range(4):
+            self.db.add(models.User(username=f"member_{index}", team_id=self.team.id, color=f"c{index}"))
+        self.db.commit()
+        self.team_id = self.team.id
+
+    def teardown_method(self):
+        self.loop.close()
+        self.db.close()
+        self.tmp.close()
+
+    def drain(self, queue):
+        self.loop.run_until_complete(asyncio.sleep(0))
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        return messages
+
+    def test_snapshot_marks_full_teams(self):
+        queue = self.directory.subscribe(self.loop, self.db)
+        (snapshot,) = [json.loads(message) for message in self.drain(queue)]
+        team = snapshot["data"]["teams"][0]
+        assert team["status"] == "full"
+        assert team["player_count"] == 4
+        assert [member["color"] for member in team["members"]] == ["c0", "c1", "c2", "c3"]
+
+    def test_refresh_without_subscribers_does_not_query(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        self.directory.refresh_team(self.team_id, self.db)
+        assert statements == []
+
+    def test_unchanged_team_publishes_nothing(self):
+        queue = self.directory.subscribe(self.loop, self.db)
+        self.drain(queue)
+        self.directory.refresh_team(self.team_id, self.db)
+        assert self.drain(queue) == []
+
+    def test_slow_subscriber_is_dropped(self, monkeypatch):
+        monkeypatch.setattr(lobby_module, "SUBSCRIBER_QUEUE_SIZE", 2)
+        queue = self.directory.subscribe(self.loop, self.db)
+        for index in range(3):
+            self.db.add(models.Team(name=f"New {index}"))
+            self.db.commit()
+            self.directory.refresh_teams([team.id for team in self.db.query(models.Team)], self.db)
+        assert self.drain(queue) == [None]
+        assert self.directory.subscriber_count() == 0
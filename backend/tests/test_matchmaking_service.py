@@ -0,0 +1,83 @@
+import tempfile
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Base
+from app.services.matchmaking_service import MatchmakingService
+
+
+class TestMatchmakingService:
+    """Test suite for the bucketed matchmaking queue."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.service = MatchmakingService()
+
+    def teardown_method(self):
+        self.tmp.close()
+
+    def create_users(self, count):
+        db = self.SessionLocal()
+        users = [models.User(username=f"player_{index}") for index in range(count)]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+        db.close()
+        return user_ids
+
+    def test_concurrent_matches_fill_whole_teams(self):
+        user_ids = self.create_users(12)
+        barrier = threading.Barrier(len(user_ids))
+        results = []
+
+        def match(user_id):
+            db = self.SessionLocal()
+            try:
+                barrier.wait()
+                results.append(self.service.match(user_id, db))
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=match, args=(user_id,)) for user_id in user_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        db = self.SessionLocal()
+        teams = {}
+        for user in db.query(models.User):
+            teams.setdefault(user.team_id, []).append(user.color)
+        assert len(teams) == 3
+        assert all(sorted(colors) == ["blue", "green", "red", "yellow"] for colors in teams.values())
+
+        opened = [session_id for _, session_id in results if session_id is not None]
+        sessions = db.query(models.GameSession).all()
+        assert sorted(opened) == sorted(session.id for session in sessions)
+        assert {session.team_id for session in sessions} == set(teams)
+        assert all(session.status == "countdown" for session in sessions)
+        db.close()
+
+    def test_invalidated_team_is_reloaded(self):
+        (user_id, other_id) = self.create_users(2)
+        db = self.SessionLocal()
+        team = models.Team(name="Manual")
+        db.add(team)
+        db.commit()
+        team_id = team.id
+
+        assert self.service.match(user_id, db) == (team_id, None)
+
+        # A session opened elsewhere takes the team out of matchmaking
+        db.add(models.GameSession(team_id=team_id, status="countdown"))
+        db.commit()
+        self.service.invalidate(team_id)
+        new_team_id, _ = self.service.match(other_id, db)
+        assert new_team_id != team_id
+        db.close()
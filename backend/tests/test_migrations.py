@@ -0,0 +1,200 @@
+from datetime import datetime, timezone
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, exists, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from app import migrations, models
+from app.migrations import MIGRATIONS, get_schema_version, run_migrations
+from app.models import Base
+from app.services.available_teams_service import OPEN_SESSION_STATES
+from app.services.leaderboard_service import finished_sessions_query
+
+
+# Schema of the puzzles table before seeds were introduced
+LEGACY_PUZZLES_DDL = """
+CREATE TABLE puzzles (
+    id INTEGER NOT NULL PRIMARY KEY,
+    type VARCHAR NOT NULL,
+    data JSON NOT NULL,
+    correct_answer VARCHAR NOT NULL,
+    status VARCHAR,
+    game_session_id INTEGER REFERENCES game_sessions (id),
+    user_id INTEGER REFERENCES users (id),
+    created_at DATETIME,
+    solved_at DATETIME
+)
+"""
+
+
+@pytest.fixture
+def engine():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        engine = create_engine(f"sqlite:///{tmp.name}", connect_args={"check_same_thread": False})
+        yield engine
+        engine.dispose()
+
+
+def create_current_schema(engine):
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def index_names(engine, table_name):
+    return {index["name"] for index in inspect(engine).get_indexes(table_name)}
+
+
+def index_definitions(engine):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+        return {name: sql.replace(" IF NOT EXISTS", "") for name, sql in rows}
+
+
+class TestMigrations:
+    """Test suite for the versioned schema migrations."""
+
+    def test_fresh_database_is_at_latest_version(self, engine):
+        create_current_schema(engine)
+        with engine.connect() as conn:
+            assert get_schema_version(conn) == len(MIGRATIONS)
+        assert run_migrations(engine) == 0
+
+    def test_fresh_database_has_hot_query_indexes(self, engine):
+        create_current_schema(engine)
+        assert "ix_users_team_id" in index_names(engine, "users")
+        assert {"ix_game_sessions_team_status", "ix_game_sessions_team_id_desc"} <= index_names(engine, "game_sessions")
+        assert {"ix_puzzles_session_status", "ix_puzzles_active_user"} <= index_names(engine, "puzzles")
+
+    def test_legacy_database_is_upgraded_in_place(self, engine):
+        legacy_tables = [table for name, table in Base.metadata.tables.items() if name != "puzzles"]
+        Base.metadata.create_all(bind=engine, tables=legacy_tables)
+        with engine.begin() as conn:
+            for table in legacy_tables:
+                for index in list(table.indexes):
+                    if index.name.startswith(("ix_users_team", "ix_game_sessions_team", "ix_game_sessions_finished")):
+                        conn.exec_driver_sql(f"DROP INDEX {index.name}")
+            conn.exec_driver_sql(LEGACY_PUZZLES_DDL)
+            conn.exec_driver_sql(
+                "INSERT INTO puzzles (type, data, correct_answer, status, game_session_id, user_id, created_at) "
+                "VALUES ('memory', '{\"question_number\": \"1\"}', 'red', 'active', 1, 1, '2025-01-01 00:00:00')",
+            )
+            # An archived puzzle with a higher ID than any live one
+            conn.exec_driver_sql(
+                "INSERT INTO puzzle_history (id, type, seed, status, game_session_id, user_id, created_at, "
+                "archived_at) VALUES (50, 'memory', 1, 'solved', 1, 1, '2025-01-01 00:00:00', '2025-01-01 00:00:00')",
+            )
+
+        assert run_migrations(engine) == len(MIGRATIONS)
+        assert "ix_users_team_id" in index_names(engine, "users")
+        assert "ix_puzzles_active_user" in index_names(engine, "puzzles")
+        # The frozen migration DDL matches what the current models create on a fresh database
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            fresh = create_engine(f"sqlite:///{tmp.name}")
+            Base.metadata.create_all(bind=fresh)
+            assert index_definitions(engine) == index_definitions(fresh)
+            fresh.dispose()
+
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = SessionLocal()
+        try:
+            legacy = db.query(models.Puzzle).one()
+            assert legacy.seed is None
+            assert legacy.data == {"question_number": "1"}
+            assert legacy.correct_answer == "red"
+
+            seeded = models.Puzzle(type="memory", seed=5, status="active", game_session_id=1, user_id=2)
+            db.add(seeded)
+            db.commit()
+            assert db.query(models.Puzzle).count() == 2
+            assert seeded.id == 51
+            assert db.query(models.PuzzleHistory).one().generator_version == 1
+            # The player of the legacy puzzles is recorded once for their session
+            stats = db.query(models.GamePlayerStats).one()
+            assert (stats.game_session_id, stats.user_id, stats.puzzles_solved) == (1, 1, 0)
+        finally:
+            db.close()
+
+    def test_failed_migration_leaves_schema_untouched(self, engine, monkeypatch):
+        legacy_tables = [table for name, table in Base.metadata.tables.items() if name != "puzzles"]
+        Base.metadata.create_all(bind=engine, tables=legacy_tables)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(LEGACY_PUZZLES_DDL)
+            conn.exec_driver_sql(
+                "INSERT INTO puzzles (type, data, correct_answer, status, game_session_id, user_id, created_at) "
+                "VALUES ('memory', '{}', 'red', 'active', 1, 1, '2025-01-01 00:00:00')",
+            )
+
+        def interrupted(conn):
+            migrations._puzzle_seed_columns(conn)
+            raise RuntimeError("interrupted")
+
+        monkeypatch.setattr(migrations, "MIGRATIONS", [interrupted])
+        with pytest.raises(RuntimeError):
+            run_migrations(engine)
+
+        # The rebuild was rolled back as a whole: the legacy table and its row are still there
+        assert "_puzzles_old" not in inspect(engine).get_table_names()
+        assert "seed" not in {column["name"] for column in inspect(engine).get_columns("puzzles")}
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM puzzles").scalar() == 1
+            assert get_schema_version(conn) == 0
+
+
+def query_plan(engine, statement):
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or [])
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+
+# Hot queries as issued by the routers, with the index each one must use
+HOT_QUERIES = {
+    "current_puzzle": (
+        select(models.Puzzle).where(models.Puzzle.user_id == 1, models.Puzzle.status == models.ACTIVE).limit(1),
+        "ix_puzzles_active_user",
+    ),
+    "session_active_puzzles": (
+        select(models.Puzzle).where(models.Puzzle.game_session_id == 1, models.Puzzle.status == "active"),
+        "ix_puzzles_session_status",
+    ),
+    "team_open_session": (
+        select(
+            exists().where(
+                models.GameSession.team_id == 1,
+                models.GameSession.status.in_(OPEN_SESSION_STATES),
+            ),
+        ),
+        "ix_game_sessions_team_status",
+    ),
+    "team_latest_session": (
+        select(models.GameSession)
+        .where(models.GameSession.team_id == 1)
+        .order_by(models.GameSession.id.desc())
+        .limit(1),
+        "ix_game_sessions_team_id_desc",
+    ),
+    "leaderboard_all_time": (
+        finished_sessions_query(),
+        "ix_game_sessions_finished_survival",
+    ),
+    "leaderboard_daily": (
+        finished_sessions_query(datetime(2025, 1, 1, tzinfo=timezone.utc)),
+        "ix_game_sessions_finished_ended_at",
+    ),
+    "team_members": (
+        select(models.User).where(models.User.team_id == 1),
+        "ix_users_team_id",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(engine, name):
+    create_current_schema(engine)
+    statement, index_name = HOT_QUERIES[name]
+    plan = "\n".join(query_plan(engine, statement))
+    assert index_name in plan, plan
+    assert "SCAN" not in plan.replace("SCAN CONSTANT ROW", ""), plan
+    assert "TEMP B-TREE" not in plan, plan
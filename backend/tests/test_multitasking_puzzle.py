@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.multitasking_puzzle import (
+    TIME_LIMIT_GRACE_SECONDS,
+    generate_multitasking_grids,
+    generate_multitasking_puzzle,
+    verify_clicks,
+)
+
+
+def make_puzzle(seed: int = 1):
+    return generate_multitasking_puzzle(np.random.default_rng(seed))
+
+
+class TestMultitaskingGeneration:
+    """Test suite for server-side multitasking grid generation."""
+
+    def test_batch_grids_have_one_six_per_row(self):
+        grids, six_cols = generate_multitasking_grids(np.random.default_rng(0), 5000, rows=4, cols=9)
+        assert grids.shape == (5000, 4, 9)
+        assert np.all((grids == 6).sum(axis=2) == 1)
+        assert np.all((grids == 9).sum(axis=2) == 8)
+        assert np.array_equal(np.argmax(grids == 6, axis=2), six_cols)
+
+    def test_puzzle_data_matches_schema_fields(self):
+        data, correct_answer = make_puzzle()
+        assert len(data["rows"]) == 4
+        assert all(len(row) == 9 for row in data["rows"])
+        assert data["time_limit"] == 10
+        for position in data["six_positions"]:
+            assert data["rows"][position["row"]][position["col"]] == "6"
+        assert correct_answer == ",".join(str(p["col"]) for p in data["six_positions"])
+
+
+class TestMultitaskingVerification:
+    """Test suite for click set verification."""
+
+    def test_all_sixes_clicked_is_correct(self):
+        data, correct_answer = make_puzzle()
+        clicks = [[p["row"], p["col"]] for p in reversed(data["six_positions"])]
+        assert verify_clicks(data, correct_answer, json.dumps(clicks), elapsed_seconds=3)
+        assert verify_clicks(data, correct_answer, json.dumps(data["six_positions"]))
+        assert verify_clicks(data, correct_answer, correct_answer)
+
+    def test_missing_or_extra_click_is_incorrect(self):
+        data, correct_answer = make_puzzle()
+        clicks = [[p["row"], p["col"]] for p in data["six_positions"]]
+        assert not verify_clicks(data, correct_answer, json.dumps(clicks[:-1]))
+        wrong_col = (clicks[0][1] + 1) % 9
+        assert not verify_clicks(data, correct_answer, json.dumps([*clicks, [0, wrong_col]]))
+
+    def test_late_answer_is_incorrect(self):
+        data, correct_answer = make_puzzle()
+        late = data["time_limit"] + TIME_LIMIT_GRACE_SECONDS + 1
+        assert not verify_clicks(data, correct_answer, correct_answer, elapsed_seconds=late)
+
+    @pytest.mark.parametrize("answer", ["", "solved", "[", "[1, 2]", '[{"row": 0}]', '[["a", "b"]]', "1,2,x"])
+    def test_malformed_answers_are_incorrect(self, answer):
+        data, correct_answer = make_puzzle()
+        assert not verify_clicks(data, correct_answer, answer)
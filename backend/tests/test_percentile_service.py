@@ -0,0 +1,115 @@
+import random
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, MetricSketch
+from app.services.percentile_service import RELATIVE_ERROR, PercentileService, new_sketch
+
+
+def exact_percentile(values, value):
+    below = sum(1 for v in values if v < value)
+    equal = sum(1 for v in values if v == value)
+    return 100.0 * (below + equal / 2) / len(values)
+
+
+class TestQuantileSketch:
+    """Test suite for the fixed-layout quantile sketches."""
+
+    def test_percentiles_match_exact_ranks(self):
+        rng = random.Random(3)
+        values = [rng.lognormvariate(4, 1) for _ in range(20_000)]
+        sketch = new_sketch("survival_time")
+        for value in values:
+            sketch.add(value)
+        ordered = sorted(values)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = ordered[int(q * len(ordered))]
+            # The bucket bound is within the relative error of the true quantile
+            assert sketch.quantile(q) == pytest.approx(exact, rel=2 * RELATIVE_ERROR + 0.01)
+            assert sketch.percentile(exact) == pytest.approx(q * 100, abs=1.5)
+        assert sketch.mean() == pytest.approx(sum(values) / len(values))
+
+    def test_empty_sketch(self):
+        sketch = new_sketch("accuracy")
+        assert sketch.percentile(0.5) is None
+        assert sketch.quantile(0.5) is None
+        assert sketch.mean() is None
+
+    def test_linear_buckets_are_exact_for_accuracy(self):
+        sketch = new_sketch("accuracy")
+        values = [0.25, 0.5, 0.5, 0.75, 1.0]
+        for value in values:
+            sketch.add(value)
+        assert sketch.percentile(0.5) == pytest.approx(exact_percentile(values, 0.5))
+        assert sketch.quantile(0.5) == pytest.approx(0.5)
+
+    def test_merge_adds_counts(self):
+        first, second, both = (new_sketch("solve_time:memory") for _ in range(3))
+        for value in (1.0, 2.0, 3.0):
+            first.add(value)
+            both.add(value)
+        for value in (4.0, 5.0):
+            second.add(value)
+            both.add(value)
+        first.merge(second)
+        assert first.counts == both.counts
+        assert first.count == 5
+        with pytest.raises(ValueError):
+            first.merge(new_sketch("survival_time"))
+
+
+class TestPercentileService:
+    """Test suite for the streaming performance distributions."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        self.engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.db = self.SessionLocal()
+        self.service = PercentileService()
+
+    def teardown_method(self):
+        self.db.close()
+        self.tmp.close()
+
+    def test_compare_places_a_value_without_queries(self):
+        for survival in range(1, 101):
+            self.service.record_game(survival, survival / 100)
+        self.service.load(self.db)
+
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        result = self.service.compare("survival_time", 75, self.db)
+        assert result["percentile"] == pytest.approx(74.5, abs=2)
+        assert result["count"] == 100
+        assert result["average"] == pytest.approx(50.5)
+        assert self.service.compare("accuracy", None, self.db)["percentile"] is None
+        assert statements == []
+
+    def test_checkpoint_and_load_round_trip(self):
+        self.service.record_game(30, 0.5)
+        self.service.record("solve_time:memory", 4.2)
+        self.service.record("solve_time:unknown", 1.0)  # Ignored
+        assert self.service.checkpoint(self.db) == 3
+        assert self.service.checkpoint(self.db) == 0  # Nothing changed since the last checkpoint
+        self.service.record_game(60, None)
+        assert self.service.checkpoint(self.db) == 1
+        assert self.db.query(MetricSketch).count() == 3
+
+        restored = PercentileService()
+        restored.record_game(90, None)  # Recorded before the checkpoint was loaded
+        assert restored.load(self.db) == 3
+        survival = restored.get_sketch("survival_time")
+        assert survival.count == 3
+        assert survival.total == 180
+        assert restored.get_sketch("solve_time:memory").counts == self.service.get_sketch("solve_time:memory").counts
+
+    def test_outdated_layout_is_skipped(self):
+        self.db.add(MetricSketch(name="survival_time", layout="log:old", buckets={"3": 1}, count=1, total=3.0))
+        self.db.commit()
+        assert self.service.load(self.db) == 0
+        assert self.service.get_sketch("survival_time").count == 0
@@ -1,11 +1,13 @@
+from datetime import datetime
+import json
 from uuid import uuid4
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, update
 from sqlalchemy.orm import sessionmaker
 
-from app.models import Base
+from app.models import Base, Puzzle
 from app.routers.game import (
     get_db as get_db_game,
     router as game_router,
@@ -49,6 +51,15 @@ def create_test_app_and_client():
     return client, tmp, TestingSessionLocal
 
 
+def stored_answer(SessionLocal, puzzle_id: int) -> str:
+    """The puzzle's answer, read from the database since responses never include it."""
+    db = SessionLocal()
+    try:
+        return db.get(Puzzle, puzzle_id).correct_answer
+    finally:
+        db.close()
+
+
 def create_team_user_session(client):
     unique = str(uuid4())
     username = f"testuser_{unique}"
@@ -168,7 +179,7 @@ def test_player_elimination_and_game_over():
 
 
 def test_create_concentration_puzzle():
-    client, tmp, _ = create_test_app_and_client()
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
     user_id, team_id, session_id = create_team_user_session(client)
 
     # Create concentration puzzle
@@ -187,12 +198,14 @@ def test_create_concentration_puzzle():
     assert "circle_color" in puzzle["data"]["pairs"][0]
     assert "is_match" in puzzle["data"]["pairs"][0]
     assert isinstance(puzzle["data"]["pairs"][0]["is_match"], bool)
-    assert puzzle["correct_answer"].isdigit()  # Should be the index as string
+    assert "correct_answer" not in puzzle
+    assert stored_answer(TestingSessionLocal, puzzle["id"]).isdigit()  # The index as string
 
     # Test correct answer (submit the correct index)
+    answer = stored_answer(TestingSessionLocal, puzzle["id"])
     answer_resp = client.post(
         "/puzzle/answer",
-        json={"puzzle_id": puzzle["id"], "answer": puzzle["correct_answer"], "user_id": user_id},
+        json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id},
     )
     assert answer_resp.status_code == 200
     result = answer_resp.json()
@@ -247,3 +260,270 @@ def test_memory_puzzle_data_structure():
     assert result["correct"] is True
 
     tmp.close()
+
+
+def test_submit_answer_uses_fixed_number_of_statements():
+    from sqlalchemy import event
+
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+    unique = str(uuid4())
+    team_id = client.post("/team/create", json={"name": f"Team_{unique}"}).json()["id"]
+    user_ids = []
+    for i in range(2):
+        username = f"user{i}_{unique}"
+        user_ids.append(client.post("/team/register", json={"username": username}).json()["id"])
+        client.post(f"/team/join?username={username}&team_id={team_id}")
+    session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = TestingSessionLocal.kw["bind"]
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        for _ in range(2):
+            puzzle = client.post(
+                "/puzzle/create",
+                json={"type": "memory", "game_session_id": session_id, "user_id": user_ids[0]},
+            ).json()
+            answer = stored_answer(TestingSessionLocal, puzzle["id"])
+            statements.clear()
+            answer_resp = client.post(
+                "/puzzle/answer",
+                json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_ids[0]},
+            )
+            assert answer_resp.status_code == 200
+            assert answer_resp.json()["awarded_to_user_id"] == user_ids[1]
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    # Warm roster cache: select puzzle+user, update puzzle, update next player's points, upsert game statistics,
+    # insert next puzzle
+    assert len(statements) == 5
+    points = {p["user_id"]: p["points"] for p in client.get(f"/puzzle/points/{team_id}").json()["players"]}
+    assert points[user_ids[1]] == 15 + 2 * 5
+    tmp.close()
+
+
+def test_game_results_are_maintained_by_answers_and_decay():
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+    unique = str(uuid4())
+    team_id = client.post("/team/create", json={"name": f"Team_{unique}"}).json()["id"]
+    user_ids = []
+    for i in range(2):
+        username = f"user{i}_{unique}"
+        user_ids.append(client.post("/team/register", json={"username": username}).json()["id"])
+        client.post(f"/team/join?username={username}&team_id={team_id}")
+    session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+    client.post(f"/game/session/{session_id}/start")
+
+    for answer_correctly in (True, True, False):
+        puzzle = client.post(
+            "/puzzle/create",
+            json={"type": "memory", "game_session_id": session_id, "user_id": user_ids[0]},
+        ).json()
+        answer = stored_answer(TestingSessionLocal, puzzle["id"]) if answer_correctly else "wrong"
+        client.post("/puzzle/answer", json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_ids[0]})
+    for _ in range(15):
+        client.post(f"/puzzle/decay/{team_id}")
+
+    resp = client.get(f"/game/session/{session_id}/results")
+    assert resp.status_code == 200
+    results = resp.json()
+    assert results["session"]["id"] == session_id
+    assert results["puzzles_solved_per_player"] == {str(user_ids[0]): 2, str(user_ids[1]): 0}
+    assert results["points_given_per_player"] == {str(user_ids[0]): 10, str(user_ids[1]): 0}
+    assert results["points_received_per_player"] == {str(user_ids[0]): 0, str(user_ids[1]): 10}
+    players = {player["id"]: player for player in results["final_players"]}
+    assert players[user_ids[0]]["puzzles_failed"] == 1
+    assert players[user_ids[0]]["eliminated_at"] is not None
+    assert players[user_ids[1]]["eliminated_at"] is None
+
+    assert client.get("/game/session/999999/results").status_code == 404
+    tmp.close()
+
+
+def test_submit_answer_twice_is_rejected():
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    puzzle = client.post(
+        "/puzzle/create",
+        json={"type": "memory", "game_session_id": session_id, "user_id": user_id},
+    ).json()
+    answer = stored_answer(TestingSessionLocal, puzzle["id"])
+    payload = {"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id}
+    assert client.post("/puzzle/answer", json=payload).status_code == 200
+    assert client.post("/puzzle/answer", json=payload).status_code == 400
+    tmp.close()
+
+
+def test_submit_multitasking_answer():
+    client, tmp, _ = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    puzzle = client.post(
+        "/puzzle/create",
+        json={"type": "multitasking", "game_session_id": session_id, "user_id": user_id},
+    ).json()
+    assert len(puzzle["data"]["rows"]) == len(puzzle["data"]["six_positions"])
+
+    clicks = [[p["row"], p["col"]] for p in puzzle["data"]["six_positions"]]
+    answer_resp = client.post(
+        "/puzzle/answer",
+        json={"puzzle_id": puzzle["id"], "answer": json.dumps(clicks), "user_id": user_id},
+    )
+    assert answer_resp.status_code == 200
+    assert answer_resp.json()["correct"] is True
+    tmp.close()
+
+
+def test_answer_after_deadline_is_wrong():
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    puzzle = client.post(
+        "/puzzle/create",
+        json={"type": "memory", "game_session_id": session_id, "user_id": user_id},
+    ).json()
+    db = TestingSessionLocal()
+    db.execute(
+        update(Puzzle).where(Puzzle.id == puzzle["id"]).values(expires_at=datetime(2000, 1, 1)),
+    )
+    db.commit()
+    db.close()
+
+    answer = stored_answer(TestingSessionLocal, puzzle["id"])
+    payload = {"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id}
+    answer_resp = client.post("/puzzle/answer", json=payload)
+    assert answer_resp.status_code == 200
+    assert answer_resp.json()["correct"] is False
+    tmp.close()
+
+
+def test_restart_reuses_team_and_archives_old_puzzles():
+    from app.models import PuzzleHistory, User
+    from app.services.countdown_service import countdown_service
+    from app.services.team_roster_service import team_roster_service
+    from app.utils.websocket_broadcast import get_user_color
+
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    client.post(f"/game/session/{session_id}/start")
+    client.post("/puzzle/create", json={"type": "memory", "game_session_id": session_id, "user_id": user_id})
+    team_roster_service.get_successor(team_id, user_id, TestingSessionLocal())
+
+    assert client.post("/game/restart", json={"team_id": team_id}).status_code == 400  # Still playing
+    client.post(f"/game/session/{session_id}/state", json={"status": "finished"})
+    db = TestingSessionLocal()
+    db.execute(update(User).where(User.id == user_id).values(points=0))
+    db.commit()
+    db.close()
+
+    resp = client.post("/game/restart", json={"team_id": team_id})
+    assert resp.status_code == 200
+    session = resp.json()
+    assert session["status"] == "countdown"
+    assert session["id"] != session_id
+    countdown_service.stop_countdown(session["id"])
+
+    assert team_id in team_roster_service._successors
+    color = client.get("/team/").json()[0]["users"][0]["color"]
+    assert get_user_color(session["id"], user_id) == color
+    db = TestingSessionLocal()
+    assert db.get(User, user_id).points == 15
+    assert db.query(Puzzle).filter(Puzzle.game_session_id == session_id).count() == 0
+    assert db.query(PuzzleHistory).filter(PuzzleHistory.game_session_id == session_id).count() == 1
+    db.close()
+
+    assert client.post("/game/restart", json={"team_id": team_id}).status_code == 400  # Already in countdown
+    assert client.post("/game/restart", json={"team_id": 999999}).status_code == 404
+    tmp.close()
+
+
+def test_archive_after_restart_succeeds():
+    from app.models import PuzzleHistory
+    from app.services.countdown_service import countdown_service
+    from app.services.puzzle_archive_service import puzzle_archive_service
+
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    client.post(f"/game/session/{session_id}/start")
+    old_puzzle = client.post(
+        "/puzzle/create",
+        json={"type": "memory", "game_session_id": session_id, "user_id": user_id},
+    ).json()
+    client.post(f"/game/session/{session_id}/state", json={"status": "finished"})
+    new_session_id = client.post("/game/restart", json={"team_id": team_id}).json()["id"]
+    countdown_service.stop_countdown(new_session_id)
+
+    # The old session's puzzles are archived, so the live table is empty again
+    puzzle = client.post(
+        "/puzzle/create",
+        json={"type": "memory", "game_session_id": new_session_id, "user_id": user_id},
+    ).json()
+    assert puzzle["id"] != old_puzzle["id"]
+    answer = stored_answer(TestingSessionLocal, puzzle["id"])
+    resp = client.post(
+        "/puzzle/answer",
+        json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id},
+    )
+    assert resp.status_code == 200
+
+    db = TestingSessionLocal()
+    assert puzzle_archive_service.archive_resolved(db) == 1
+    assert db.query(PuzzleHistory).count() == 2
+    db.close()
+    tmp.close()
+
+
+def test_decay_ends_game_when_last_player_runs_out():
+    client, tmp, _ = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    client.post(f"/game/session/{session_id}/start")
+
+    for _ in range(14):
+        client.post(f"/puzzle/decay/{team_id}")
+    assert client.get(f"/game/session/{team_id}").json()["status"] == "active"
+
+    client.post(f"/puzzle/decay/{team_id}")
+    session = client.get(f"/game/session/{team_id}").json()
+    assert session["status"] == "finished"
+    assert session["survival_time_seconds"] is not None
+    tmp.close()
+
+
+def test_decay_skips_players_already_out_of_points():
+    client, tmp, _ = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+    client.post(f"/game/session/{session_id}/start")
+
+    for _ in range(15):
+        client.post(f"/puzzle/decay/{team_id}")
+    resp = client.post(f"/puzzle/decay/{team_id}")
+    assert resp.status_code == 200
+    assert resp.json()["message"] == "Decayed 1 point(s) for 0 users"
+    tmp.close()
+
+
+def test_game_results_keep_the_players_of_the_session():
+    client, tmp, _ = create_test_app_and_client()
+    unique = str(uuid4())
+    team_id = client.post("/team/create", json={"name": f"Team_{unique}"}).json()["id"]
+    other_team_id = client.post("/team/create", json={"name": f"Other_{unique}"}).json()["id"]
+    user_ids = []
+    for i in range(2):
+        username = f"user{i}_{unique}"
+        user_ids.append(client.post("/team/register", json={"username": username}).json()["id"])
+        client.post(f"/team/join?username={username}&team_id={team_id}")
+    session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+    client.post(f"/game/session/{session_id}/start")
+
+    # After the game one player moves to another team and a newcomer joins
+    client.post(f"/team/join?username=user1_{unique}&team_id={other_team_id}")
+    newcomer_id = client.post("/team/register", json={"username": f"newcomer_{unique}"}).json()["id"]
+    client.post(f"/team/join?username=newcomer_{unique}&team_id={team_id}")
+
+    results = client.get(f"/game/session/{session_id}/results").json()
+    assert [player["id"] for player in results["final_players"]] == user_ids
+    assert newcomer_id not in {player["id"] for player in results["final_players"]}
+    tmp.close()
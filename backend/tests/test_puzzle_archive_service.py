@@ -0,0 +1,103 @@
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, GameSession, Puzzle, PuzzleHistory, Team, User
+from app.services.puzzle_archive_service import PuzzleArchiveService
+
+
+@pytest.fixture
+def db():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        engine = create_engine(f"sqlite:///{tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def create_session_with_puzzles(db, name: str, statuses: list[str], session_status: str = "active") -> int:
+    team = Team()
+    team.name = name
+    db.add(team)
+    db.flush()
+    user = User()
+    user.username = f"{name}_user"
+    user.team_id = team.id
+    db.add(user)
+    session = GameSession()
+    session.team_id = team.id
+    session.status = session_status
+    db.add(session)
+    db.flush()
+    for i, status in enumerate(statuses):
+        puzzle = Puzzle()
+        puzzle.type = "concentration"
+        puzzle.seed = i
+        puzzle.status = status
+        puzzle.game_session_id = session.id
+        puzzle.user_id = user.id
+        db.add(puzzle)
+    db.commit()
+    return session.id
+
+
+class TestPuzzleArchiveService:
+    """Test suite for moving resolved puzzles into puzzle_history."""
+
+    def test_archive_resolved_keeps_only_active_puzzles(self, db):
+        create_session_with_puzzles(db, "alpha", ["solved", "failed", "solved", "active"])
+        service = PuzzleArchiveService(batch_size=2)
+
+        assert service.archive_resolved(db) == 3
+        assert [p.status for p in db.query(Puzzle).all()] == ["active"]
+        assert sorted(p.status for p in db.query(PuzzleHistory).all()) == ["failed", "solved", "solved"]
+
+    def test_archived_puzzles_keep_id_and_generated_data(self, db):
+        create_session_with_puzzles(db, "beta", ["solved"])
+        original = db.query(Puzzle).one()
+        original_id, original_data = original.id, original.data
+
+        PuzzleArchiveService().archive_resolved(db)
+
+        archived = db.query(PuzzleHistory).one()
+        assert archived.id == original_id
+        assert archived.data == original_data
+        assert archived.archived_at is not None
+
+    def test_archive_resolved_respects_batch_limit(self, db):
+        create_session_with_puzzles(db, "gamma", ["solved"] * 5)
+        service = PuzzleArchiveService(batch_size=2)
+
+        assert service.archive_resolved(db, max_batches=1) == 2
+        assert service.archive_resolved(db) == 3
+
+    def test_archive_finished_sessions_moves_leftover_active_puzzles(self, db):
+        finished_id = create_session_with_puzzles(db, "delta", ["solved", "active"], session_status="finished")
+        active_id = create_session_with_puzzles(db, "epsilon", ["active"])
+
+        assert PuzzleArchiveService().archive_finished_sessions(db) == 2
+        assert db.query(Puzzle).filter(Puzzle.game_session_id == finished_id).count() == 0
+        assert db.query(Puzzle).filter(Puzzle.game_session_id == active_id).count() == 1
+        assert db.query(PuzzleHistory).filter(PuzzleHistory.game_session_id == finished_id).count() == 2
+
+    def test_archiving_again_after_new_puzzles_does_not_reuse_ids(self, db):
+        session_id = create_session_with_puzzles(db, "zeta", ["solved", "solved"])
+        service = PuzzleArchiveService()
+        assert service.archive_resolved(db) == 2
+
+        # The live table is empty now; new puzzles must not get the archived IDs again
+        user_id = db.query(PuzzleHistory).first().user_id
+        for seed in range(2):
+            puzzle = Puzzle(type="concentration", seed=seed, status="solved", game_session_id=session_id)
+            puzzle.user_id = user_id
+            db.add(puzzle)
+        db.commit()
+        assert not {p.id for p in db.query(Puzzle).all()} & {p.id for p in db.query(PuzzleHistory).all()}
+
+        assert service.archive_resolved(db) == 2
+        assert db.query(PuzzleHistory).count() == 4
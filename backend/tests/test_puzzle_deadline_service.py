@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Base
+from app.services.puzzle_deadline_service import PuzzleDeadlineService
+
+
+def at(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+class TestDeadlineScheduling:
+    """Test suite for the deadline heap."""
+
+    def setup_method(self):
+        self.service = PuzzleDeadlineService()
+
+    def test_pop_expired_returns_due_puzzles_in_deadline_order(self):
+        self.service.schedule(1, at(30))
+        self.service.schedule(2, at(10))
+        self.service.schedule(3, at(20))
+        assert self.service.pop_expired(now=5) == []
+        assert self.service.pop_expired(now=25) == [2, 3]
+        assert self.service.pending() == 1
+        assert self.service.pop_expired(now=30) == [1]
+
+    def test_cancelled_puzzle_does_not_expire(self):
+        self.service.schedule(1, at(10))
+        self.service.schedule(2, at(10))
+        self.service.cancel(1)
+        assert self.service.pop_expired(now=10) == [2]
+
+    def test_reschedule_replaces_previous_deadline(self):
+        self.service.schedule(1, at(10))
+        self.service.schedule(1, at(50))
+        assert self.service.pop_expired(now=20) == []
+        assert self.service.pop_expired(now=50) == [1]
+
+    def test_cancellations_compact_the_heap(self):
+        for puzzle_id in range(1000):
+            self.service.schedule(puzzle_id, at(100 + puzzle_id))
+        for puzzle_id in range(990):
+            self.service.cancel(puzzle_id)
+        assert self.service.pending() == 10
+        assert len(self.service._heap) < 200
+        assert self.service.pop_expired(now=2000) == list(range(990, 1000))
+
+    def test_naive_datetimes_are_treated_as_utc(self):
+        self.service.schedule(1, at(10).replace(tzinfo=None))
+        assert self.service.pop_expired(now=10) == [1]
+
+
+class TestExpire:
+    """Test suite for failing expired puzzles."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        self.service = PuzzleDeadlineService()
+
+        team = models.Team(name="Deadline")
+        self.db.add(team)
+        self.db.flush()
+        self.active_user = models.User(username="active", team_id=team.id, points=10)
+        self.eliminated_user = models.User(username="eliminated", team_id=team.id, points=0)
+        self.session = models.GameSession(team_id=team.id, status="active")
+        self.db.add_all([self.active_user, self.eliminated_user, self.session])
+        self.db.flush()
+        self.puzzles = [
+            self.service.issue_puzzle(user.id, self.session.id, self.db)
+            for user in (self.active_user, self.eliminated_user)
+        ]
+        self.db.commit()
+
+    def teardown_method(self):
+        self.db.close()
+        self.tmp.close()
+
+    def test_issue_puzzle_sets_deadline_without_scheduling(self):
+        puzzle = self.puzzles[0]
+        assert puzzle.expires_at > datetime.now(timezone.utc).replace(tzinfo=None)
+        # Scheduling is left to the caller, after its commit
+        assert self.service.pending() == 0
+
+    def test_rolled_back_puzzle_leaves_no_deadline(self):
+        self.service.issue_puzzle(self.active_user.id, self.session.id, self.db)
+        self.db.rollback()
+        assert self.service.pending() == 0
+        assert self.db.query(models.Puzzle).count() == 2
+
+    def test_expire_fails_puzzle_and_issues_replacement(self):
+        results = self.service.expire([puzzle.id for puzzle in self.puzzles], self.db)
+        replacements = {puzzle.user_id: replacement for puzzle, replacement in results}
+
+        expired_ids = [puzzle.id for puzzle in self.puzzles]
+        statuses = {puzzle.status for puzzle in self.db.query(models.Puzzle).filter(models.Puzzle.id.in_(expired_ids))}
+        assert statuses == {"failed"}
+        assert replacements[self.active_user.id].status == "active"
+        assert replacements[self.active_user.id].expires_at is not None
+        assert replacements[self.eliminated_user.id] is None
+        assert self.service.pending() == 1
+        far_future = (datetime.now(timezone.utc) + timedelta(hours=1)).timestamp()
+        assert self.service.pop_expired(now=far_future) == [replacements[self.active_user.id].id]
+
+    def test_expire_records_timeouts_as_failures(self):
+        self.service.expire([puzzle.id for puzzle in self.puzzles], self.db)
+        stats = {row.user_id: row for row in self.db.query(models.GamePlayerStats)}
+        assert stats[self.active_user.id].puzzles_failed == 1
+        assert stats[self.eliminated_user.id].puzzles_failed == 1
+        assert stats[self.active_user.id].puzzles_solved == 0
+
+    def test_expire_ignores_answered_puzzles(self):
+        self.puzzles[0].status = "solved"
+        self.db.commit()
+        results = self.service.expire([self.puzzles[0].id], self.db)
+        assert results == []
+        assert self.db.query(models.Puzzle).count() == 2
+
+    def test_load_schedules_active_puzzles(self):
+        service = PuzzleDeadlineService()
+        assert service.load(self.db) == 2
+        far_future = (datetime.now(timezone.utc) + timedelta(hours=1)).timestamp()
+        assert sorted(service.pop_expired(now=far_future)) == sorted(puzzle.id for puzzle in self.puzzles)
@@ -0,0 +1,136 @@
+import tempfile
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Puzzle
+from app.services.puzzle_generator import (
+    GENERATOR_VERSION,
+    MEMORY_COLORS,
+    PUZZLE_TYPES,
+    GeneratorVersionMismatch,
+    PuzzleGenerator,
+    generate_batch,
+)
+
+
+class TestPuzzleGenerator:
+    """Test suite for seeded deterministic puzzle generation."""
+
+    def setup_method(self):
+        self.generator = PuzzleGenerator()
+
+    @pytest.mark.parametrize("puzzle_type", PUZZLE_TYPES)
+    def test_same_seed_produces_same_puzzle(self, puzzle_type):
+        first = self.generator.generate(puzzle_type, 12345)
+        self.generator.clear_cache()
+        second = self.generator.generate(puzzle_type, 12345)
+        assert first == second
+
+    def test_different_seeds_produce_different_puzzles(self):
+        puzzles = {str(self.generator.generate("concentration", seed)) for seed in range(20)}
+        assert len(puzzles) > 1
+
+    def test_memory_puzzle_answer_matches_mapping(self):
+        data, correct_answer = self.generator.generate("memory", 7)
+        assert data["mapping"][data["question_number"]] == correct_answer
+        assert correct_answer in data["choices"]
+
+    def test_concentration_difficulty_parameters(self):
+        data, correct_answer = self.generator.generate("concentration", 7, {"num_pairs": 5})
+        assert len(data["pairs"]) == 5
+        assert data["pairs"][int(correct_answer)]["is_match"] is True
+        assert sum(pair["is_match"] for pair in data["pairs"]) == 1
+
+    def test_generate_is_cached(self):
+        first = self.generator.generate("memory", 99)
+        second = self.generator.generate("memory", 99)
+        assert first is second
+
+    def test_time_limit_follows_puzzle_data(self):
+        multitasking, _ = self.generator.generate("multitasking", 7, {"time_limit": 8})
+        concentration, _ = self.generator.generate("concentration", 7, {"num_pairs": 6})
+        assert self.generator.time_limit("multitasking", multitasking) > 8
+        assert self.generator.time_limit("concentration", concentration) > 6 * concentration["duration"]
+        assert self.generator.time_limit("memory", {}) > 0
+
+    def test_unknown_type_raises(self):
+        with pytest.raises(ValueError):
+            self.generator.generate("unknown", 1)
+
+    def test_seed_of_other_generator_version_is_not_rebuilt(self):
+        with pytest.raises(GeneratorVersionMismatch):
+            self.generator.generate("memory", 7, None, GENERATOR_VERSION + 1)
+
+
+def test_puzzle_row_stores_only_seed():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        engine = create_engine(f"sqlite:///{tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = TestingSessionLocal()
+        try:
+            puzzle = Puzzle()
+            puzzle.type = "concentration"
+            puzzle.seed = 4242
+            puzzle.status = "active"
+            puzzle.game_session_id = 1
+            puzzle.user_id = 1
+            db.add(puzzle)
+            db.commit()
+            puzzle_id = puzzle.id
+
+            stored = db.execute(text("SELECT data, correct_answer FROM puzzles WHERE id = :id"), {"id": puzzle_id}).one()
+            assert stored.data is None
+            assert stored.correct_answer is None
+            assert puzzle.generator_version == GENERATOR_VERSION
+        finally:
+            db.close()
+
+        db = TestingSessionLocal()
+        try:
+            reloaded = db.query(Puzzle).filter(Puzzle.id == puzzle_id).one()
+            data, correct_answer = PuzzleGenerator().generate("concentration", 4242)
+            assert reloaded.data == data
+            assert reloaded.correct_answer == correct_answer
+        finally:
+            db.close()
+
+
+class TestGenerateBatch:
+    """Test suite for vectorized batch puzzle generation."""
+
+    def test_memory_batch(self):
+        batch = generate_batch("memory", 500, np.random.default_rng(1))
+        assert len(batch) == 500
+        for data, correct_answer in batch.to_puzzles():
+            assert sorted(data["choices"]) == sorted(MEMORY_COLORS)
+            assert data["mapping"][data["question_number"]] == correct_answer
+
+    def test_concentration_batch_has_exactly_one_match(self):
+        batch = generate_batch("concentration", 500, np.random.default_rng(1), num_pairs=6)
+        assert batch.arrays["color_words"].shape == (500, 6)
+        matches = batch.arrays["color_words"] == batch.arrays["circle_colors"]
+        assert np.all(matches.sum(axis=1) == 1)
+        for data, correct_answer in batch.to_puzzles():
+            assert len(data["pairs"]) == 6
+            assert [i for i, pair in enumerate(data["pairs"]) if pair["is_match"]] == [int(correct_answer)]
+
+    def test_multitasking_batch(self):
+        batch = generate_batch("multitasking", 200, np.random.default_rng(1), time_limit=15)
+        assert batch.arrays["grids"].shape == (200, 4, 9)
+        for data, correct_answer in batch.to_puzzles():
+            assert data["time_limit"] == 15
+            assert correct_answer == ",".join(str(p["col"]) for p in data["six_positions"])
+
+    def test_batch_is_reproducible_with_seeded_rng(self):
+        first = generate_batch("concentration", 50, np.random.default_rng(3)).to_puzzles()
+        second = generate_batch("concentration", 50, np.random.default_rng(3)).to_puzzles()
+        assert first == second
+
+    def test_unsupported_type_raises(self):
+        with pytest.raises(ValueError):
+            generate_batch("spatial", 10, np.random.default_rng(1))
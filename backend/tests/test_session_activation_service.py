@@ -0,0 +1,77 @@
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Base
+from app.services.puzzle_deadline_service import puzzle_deadline_service
+from app.services.session_activation_service import STARTING_POINTS, SessionActivationService
+
+
+class TestSessionActivation:
+    """Test suite for bulk session activation."""
+
+    def setup_method(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        self.engine = create_engine(f"sqlite:///{self.tmp.name}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)()
+        self.service = SessionActivationService()
+
+        self.session_ids = []
+        for team_index in range(3):
+            team = models.Team(name=f"Team {team_index}")
+            self.db.add(team)
+            self.db.flush()
+            for player_index in range(4):
+                self.db.add(models.User(username=f"player_{team_index}_{player_index}", team_id=team.id, points=3))
+            session = models.GameSession(team_id=team.id, status="countdown")
+            self.db.add(session)
+            self.db.flush()
+            self.session_ids.append(session.id)
+        self.db.commit()
+
+    def teardown_method(self):
+        self.db.close()
+        self.tmp.close()
+
+    def test_activates_sessions_and_returns_state(self):
+        states = self.service.activate(self.session_ids, self.db)
+
+        assert sorted(states) == sorted(self.session_ids)
+        for session_id, state in states.items():
+            assert state["session"]["status"] == "active"
+            assert state["session"]["started_at"] is not None
+            assert state["team"]["name"].startswith("Team ")
+            assert len(state["players"]) == 4
+            assert len(state["puzzles"]) == 4
+            for player in state["players"]:
+                assert player["points"] == STARTING_POINTS
+                assert player["puzzle"]["status"] == "active"
+                assert player["puzzle"]["data"]
+
+        assert {session.status for session in self.db.query(models.GameSession)} == {"active"}
+        assert {user.points for user in self.db.query(models.User)} == {STARTING_POINTS}
+        puzzles = self.db.query(models.Puzzle).all()
+        assert len(puzzles) == 12
+        assert all(puzzle.expires_at is not None for puzzle in puzzles)
+        assert puzzle_deadline_service.pending() == 12
+
+    def test_returned_puzzles_match_stored_rows(self):
+        states = self.service.activate(self.session_ids[:1], self.db)
+        for puzzle_state in states[self.session_ids[0]]["puzzles"]:
+            stored = self.db.get(models.Puzzle, puzzle_state["id"])
+            assert stored.user_id == puzzle_state["user_id"]
+            assert stored.data == puzzle_state["data"]
+
+    def test_uses_four_statements_for_any_number_of_sessions(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        self.service.activate(self.session_ids, self.db)
+        assert len(statements) == 4
+
+    def test_skips_sessions_not_in_countdown(self):
+        self.service.activate(self.session_ids[:1], self.db)
+        assert self.service.activate(self.session_ids[:1], self.db) == {}
+        assert self.db.query(models.Puzzle).count() == 4
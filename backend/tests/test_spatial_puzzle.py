@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.puzzle_generator import puzzle_generator
+from app.services.spatial_puzzle import MAX_PATH_POINTS, generate_spatial_puzzle, validate_path
+
+
+def make_puzzle(seed: int = 1):
+    return generate_spatial_puzzle(np.random.default_rng(seed))
+
+
+def densify(waypoints: list[list[int]], samples_per_segment: int) -> list[list[float]]:
+    points = np.asarray(waypoints, dtype=float)
+    segments = [np.linspace(points[i], points[i + 1], samples_per_segment) for i in range(len(points) - 1)]
+    return np.round(np.concatenate(segments), 2).tolist()
+
+
+class TestSpatialPuzzleGeneration:
+    """Test suite for server-side spatial puzzle generation."""
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_reference_path_solves_generated_layout(self, seed):
+        data, correct_answer = make_puzzle(seed)
+        assert data["obstacles"]
+        assert validate_path(data, correct_answer)
+
+    def test_layout_matches_schema_fields(self):
+        data, _ = make_puzzle()
+        assert set(data["start_position"]) == {"x", "y"}
+        assert set(data["end_position"]) == {"x", "y"}
+        assert all(set(obstacle) == {"x", "y", "radius"} for obstacle in data["obstacles"])
+        assert data["circle_radius"] > 0
+
+    def test_same_seed_same_layout(self):
+        assert make_puzzle(5) == make_puzzle(5)
+
+
+class TestSpatialPathValidation:
+    """Test suite for vectorized drag path validation."""
+
+    def test_dense_path_is_accepted(self):
+        data, correct_answer = make_puzzle()
+        path = densify(json.loads(correct_answer), 1000)
+        assert validate_path(data, json.dumps(path))
+
+    def test_object_points_are_accepted(self):
+        data, correct_answer = make_puzzle()
+        path = [{"x": x, "y": y} for x, y in json.loads(correct_answer)]
+        assert validate_path(data, json.dumps(path))
+
+    def test_path_through_obstacle_is_rejected(self):
+        data, correct_answer = make_puzzle()
+        obstacle = data["obstacles"][0]
+        path = json.loads(correct_answer)
+        path.insert(1, [obstacle["x"], obstacle["y"]])
+        assert not validate_path(data, json.dumps(path))
+
+    def test_jump_across_obstacle_is_rejected(self):
+        data = {
+            "start_position": {"x": 20, "y": 150},
+            "end_position": {"x": 380, "y": 150},
+            "obstacles": [{"x": 200, "y": 150, "radius": 20}],
+            "circle_radius": 15,
+        }
+        # Only the endpoints are sampled; the segment between them still crosses the obstacle
+        assert not validate_path(data, json.dumps([[20, 150], [380, 150]]))
+        assert validate_path(data, json.dumps([[20, 150], [200, 250], [380, 150]]))
+
+    def test_path_must_start_and_end_on_targets(self):
+        data, correct_answer = make_puzzle()
+        path = json.loads(correct_answer)
+        assert not validate_path(data, json.dumps(path[:-1]))
+        assert not validate_path(data, json.dumps(path[1:]))
+
+    def test_path_must_stay_on_board(self):
+        data, correct_answer = make_puzzle()
+        path = json.loads(correct_answer)
+        path.insert(1, [path[0][0], -50])
+        assert not validate_path(data, json.dumps(path))
+
+    @pytest.mark.parametrize(
+        "answer",
+        ["solved", "", "{}", "[]", "[[1, 2, 3]]", '[["a", "b"]]', "[[NaN, 1]]", json.dumps([[1, 1]] * (MAX_PATH_POINTS + 1))],
+    )
+    def test_malformed_paths_are_rejected(self, answer):
+        data, _ = make_puzzle()
+        assert not validate_path(data, answer)
+
+    def test_legacy_client_answer_is_accepted(self):
+        data, correct_answer = make_puzzle()
+        assert puzzle_generator.check_answer("spatial", data, correct_answer, "solved")
+        assert not puzzle_generator.check_answer("spatial", data, correct_answer, "collision")
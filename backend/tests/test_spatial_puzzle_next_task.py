@@ -5,7 +5,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.models import Base
+from app.models import Base, Puzzle
 from app.routers.game import (
     get_db as get_db_game,
     router as game_router,
@@ -47,12 +47,21 @@ def create_test_app_and_client():
     return client, tmp, TestingSessionLocal
 
 
+def stored_answer(SessionLocal, puzzle_id: int) -> str:
+    """The puzzle's answer, read from the database since responses never include it."""
+    db = SessionLocal()
+    try:
+        return db.get(Puzzle, puzzle_id).correct_answer
+    finally:
+        db.close()
+
+
 class TestSpatialPuzzleNextTask:
     """Test suite for spatial puzzle next task functionality"""
 
     def test_spatial_puzzle_solved_returns_next_puzzle(self):
         """Test that solving a spatial puzzle returns the next puzzle in the response"""
-        client, tmp, _ = create_test_app_and_client()
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
             # Create team and users using API
@@ -95,9 +104,10 @@ class TestSpatialPuzzleNextTask:
             puzzle = puzzle_resp.json()
 
             # Submit correct answer
+            answer = stored_answer(TestingSessionLocal, puzzle["id"])
             answer_resp = client.post(
                 "/puzzle/answer",
-                json={"puzzle_id": puzzle["id"], "answer": "solved", "user_id": user1_id},
+                json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user1_id},
             )
             assert answer_resp.status_code == 200
             result = answer_resp.json()
@@ -183,7 +193,7 @@ class TestSpatialPuzzleNextTask:
 
     def test_spatial_puzzle_next_puzzle_randomization(self):
         """Test that the next puzzle type is randomly selected"""
-        client, tmp, _ = create_test_app_and_client()
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
             # Create team and user using API
@@ -225,9 +235,10 @@ class TestSpatialPuzzleNextTask:
                 puzzle = puzzle_resp.json()
 
                 # Submit correct answer
+                answer = stored_answer(TestingSessionLocal, puzzle["id"])
                 answer_resp = client.post(
                     "/puzzle/answer",
-                    json={"puzzle_id": puzzle["id"], "answer": "solved", "user_id": user_id},
+                    json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id},
                 )
                 assert answer_resp.status_code == 200
                 result = answer_resp.json()
@@ -249,7 +260,7 @@ class TestSpatialPuzzleNextTask:
 
     def test_spatial_puzzle_points_awarded_to_next_player(self):
         """Test that solving a spatial puzzle awards points to the next player in the team"""
-        client, tmp, _ = create_test_app_and_client()
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
             # Create team and users using API
@@ -296,9 +307,10 @@ class TestSpatialPuzzleNextTask:
             puzzle = puzzle_resp.json()
 
             # Submit correct answer
+            answer = stored_answer(TestingSessionLocal, puzzle["id"])
             answer_resp = client.post(
                 "/puzzle/answer",
-                json={"puzzle_id": puzzle["id"], "answer": "solved", "user_id": user1_id},
+                json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user1_id},
             )
             assert answer_resp.status_code == 200
             result = answer_resp.json()
@@ -372,9 +384,10 @@ class TestSpatialPuzzleNextTask:
             puzzle = puzzle_resp.json()
 
             # Submit correct answer
+            answer = stored_answer(TestingSessionLocal, puzzle["id"])
             answer_resp = client.post(
                 "/puzzle/answer",
-                json={"puzzle_id": puzzle["id"], "answer": "solved", "user_id": user1_id},
+                json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user1_id},
             )
             assert answer_resp.status_code == 200
             result = answer_resp.json()
@@ -396,7 +409,7 @@ class TestSpatialPuzzleNextTask:
 
     def test_spatial_puzzle_single_player_team(self):
         """Test spatial puzzle with single player team (no points awarded)"""
-        client, tmp, _ = create_test_app_and_client()
+        client, tmp, TestingSessionLocal = create_test_app_and_client()
 
         try:
             # Create team and user using API
@@ -435,9 +448,10 @@ class TestSpatialPuzzleNextTask:
             puzzle = puzzle_resp.json()
 
             # Submit correct answer
+            answer = stored_answer(TestingSessionLocal, puzzle["id"])
             answer_resp = client.post(
                 "/puzzle/answer",
-                json={"puzzle_id": puzzle["id"], "answer": "solved", "user_id": user_id},
+                json={"puzzle_id": puzzle["id"], "answer": answer, "user_id": user_id},
             )
             assert answer_resp.status_code == 200
             result = answer_resp.json()
@@ -3,9 +3,10 @@ from uuid import uuid4
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from app import models
 from app.models import Base
 from app.routers.game import (
     get_db as get_db_game,
@@ -360,3 +361,233 @@ def test_available_teams_response_structure():
     assert team["game_status"] is None
 
     tmp.close()
+
+
+def test_get_available_teams_reflects_joins_and_sessions():
+    """Test that the cached available teams are invalidated by joins and session creation"""
+    client, tmp, _ = create_test_app_and_client()
+
+    team_id, _ = create_team_with_users(client, "CachedTeam", 1)
+    other_team_id, _ = create_team_with_users(client, "OtherTeam", 1)
+    assert [team["player_count"] for team in client.get("/team/available").json()] == [1, 1]
+
+    username = f"late_{uuid4()}"
+    client.post("/team/register", json={"username": username})
+    client.post(f"/team/join?username={username}&team_id={team_id}")
+    teams = {team["id"]: team for team in client.get("/team/available").json()}
+    assert teams[team_id]["player_count"] == 2
+    assert {member["username"] for member in teams[team_id]["members"]} >= {username}
+
+    client.post("/game/session", json={"team_id": other_team_id})
+    assert [team["id"] for team in client.get("/team/available").json()] == [team_id]
+
+    tmp.close()
+
+
+def test_get_available_teams_uses_one_query():
+    """Test that available teams are loaded with a single query and then served from cache"""
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+    for index in range(5):
+        create_team_with_users(client, f"QueryTeam{index}", 2)
+
+    statements = []
+    engine = TestingSessionLocal.kw["bind"]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert len(client.get("/team/available").json()) == 5
+    assert len(statements) == 1
+    assert len(client.get("/team/available").json()) == 5
+    assert len(statements) == 1
+
+    tmp.close()
+
+
+def test_list_teams_keyset_pagination():
+    """Test that GET /team/ pages by ID with a cursor header"""
+    client, tmp, _ = create_test_app_and_client()
+
+    team_ids = [create_team_with_users(client, f"PagedTeam{index}", 1)[0] for index in range(5)]
+
+    first = client.get("/team/?limit=2")
+    assert first.status_code == 200
+    assert [team["id"] for team in first.json()] == team_ids[:2]
+    assert len(first.json()[0]["users"]) == 1
+
+    second = client.get(f"/team/?limit=2&after_id={first.headers['X-Next-Cursor']}")
+    assert [team["id"] for team in second.json()] == team_ids[2:4]
+
+    last = client.get(f"/team/?limit=2&after_id={second.headers['X-Next-Cursor']}")
+    assert [team["id"] for team in last.json()] == team_ids[4:]
+    assert "X-Next-Cursor" not in last.headers
+
+    tmp.close()
+
+
+def test_list_teams_query_count_is_independent_of_page_size():
+    """Test that members are eager loaded and the lightweight projection skips them"""
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+    for index in range(6):
+        create_team_with_users(client, f"EagerTeam{index}", 2)
+
+    statements = []
+    engine = TestingSessionLocal.kw["bind"]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    teams = client.get("/team/").json()
+    assert len(teams) == 6
+    assert all(len(team["users"]) == 2 for team in teams)
+    assert len(statements) == 2
+
+    statements.clear()
+    teams = client.get("/team/?include_members=false").json()
+    assert len(teams) == 6
+    assert all(team["users"] == [] for team in teams)
+    assert len(statements) == 1
+
+    tmp.close()
+
+
+def test_team_lists_are_unpaged_without_limit():
+    """Test that clients that do not page still get every team and no cursor"""
+    client, tmp, _ = create_test_app_and_client()
+
+    team_ids = [create_team_with_users(client, f"Unpaged{index}", 1)[0] for index in range(3)]
+
+    for path in ("/team/", "/team/available"):
+        response = client.get(path)
+        assert [team["id"] for team in response.json()] == team_ids
+        assert "X-Next-Cursor" not in response.headers
+    assert [team["id"] for team in client.get(f"/team/available?after_id={team_ids[0]}").json()] == team_ids[1:]
+
+    tmp.close()
+
+
+def test_get_available_teams_pagination():
+    """Test cursor pagination of available teams"""
+    client, tmp, _ = create_test_app_and_client()
+
+    team_ids = [create_team_with_users(client, f"AvailablePage{index}", 1)[0] for index in range(3)]
+
+    first = client.get("/team/available?limit=2")
+    assert [team["id"] for team in first.json()] == team_ids[:2]
+    second = client.get(f"/team/available?limit=2&after_id={first.headers['X-Next-Cursor']}")
+    assert [team["id"] for team in second.json()] == team_ids[2:]
+    assert "X-Next-Cursor" not in second.headers
+
+    tmp.close()
+
+
+def test_join_assigns_colors_in_order_with_gray_fallback():
+    """Test that joins take the first free color and the fifth player falls back to gray"""
+    client, tmp, _ = create_test_app_and_client()
+
+    _, users = create_team_with_users(client, "ColorTeam", 5)
+    assert [user["color"] for user in users] == ["red", "blue", "yellow", "green", "gray"]
+
+    tmp.close()
+
+
+def test_join_color_is_one_conditional_update():
+    """Test that a join with a warm occupancy bitmask writes the user with a single UPDATE"""
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+    team_id, _ = create_team_with_users(client, "WarmMask", 1)
+    client.post("/team/register", json={"username": "late_joiner"})
+
+    statements = []
+    engine = TestingSessionLocal.kw["bind"]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert client.post(f"/team/join?username=late_joiner&team_id={team_id}").json()["color"] == "blue"
+    updates = [statement for statement in statements if statement.startswith("UPDATE users")]
+    assert len(updates) == 1
+    assert "color IS NULL" in updates[0]
+    assert not any("SELECT users.color" in statement for statement in statements)
+
+    tmp.close()
+
+
+def test_join_recovers_from_stale_color_mask():
+    """Test that a color taken behind the bitmask's back is rejected by uq_team_color and the next one used"""
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+    team_id, _ = create_team_with_users(client, "StaleMask", 1)
+    db = TestingSessionLocal()
+    db.add(models.User(username="direct_insert", team_id=team_id, color="blue"))
+    db.commit()
+    db.close()
+
+    client.post("/team/register", json={"username": "after_stale"})
+    response = client.post(f"/team/join?username=after_stale&team_id={team_id}")
+    assert response.status_code == 200
+    assert response.json()["color"] == "yellow"
+
+    tmp.close()
+
+
+def test_assign_color_does_not_move_user_between_teams():
+    """Test that assign-color only colors a member of the given team and never changes the user's team"""
+    client, tmp, TestingSessionLocal = create_test_app_and_client()
+
+    team_id, users = create_team_with_users(client, "HomeTeam", 1)
+    other_team_id = client.post("/team/create", json={"name": "OtherTeam"}).json()["id"]
+    user_id = users[0]["id"]
+    db = TestingSessionLocal()
+    db.query(models.User).filter(models.User.id == user_id).update({"color": None})
+    db.commit()
+    db.close()
+
+    response = client.post("/team/assign-color", json={"user_id": user_id, "team_id": other_team_id}).json()
+    assert response["success"] is False
+    db = TestingSessionLocal()
+    user = db.get(models.User, user_id)
+    assert (user.team_id, user.color) == (team_id, None)
+    db.close()
+
+    response = client.post("/team/assign-color", json={"user_id": user_id, "team_id": team_id}).json()
+    assert response["success"] is True
+    db = TestingSessionLocal()
+    assert db.get(models.User, user_id).team_id == team_id
+    db.close()
+
+    tmp.close()
+
+
+def test_matchmake_fills_fullest_team_first():
+    """Test that matchmaking picks the fullest team with a free slot"""
+    client, tmp, _ = create_test_app_and_client()
+
+    create_team_with_users(client, "LessFull", 1)
+    fuller_team_id, _ = create_team_with_users(client, "MoreFull", 3)
+    client.post("/team/register", json={"username": "matched"})
+
+    response = client.post("/team/matchmake?username=matched")
+    assert response.status_code == 200
+    assert response.json()["team_id"] == fuller_team_id
+    assert response.json()["color"] == "green"
+
+    # The team is now full and counting down
+    assert client.get(f"/game/session/{fuller_team_id}").json()["status"] == "countdown"
+    assert all(team["id"] != fuller_team_id for team in client.get("/team/available").json())
+
+    tmp.close()
+
+
+def test_matchmake_creates_team_and_rejects_players_in_a_team():
+    """Test that matchmaking creates a team when none is joinable and refuses players that have a team"""
+    client, tmp, _ = create_test_app_and_client()
+
+    client.post("/team/register", json={"username": "first_player"})
+    first = client.post("/team/matchmake?username=first_player").json()
+    assert first["team_id"] is not None
+    assert first["color"] == "red"
+
+    client.post("/team/register", json={"username": "second_player"})
+    assert client.post("/team/matchmake?username=second_player").json()["team_id"] == first["team_id"]
+
+    assert client.post("/team/matchmake?username=first_player").status_code == 400
+    assert client.post("/team/matchmake?username=nobody").status_code == 404
+
+    tmp.close()
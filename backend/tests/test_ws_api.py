@@ -5,6 +5,7 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.models import Base
@@ -37,6 +38,10 @@ def create_test_app_and_client():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
 
+    # WebSocket handlers use asyncio sessions on the same database
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp.name}")
+    TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
     def override_get_db():
         db = TestingSessionLocal()
         try:
@@ -44,6 +49,10 @@ def create_test_app_and_client():
         finally:
             db.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app = FastAPI()
     app.include_router(team_router)
     app.include_router(game_router)
@@ -52,7 +61,7 @@ def create_test_app_and_client():
     app.dependency_overrides[get_db_team] = override_get_db
     app.dependency_overrides[get_db_game] = override_get_db
     app.dependency_overrides[get_db_puzzle] = override_get_db
-    app.dependency_overrides[get_db_ws] = override_get_db
+    app.dependency_overrides[get_db_ws] = override_get_async_db
     client = TestClient(app)
     return client, tmp
 
@@ -104,6 +113,25 @@ def test_ws_connect_and_receive_state():
     tmp.close()
 
 
+def test_ws_state_reflects_changes_between_pings():
+    """Test that every state update of a connection reads the current data"""
+    client, tmp = create_test_app_and_client()
+    user_id, team_id, session_id = create_team_user_session(client)
+
+    with client.websocket_connect(f"/ws/game/{session_id}") as ws:
+        state = json.loads(ws.receive_text())["data"]
+        assert state["session"]["status"] == "countdown"
+        points = state["players"][0]["points"]
+
+        client.post(f"/game/session/{session_id}/start")
+        client.post(f"/puzzle/decay/{team_id}")
+        ws.send_text('{"type": "ping"}')
+        state = json.loads(ws.receive_text())["data"]
+        assert state["session"]["status"] == "active"
+        assert state["players"][0]["points"] == points - 1
+    tmp.close()
+
+
 def test_ws_multiple_clients_receive_updates():
     """
     This test is skipped because FastAPI's TestClient does not share in-memory state (like the 'connections' dict)
@@ -238,3 +266,38 @@ def test_ws_puzzle_interaction_message():
         assert interaction_message["data"]["interaction_type"] == "click"
 
     tmp.close()
+
+
+def test_ws_lobby_snapshot_and_deltas():
+    """Test that lobby subscribers get a snapshot followed by add/update deltas"""
+    client, tmp = create_test_app_and_client()
+    existing_team_id = client.post("/team/create", json={"name": f"Existing_{uuid4()}"}).json()["id"]
+
+    with client.websocket_connect("/ws/lobby") as ws:
+        snapshot = json.loads(ws.receive_text())
+        assert snapshot["type"] == "lobby_snapshot"
+        assert [team["id"] for team in snapshot["data"]["teams"]] == [existing_team_id]
+        assert snapshot["data"]["teams"][0]["status"] == "available"
+
+        team_id = client.post("/team/create", json={"name": f"Lobby_{uuid4()}"}).json()["id"]
+        added = json.loads(ws.receive_text())
+        assert added["type"] == "lobby_delta"
+        assert added["data"]["op"] == "add"
+        assert added["data"]["team"]["id"] == team_id
+        assert added["data"]["version"] > snapshot["data"]["version"]
+
+        username = f"lobbyuser_{uuid4()}"
+        client.post("/team/register", json={"username": username})
+        client.post(f"/team/join?username={username}&team_id={team_id}")
+        joined = json.loads(ws.receive_text())
+        assert joined["data"]["op"] == "update"
+        assert joined["data"]["team"]["player_count"] == 1
+        assert joined["data"]["team"]["members"][0]["color"] == "red"
+
+        session_id = client.post("/game/session", json={"team_id": team_id}).json()["id"]
+        started = json.loads(ws.receive_text())
+        assert started["data"]["team"]["status"] == "in_game"
+        assert started["data"]["team"]["game_session_id"] == session_id
+        assert started["data"]["team"]["game_status"] == "countdown"
+
+    tmp.close()
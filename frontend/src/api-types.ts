@@ -633,11 +633,6 @@ export interface components {
              * @enum {string}
              */
             status: "active" | "completed" | "failed";
-            /**
-             * Correct Answer
-             * @description Correct answer for the puzzle
-             */
-            correct_answer: string;
         };
         /**
          * TeamCreate
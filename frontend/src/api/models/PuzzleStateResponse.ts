@@ -22,10 +22,6 @@ export type PuzzleStateResponse = {
      * Puzzle status
      */
     status: PuzzleStateResponse.status;
-    /**
-     * Correct answer for the puzzle
-     */
-    correct_answer: string;
 };
 export namespace PuzzleStateResponse {
     /**
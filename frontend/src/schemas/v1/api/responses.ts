@@ -83,8 +83,6 @@ export interface PuzzleStateResponse {
   data: any;
   /** Puzzle status */
   status: ('active' | 'completed' | 'failed');
-  /** Correct answer for the puzzle */
-  correct_answer: string;
 }
 
 /** Player Points: Player points response model */
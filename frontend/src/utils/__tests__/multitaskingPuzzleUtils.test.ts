@@ -150,6 +150,30 @@ describe('multitaskingPuzzleUtils', () => {
       expect(result?.sixPositions).not.toBe(originalData.sixPositions);
       expect(result?.sixPositions).toEqual(originalData.sixPositions);
     });
+
+    it('should convert puzzle data in the server format', () => {
+      const serverData = {
+        rows: [
+          ['9', '9', '6', '9'],
+          ['6', '9', '9', '9'],
+          ['9', '9', '9', '6']
+        ],
+        six_positions: [
+          { row: 0, col: 2 },
+          { row: 1, col: 0 },
+          { row: 2, col: 3 }
+        ],
+        time_limit: 10
+      };
+
+      const result = extractMultitaskingPuzzleData(serverData);
+      expect(result).toEqual({
+        rows: 3,
+        digitsPerRow: 4,
+        timeLimit: 10,
+        sixPositions: [2, 0, 3]
+      });
+    });
   });
 
   describe('generateNumberGrid', () => {
@@ -53,6 +53,25 @@ export const validateMultitaskingPuzzleData = (data: any): MultitaskingPuzzleVal
   };
 };
 
+/**
+ * Convert the server's puzzle data (digit rows, six_positions of {row, col}, time_limit) to the client shape.
+ * Data already in the client shape is returned unchanged.
+ */
+export const fromServerPuzzleData = (data: any): any => {
+  if (!data || !Array.isArray(data.rows) || !Array.isArray(data.six_positions)) {
+    return data;
+  }
+  return {
+    rows: data.rows.length,
+    digitsPerRow: data.rows.length > 0 && Array.isArray(data.rows[0]) ? data.rows[0].length : 0,
+    timeLimit: data.time_limit,
+    sixPositions: data.six_positions
+      .slice()
+      .sort((a: { row: number }, b: { row: number }) => a.row - b.row)
+      .map((position: { col: number }) => position.col)
+  };
+};
+
 export const extractMultitaskingPuzzleData = (data: any): MultitaskingPuzzleData | null => {
   // If backend sends empty data, generate puzzle data on frontend
   if (!data || Object.keys(data).length === 0) {
@@ -76,7 +95,8 @@ export const extractMultitaskingPuzzleData = (data: any): MultitaskingPuzzleData
   }
 
   // Validate existing data if provided
-  const validation = validateMultitaskingPuzzleData(data);
+  const clientData = fromServerPuzzleData(data);
+  const validation = validateMultitaskingPuzzleData(clientData);
 
   if (!validation.isValid) {
     console.error('Invalid multitasking puzzle data:', validation.errors);
@@ -84,10 +104,10 @@ export const extractMultitaskingPuzzleData = (data: any): MultitaskingPuzzleData
   }
 
   return {
-    rows: data.rows,
-    digitsPerRow: data.digitsPerRow,
-    timeLimit: data.timeLimit,
-    sixPositions: [...data.sixPositions]
+    rows: clientData.rows,
+    digitsPerRow: clientData.digitsPerRow,
+    timeLimit: clientData.timeLimit,
+    sixPositions: [...clientData.sixPositions]
   };
 };
 